@@ -0,0 +1,23 @@
+"""
+活动记录
+
+业务代码通过 record_activity 写入 UserActivity，由 rollup 增量汇总到 UserStatistics。
+访问事件的 metadata 带有 category 和 tags，用于统计偏好分类和标签。
+"""
+from .models import UserActivity
+
+
+def _client_ip(request):
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def record_activity(user_id, activity_type, request=None, description='', **metadata):
+    """写入一条活动记录"""
+    return UserActivity.objects.create(
+        user_id=user_id,
+        activity_type=activity_type,
+        description=description,
+        metadata=metadata,
+        ip_address=_client_ip(request) if request is not None else None,
+        user_agent=request.META.get('HTTP_USER_AGENT', '') if request is not None else '',
+    )
@@ -0,0 +1,242 @@
+"""
+流式数据导出
+
+数据按块从数据库迭代读取，逐行编码后立即输出，内存占用与账户数据量无关。
+支持 JSON、JSON Lines、CSV 和浏览器通用的 Netscape 书签 HTML 格式。
+"""
+import csv
+import json
+from datetime import datetime
+from html import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from websites.models import Tag, Website, WebsiteNote
+from bookmarks.models import Bookmark, Collection
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def website_rows(user, ordering=('-created_at', '-id')):
+    websites = (
+        Website.objects.filter(user=user)
+        .select_related('category')
+        .prefetch_related('tags')
+        .order_by(*ordering)
+    )
+    for website in websites.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'title': website.title,
+            'url': website.url,
+            'description': website.description,
+            'category': website.category.name if website.category else '',
+            'tags': [tag.name for tag in website.tags.all()],
+            'visit_count': website.visit_count,
+            'created_at': website.created_at.isoformat(),
+        }
+
+
+def bookmark_rows(user, ordering=('-created_at', '-id')):
+    bookmarks = (
+        Bookmark.objects.filter(user=user)
+        .select_related('collection')
+        .order_by(*ordering)
+    )
+    for bookmark in bookmarks.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'title': bookmark.title,
+            'url': bookmark.url,
+            'description': bookmark.description,
+            'notes': bookmark.notes,
+            'collection': bookmark.collection.name,
+            'is_favorite': bookmark.is_favorite,
+            'visit_count': bookmark.visit_count,
+            'created_at': bookmark.created_at.isoformat(),
+        }
+
+
+def note_rows(user, ordering=('-created_at', '-id')):
+    notes = (
+        WebsiteNote.objects.filter(user=user)
+        .select_related('website')
+        .order_by(*ordering)
+    )
+    for note in notes.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'title': note.title,
+            'content': note.content,
+            'note_type': note.note_type,
+            'is_private': note.is_private,
+            'url': note.website.url,
+            'created_at': note.created_at.isoformat(),
+        }
+
+
+def tag_rows(user, ordering=('name', 'id')):
+    tags = Tag.objects.filter(user=user).order_by(*ordering)
+    for tag in tags.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'name': tag.name,
+            'color': tag.color,
+            'usage_count': tag.usage_count,
+            'created_at': tag.created_at.isoformat(),
+        }
+
+
+def collection_rows(user, ordering=('name', 'id')):
+    collections = Collection.objects.filter(user=user).order_by(*ordering)
+    for collection in collections.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'name': collection.name,
+            'description': collection.description,
+            'color': collection.color,
+            'is_default': collection.is_default,
+            'created_at': collection.created_at.isoformat(),
+        }
+
+
+# 导出类型 -> (单行类型名, 行生成器)
+EXPORT_SOURCES = {
+    'websites': ('website', website_rows),
+    'bookmarks': ('bookmark', bookmark_rows),
+    'notes': ('note', note_rows),
+    'tags': ('tag', tag_rows),
+    'collections': ('collection', collection_rows),
+}
+
+# 同步导出接口 type=all 时包含的类型
+DEFAULT_SOURCES = ['websites', 'bookmarks']
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, cls=DjangoJSONEncoder)
+
+
+def buffered(chunks, size=BUFFER_SIZE):
+    """把零碎的字符串片段合并成较大的块再输出"""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_json(user, sources):
+    """与原接口结构相同的 JSON 文档：{"websites": [...], "bookmarks": [...]}"""
+    yield '{'
+    for index, source in enumerate(sources):
+        _, rows = EXPORT_SOURCES[source]
+        yield f'{"," if index else ""}{_dumps(source)}:['
+        for row_index, row in enumerate(rows(user)):
+            yield (',' if row_index else '') + _dumps(row)
+        yield ']'
+    yield '}'
+
+
+def stream_jsonl(user, sources):
+    """每行一个 JSON 对象，type 字段区分数据类型"""
+    for source in sources:
+        kind, rows = EXPORT_SOURCES[source]
+        for row in rows(user):
+            yield _dumps({'type': kind, **row}) + '\n'
+
+
+CSV_COLUMNS = [
+    'type', 'title', 'url', 'description', 'category', 'collection', 'tags',
+    'notes', 'is_favorite', 'visit_count', 'name', 'color', 'content',
+    'note_type', 'is_private', 'is_default', 'usage_count', 'created_at',
+]
+
+
+class _Echo:
+    """csv.writer 的伪文件对象，write 直接返回写入内容"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(user, sources):
+    writer = csv.writer(_Echo())
+    # BOM 让 Excel 正确识别 UTF-8
+    yield '\ufeff' + writer.writerow(CSV_COLUMNS)
+    for source in sources:
+        kind, rows = EXPORT_SOURCES[source]
+        for row in rows(user):
+            row = {**row, 'type': kind, 'tags': ','.join(row.get('tags', []))}
+            yield writer.writerow([row.get(column, '') for column in CSV_COLUMNS])
+
+
+NETSCAPE_HEADER = (
+    '<!DOCTYPE NETSCAPE-Bookmark-file-1>\n'
+    '<!-- This is an automatically generated file.\n'
+    '     It will be read and overwritten.\n'
+    '     DO NOT EDIT! -->\n'
+    '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+    '<TITLE>Bookmarks</TITLE>\n'
+    '<H1>Bookmarks</H1>\n'
+    '<DL><p>\n'
+)
+
+# 导出类型 -> (顶层文件夹名, 分组字段, 排序)
+NETSCAPE_FOLDERS = {
+    'websites': ('网站', 'category', ('category__name', '-created_at', '-id')),
+    'bookmarks': ('书签', 'collection', ('collection__name', '-created_at', '-id')),
+}
+
+
+def _netscape_link(row, indent):
+    add_date = int(datetime.fromisoformat(row['created_at']).timestamp())
+    attributes = f'HREF="{escape(row["url"])}" ADD_DATE="{add_date}"'
+    if row.get('tags'):
+        attributes += f' TAGS="{escape(",".join(row["tags"]))}"'
+    line = f'{indent}<DT><A {attributes}>{escape(row["title"] or row["url"])}</A>\n'
+    if row.get('description'):
+        line += f'{indent}<DD>{escape(row["description"])}\n'
+    return line
+
+
+def stream_netscape_html(user, sources):
+    """Netscape 书签文件：网站按分类、书签按收藏夹分组为文件夹（其他类型不适用，跳过）"""
+    yield NETSCAPE_HEADER
+    for source in sources:
+        if source not in NETSCAPE_FOLDERS:
+            continue
+        title, group_field, ordering = NETSCAPE_FOLDERS[source]
+        _, rows = EXPORT_SOURCES[source]
+        yield f'    <DT><H3>{escape(title)}</H3>\n    <DL><p>\n'
+        current = None
+        for row in rows(user, ordering=ordering):
+            group = row.get(group_field) or ''
+            if group != current:
+                if current is not None and current != '':
+                    yield '        </DL><p>\n'
+                if group:
+                    yield f'        <DT><H3>{escape(group)}</H3>\n        <DL><p>\n'
+                current = group
+            yield _netscape_link(row, '            ' if group else '        ')
+        if current:
+            yield '        </DL><p>\n'
+        yield '    </DL><p>\n'
+    yield '</DL><p>\n'
+
+
+# 导出格式 -> (生成器, Content-Type, 文件扩展名)
+EXPORT_FORMATS = {
+    'json': (stream_json, 'application/json; charset=utf-8', 'json'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson; charset=utf-8', 'jsonl'),
+    'csv': (stream_csv, 'text/csv; charset=utf-8', 'csv'),
+    'html': (stream_netscape_html, 'text/html; charset=utf-8', 'html'),
+}
+
+
+def export_chunks(user, sources, export_format):
+    """按格式生成导出内容的字符串块"""
+    stream, _, _ = EXPORT_FORMATS[export_format]
+    return buffered(stream(user, sources))
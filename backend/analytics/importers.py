@@ -0,0 +1,440 @@
+"""
+批量数据导入
+
+上传文件按流解析为条目，每 CHUNK_SIZE 条为一批：
+一次 url_hash__in 查询剔除已存在的（规范化后相同的）链接，分类/收藏夹/标签按需批量创建，
+网站、书签和标签关联通过 bulk_create 写入，每批一个事务。
+bulk_create 不触发信号，计数器和同步变更在每批结束时统一记录。
+"""
+import codecs
+import csv
+import io
+import json
+from html.parser import HTMLParser
+
+import ijson
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+
+from config.canonical import url_hash
+
+from users.counters import adjust_user_counts
+from websites.counters import adjust_category_counts, adjust_tag_counts
+from websites.models import Category, Tag, Website
+from bookmarks.models import Bookmark, Collection
+from resources.registry import attach_resources
+from sync.changes import record_changes
+
+CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+
+IMPORT_FORMATS = ['html', 'json', 'jsonl', 'csv']
+IMPORT_TARGETS = ['bookmarks', 'websites']
+
+IMPORT_FAILED_MESSAGE = '导入失败，请检查文件格式和内容'
+
+# 文件扩展名 -> 导入格式
+FORMAT_EXTENSIONS = {
+    'html': 'html',
+    'htm': 'html',
+    'json': 'json',
+    'jsonl': 'jsonl',
+    'ndjson': 'jsonl',
+    'csv': 'csv',
+}
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return FORMAT_EXTENSIONS.get(extension)
+
+
+def _entry(row, folders=None, kind=None):
+    """把不同来源的记录整理为统一的导入条目"""
+    tags = row.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    folder = row.get('collection') or row.get('category') or ''
+    return {
+        'kind': kind or row.get('type') or '',
+        'url': (row.get('url') or '').strip(),
+        'title': (row.get('title') or '').strip(),
+        'description': row.get('description') or '',
+        'notes': row.get('notes') or '',
+        'is_favorite': str(row.get('is_favorite', '')).lower() in ('true', '1'),
+        'folders': folders if folders is not None else ([folder] if folder else []),
+        'tags': [tag.strip() for tag in tags if tag and tag.strip()],
+    }
+
+
+class NetscapeParser(HTMLParser):
+    """
+    Netscape 书签文件解析器
+
+    <H3> 为文件夹名，随后的 <DL> 进入该文件夹；<A> 为链接，
+    紧随其后的 <DD> 为描述。解析出的条目暂存在 entries 中，由调用方逐块取走。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.entries = []
+        self.folders = []
+        self.pending_folder = None
+        self.capture = None
+        self.text = []
+        self.link = None
+        self.description_for = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'h3':
+            self._finish_description()
+            self.capture = 'folder'
+            self.text = []
+        elif tag == 'dl':
+            self._finish_description()
+            # 文件顶层的 <DL> 没有对应的文件夹
+            self.folders.append(self.pending_folder)
+            self.pending_folder = None
+        elif tag == 'a':
+            self._finish_description()
+            attrs = dict(attrs)
+            self.link = {
+                'url': attrs.get('href') or '',
+                'tags': attrs.get('tags') or '',
+            }
+            self.capture = 'link'
+            self.text = []
+        elif tag == 'dd':
+            self.capture = 'description'
+            self.text = []
+        elif tag == 'dt':
+            self._finish_description()
+
+    def handle_endtag(self, tag):
+        if tag == 'h3' and self.capture == 'folder':
+            self.pending_folder = ''.join(self.text).strip()
+            self.capture = None
+        elif tag == 'a' and self.link is not None:
+            self.link['title'] = ''.join(self.text).strip()
+            entry = _entry(self.link, folders=[name for name in self.folders if name])
+            self.entries.append(entry)
+            self.description_for = entry
+            self.link = None
+            self.capture = None
+        elif tag == 'dl':
+            self._finish_description()
+            if self.folders:
+                self.folders.pop()
+
+    def handle_data(self, data):
+        if self.capture:
+            self.text.append(data)
+
+    def _finish_description(self):
+        if self.capture == 'description' and self.description_for is not None:
+            self.description_for['description'] = ''.join(self.text).strip()
+        if self.capture == 'description':
+            self.capture = None
+        self.description_for = None
+
+
+def _text_chunks(fileobj):
+    """以 UTF-8 增量解码上传文件，多字节字符跨块也能正确解码"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    for block in fileobj.chunks(READ_SIZE):
+        yield decoder.decode(block)
+    yield decoder.decode(b'', final=True)
+
+
+def parse_html(fileobj):
+    parser = NetscapeParser()
+    for text in _text_chunks(fileobj):
+        parser.feed(text)
+        yield from parser.entries
+        parser.entries = []
+    parser.close()
+    yield from parser.entries
+
+
+def parse_jsonl(fileobj):
+    stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace')
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield _entry(json.loads(line))
+
+
+def parse_json(fileobj):
+    """
+    JSON 文档：导出接口的 {"websites": [...], "bookmarks": [...]} 结构或顶层数组
+
+    用 ijson 逐条流式解析，内存占用与文件大小无关。
+    """
+    kinds = {'websites': 'website', 'bookmarks': 'bookmark'}
+    fileobj.seek(0)
+    head = fileobj.read(READ_SIZE)
+    # ijson 不识别 UTF-8 BOM，解析时跳过
+    start = len(codecs.BOM_UTF8) if head.startswith(codecs.BOM_UTF8) else 0
+    if head[start:].lstrip().startswith(b'['):
+        fileobj.seek(start)
+        for row in ijson.items(fileobj, 'item'):
+            yield _entry(row)
+        return
+    for source, kind in kinds.items():
+        fileobj.seek(start)
+        for row in ijson.items(fileobj, f'{source}.item'):
+            yield _entry(row, kind=kind)
+
+
+def parse_csv(fileobj):
+    stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline='')
+    for row in csv.DictReader(stream):
+        yield _entry(row)
+
+
+PARSERS = {
+    'html': parse_html,
+    'json': parse_json,
+    'jsonl': parse_jsonl,
+    'csv': parse_csv,
+}
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _truncate(model, field, value):
+    return value[:model._meta.get_field(field).max_length]
+
+
+class Importer:
+    """
+    把解析出的条目批量写入网站或书签
+
+    target 为 bookmarks 时文件夹对应收藏夹（取最内层文件夹名），
+    为 websites 时文件夹对应分类层级，条目中的标签写入网站标签。
+    导出文件中带 type 字段的条目按各自类型导入。
+    """
+
+    def __init__(self, user, target='bookmarks', progress=None):
+        self.user = user
+        self.target = target
+        self.progress = progress
+        self.validate_url = URLValidator(schemes=['http', 'https'])
+        self.url_max_length = {
+            'website': Website._meta.get_field('url').max_length,
+            'bookmark': Bookmark._meta.get_field('url').max_length,
+        }
+        self.seen = {'website': set(), 'bookmark': set()}
+        self.stats = {'processed': 0, 'created': 0, 'skipped': 0, 'invalid': 0}
+
+        # 已有的收藏夹、分类、标签各一次查询载入
+        self.collections = {}
+        for collection in Collection.objects.filter(user=user).order_by('created_at'):
+            self.collections.setdefault(collection.name, collection)
+        self.default_collection = None
+        self.categories = {
+            (category.parent_id, category.name): category
+            for category in Category.objects.filter(user=user)
+        }
+        self.tags = {tag.name: tag for tag in Tag.objects.filter(user=user)}
+
+    def run(self, entries):
+        for chunk in _chunked(entries, CHUNK_SIZE):
+            with transaction.atomic():
+                self.import_chunk(chunk)
+            if self.progress:
+                self.progress(self.stats)
+        return self.stats
+
+    def kind_of(self, entry):
+        """条目类型；导出文件中的笔记、标签等其他类型返回 None"""
+        kind = entry['kind']
+        if not kind:
+            return 'website' if self.target == 'websites' else 'bookmark'
+        return kind if kind in ('website', 'bookmark') else None
+
+    def is_valid(self, entry, kind):
+        url = entry['url']
+        if not url or len(url) > self.url_max_length[kind]:
+            return False
+        try:
+            self.validate_url(url)
+        except ValidationError:
+            return False
+        return True
+
+    def import_chunk(self, chunk):
+        grouped = {'website': [], 'bookmark': []}
+        for entry in chunk:
+            self.stats['processed'] += 1
+            kind = self.kind_of(entry)
+            if kind is None:
+                self.stats['skipped'] += 1
+                continue
+            if not self.is_valid(entry, kind):
+                self.stats['invalid'] += 1
+                continue
+            entry['url_hash'] = url_hash(entry['url'])
+            if entry['url_hash'] in self.seen[kind]:
+                self.stats['skipped'] += 1
+                continue
+            self.seen[kind].add(entry['url_hash'])
+            grouped[kind].append(entry)
+
+        if grouped['website']:
+            self.create_websites(self.without_existing(Website, grouped['website']))
+        if grouped['bookmark']:
+            self.create_bookmarks(self.without_existing(Bookmark, grouped['bookmark']))
+
+    def without_existing(self, model, entries):
+        """剔除账户中已有的链接（每批一次查询）"""
+        existing = set(
+            model.objects.filter(user=self.user, url_hash__in=[entry['url_hash'] for entry in entries])
+            .values_list('url_hash', flat=True)
+        )
+        self.stats['skipped'] += sum(1 for entry in entries if entry['url_hash'] in existing)
+        return [entry for entry in entries if entry['url_hash'] not in existing]
+
+    # 书签
+
+    def collection_for(self, folders):
+        if not folders:
+            return self.get_default_collection()
+        return self.collections[_truncate(Collection, 'name', folders[-1])]
+
+    def get_default_collection(self):
+        if self.default_collection is None:
+            self.default_collection, _ = Collection.objects.get_or_create(
+                user=self.user,
+                is_default=True,
+                defaults={'name': '默认收藏夹', 'description': '系统默认收藏夹'}
+            )
+        return self.default_collection
+
+    def ensure_collections(self, entries):
+        names = {
+            _truncate(Collection, 'name', entry['folders'][-1])
+            for entry in entries if entry['folders']
+        }
+        missing = [Collection(name=name, user=self.user) for name in sorted(names - set(self.collections))]
+        for collection in Collection.objects.bulk_create(missing):
+            self.collections[collection.name] = collection
+        record_changes(self.user.id, Collection, [collection.id for collection in missing])
+
+    def create_bookmarks(self, entries):
+        if not entries:
+            return
+        self.ensure_collections(entries)
+        bookmarks = [
+            Bookmark(
+                user=self.user,
+                collection=self.collection_for(entry['folders']),
+                url=entry['url'],
+                title=_truncate(Bookmark, 'title', entry['title'] or entry['url']),
+                description=entry['description'],
+                notes=entry['notes'],
+                is_favorite=entry['is_favorite'],
+            )
+            for entry in entries
+        ]
+        attach_resources(bookmarks)
+        Bookmark.objects.bulk_create(bookmarks)
+        adjust_user_counts(self.user.id, bookmarks=len(bookmarks))
+        record_changes(self.user.id, Bookmark, [bookmark.id for bookmark in bookmarks])
+        self.stats['created'] += len(bookmarks)
+
+    # 网站
+
+    def category_for(self, folders):
+        parent_id = None
+        category = None
+        for name in folders:
+            category = self.categories[(parent_id, _truncate(Category, 'name', name))]
+            parent_id = category.id
+        return category
+
+    def ensure_categories(self, entries):
+        """逐层批量创建缺失的分类"""
+        paths = {
+            tuple(_truncate(Category, 'name', name) for name in entry['folders'])
+            for entry in entries if entry['folders']
+        }
+        depth = max((len(path) for path in paths), default=0)
+        for level in range(depth):
+            missing = {}
+            for path in paths:
+                if len(path) <= level:
+                    continue
+                parent = self.category_for(path[:level]) if level else None
+                key = (parent.id if parent else None, path[level])
+                if key not in self.categories and key not in missing:
+                    missing[key] = Category(name=path[level], parent=parent, user=self.user)
+            for category in Category.objects.bulk_create(missing.values()):
+                self.categories[(category.parent_id, category.name)] = category
+            record_changes(self.user.id, Category, [category.id for category in missing.values()])
+
+    def ensure_tags(self, entries):
+        names = {_truncate(Tag, 'name', name) for entry in entries for name in entry['tags']}
+        missing = names - set(self.tags)
+        if not missing:
+            return
+        Tag.objects.bulk_create(
+            [Tag(name=name, user=self.user) for name in missing], ignore_conflicts=True
+        )
+        # ignore_conflicts 不回填主键，补查一次
+        created = []
+        for tag in Tag.objects.filter(user=self.user, name__in=missing):
+            self.tags[tag.name] = tag
+            created.append(tag.id)
+        record_changes(self.user.id, Tag, created)
+
+    def create_websites(self, entries):
+        if not entries:
+            return
+        self.ensure_categories(entries)
+        self.ensure_tags(entries)
+
+        websites = [
+            Website(
+                user=self.user,
+                category=self.category_for(entry['folders']),
+                url=entry['url'],
+                title=_truncate(Website, 'title', entry['title'] or entry['url']),
+                description=entry['description'],
+            )
+            for entry in entries
+        ]
+        attach_resources(websites)
+        Website.objects.bulk_create(websites)
+
+        links = []
+        tag_deltas = {}
+        category_deltas = {}
+        for website, entry in zip(websites, entries):
+            category_deltas[website.category_id] = category_deltas.get(website.category_id, 0) + 1
+            for tag_id in {self.tags[_truncate(Tag, 'name', name)].id for name in entry['tags']}:
+                links.append(Website.tags.through(website_id=website.id, tag_id=tag_id))
+                tag_deltas[tag_id] = tag_deltas.get(tag_id, 0) + 1
+        Website.tags.through.objects.bulk_create(links)
+
+        adjust_category_counts(category_deltas)
+        adjust_tag_counts(tag_deltas)
+        record_changes(self.user.id, Website, [website.id for website in websites])
+        self.stats['created'] += len(websites)
+
+
+def import_file(user, fileobj, import_format, target='bookmarks', progress=None):
+    """解析并导入上传文件，返回统计"""
+    entries = PARSERS[import_format](fileobj)
+    return Importer(user, target=target, progress=progress).run(entries)
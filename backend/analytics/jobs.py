@@ -0,0 +1,118 @@
+"""
+后台导出任务
+
+工作进程认领排队中的导出任务，把流式导出内容边生成边压缩写入临时文件，
+完成后保存到媒体存储（配置 django-storages 时即为对象存储）。
+"""
+import gzip
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from config.db_router import replica_reads
+
+from .exporters import EXPORT_FORMATS, export_chunks
+from .models import ExportJob
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+logger = logging.getLogger(__name__)
+
+# 压缩方式 -> (文件扩展名, Content-Type)
+COMPRESSIONS = {
+    'gzip': ('gz', 'application/gzip'),
+    'zstd': ('zst', 'application/zstd'),
+}
+
+# 处理中超过该时长的任务视为工作进程已退出，重新排队
+STALE_AFTER = timedelta(hours=1)
+# 导出文件保留时长
+RETENTION = timedelta(days=7)
+
+EXPORT_FAILED_MESSAGE = '导出失败，请稍后重试'
+
+
+def available_compressions():
+    return [name for name in COMPRESSIONS if name != 'zstd' or HAS_ZSTD]
+
+
+def _compressor(compression, fileobj):
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).stream_writer(fileobj, closefd=False)
+    return gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6)
+
+
+def export_filename(job):
+    _, _, extension = EXPORT_FORMATS[job.export_format]
+    compressed, _ = COMPRESSIONS[job.compression]
+    return f"export-{job.user_id}-{job.pk}.{extension}.{compressed}"
+
+
+def claim_next_job():
+    """认领一个排队中的任务；多个工作进程并发认领时互不阻塞"""
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_export_job(job):
+    """生成并保存导出文件"""
+    try:
+        with tempfile.TemporaryFile() as temp:
+            compressor = _compressor(job.compression, temp)
+            with compressor, replica_reads(user_id=job.user_id):
+                for chunk in export_chunks(job.user, job.export_types, job.export_format):
+                    compressor.write(chunk.encode('utf-8'))
+            job.file_size = temp.tell()
+            temp.seek(0)
+            job.file.save(export_filename(job), File(temp), save=False)
+
+        job.status = 'completed'
+        job.error = ''
+    except Exception:
+        logger.exception("导出任务 %s 失败", job.pk)
+        job.status = 'failed'
+        # 异常信息可能包含数据库和内部细节，详情见日志
+        job.error = EXPORT_FAILED_MESSAGE
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'file_size', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs():
+    """把长时间停留在处理中的任务重新排队"""
+    return ExportJob.objects.filter(
+        status='running',
+        started_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status='pending', started_at=None)
+
+
+def purge_expired_jobs():
+    """删除超过保留期的任务及其文件"""
+    expired = ExportJob.objects.filter(created_at__lt=timezone.now() - RETENTION)
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
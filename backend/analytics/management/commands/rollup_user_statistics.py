@@ -0,0 +1,69 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from analytics.rollup import BATCH_SIZE, run_rollup
+
+
+def _run_shard(args):
+    shard_count, shard_index, batch_size = args
+    return run_rollup(shard_count=shard_count, shard_index=shard_index, batch_size=batch_size)
+
+
+class Command(BaseCommand):
+    help = '增量汇总用户活动到用户统计（可按用户分片并行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=1,
+            help='分片总数 (默认: 1)'
+        )
+        parser.add_argument(
+            '--shard',
+            type=int,
+            default=None,
+            help='只处理指定分片 (0 ~ shards-1)，用于多节点分别调度'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='本机并行进程数，每个进程处理一个分片 (默认: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'每批读取的活动数 (默认: {BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        shard_count = options['shards']
+        shard = options['shard']
+        workers = options['workers']
+        batch_size = options['batch_size']
+
+        if shard_count < 1 or batch_size < 1 or workers < 1:
+            raise CommandError('分片数、批大小和进程数必须为正整数')
+        if shard is not None and not 0 <= shard < shard_count:
+            raise CommandError(f'分片编号必须在 0 ~ {shard_count - 1} 之间')
+
+        shard_indexes = [shard] if shard is not None else list(range(shard_count))
+        jobs = [(shard_count, index, batch_size) for index in shard_indexes]
+
+        if workers > 1 and len(jobs) > 1:
+            # 子进程不能复用父进程的数据库连接
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(processes=min(workers, len(jobs))) as pool:
+                results = pool.map(_run_shard, jobs)
+        else:
+            results = [_run_shard(job) for job in jobs]
+
+        for (_, index, _), (events, users) in zip(jobs, results):
+            self.stdout.write(f'分片 {index}/{shard_count}: 处理 {events} 条活动，更新 {users} 个用户')
+
+        self.stdout.write(self.style.SUCCESS('用户统计汇总完成'))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.jobs import claim_next_job, purge_expired_jobs, requeue_stale_jobs, run_export_job
+
+
+class Command(BaseCommand):
+    help = '处理后台导出任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='处理完当前排队的任务后退出'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='没有任务时的轮询间隔秒数 (默认: 2)'
+        )
+
+    def handle(self, *args, **options):
+        requeue_stale_jobs()
+        purged = purge_expired_jobs()
+        if purged:
+            self.stdout.write(f'清理过期导出任务 {purged} 个')
+
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            job = run_export_job(job)
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f'导出任务 {job.pk} 完成 ({job.file_size} 字节)'))
+            else:
+                self.stdout.write(self.style.ERROR(f'导出任务 {job.pk} 失败: {job.error}'))
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config import slow_queries
+
+
+class Command(BaseCommand):
+    help = '查看慢查询日志（按 SQL 语句汇总）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='显示的语句数 (默认: 10)'
+        )
+        parser.add_argument(
+            '--recent',
+            action='store_true',
+            help='按时间列出最近的记录而不是汇总'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='清空记录'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            slow_queries.clear()
+            self.stdout.write(self.style.SUCCESS('已清空慢查询记录'))
+            return
+
+        entries = slow_queries.recent()
+        if not entries:
+            self.stdout.write(f'暂无慢查询（阈值 {settings.SLOW_QUERY_MS} ms）')
+            return
+
+        if options['recent']:
+            for entry in entries[:options['limit']]:
+                self.stdout.write(
+                    f"{entry['time']}  {entry['duration_ms']} ms  [{entry['database']}]  {entry['origin'] or '-'}"
+                )
+                self.stdout.write(f"  {entry['sql']}")
+                if entry['params'] is not None:
+                    self.stdout.write(f"  参数: {entry['params']}")
+            return
+
+        groups = slow_queries.summarize(entries)
+        for group in groups[:options['limit']]:
+            self.stdout.write(self.style.WARNING(
+                f"{group['count']} 次  总计 {group['total_ms']} ms  平均 {group['avg_ms']} ms  最长 {group['max_ms']} ms"
+            ))
+            self.stdout.write(f"  {group['sql']}")
+            self.stdout.write(f"  来源: {group['origin'] or '-'}")
+            if group['view']:
+                self.stdout.write(f"  视图: {group['view']}")
+            if group['serializer']:
+                self.stdout.write(f"  序列化器: {group['serializer']}")
+            if group['explain']:
+                self.stdout.write('  执行计划:')
+                for line in group['explain'].splitlines():
+                    self.stdout.write(f'    {line}')
+        self.stdout.write(self.style.SUCCESS(f'共 {len(entries)} 条记录，{len(groups)} 条不同的语句'))
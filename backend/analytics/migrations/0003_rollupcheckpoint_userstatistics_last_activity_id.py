@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='名称')),
+                ('position', models.BigIntegerField(default=0, verbose_name='已处理位置')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '汇总检查点',
+                'verbose_name_plural': '汇总检查点',
+                'db_table': 'rollup_checkpoints',
+            },
+        ),
+        migrations.AddField(
+            model_name='userstatistics',
+            name='last_activity_id',
+            field=models.BigIntegerField(default=0, verbose_name='已汇总活动水位'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analytics', '0003_rollupcheckpoint_userstatistics_last_activity_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '处理中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('export_types', models.JSONField(default=list, verbose_name='导出类型')),
+                ('export_format', models.CharField(default='jsonl', max_length=10, verbose_name='导出格式')),
+                ('compression', models.CharField(choices=[('gzip', 'gzip'), ('zstd', 'zstd')], default='gzip', max_length=10, verbose_name='压缩方式')),
+                ('file', models.FileField(blank=True, upload_to='exports/%Y/%m/', verbose_name='导出文件')),
+                ('file_size', models.BigIntegerField(default=0, verbose_name='文件大小')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '导出任务',
+                'verbose_name_plural': '导出任务',
+                'db_table': 'export_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='export_jobs_status_7c943b_idx'), models.Index(fields=['user', 'created_at'], name='export_jobs_user_id_865ea3_idx')],
+            },
+        ),
+    ]
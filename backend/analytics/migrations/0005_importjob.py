@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analytics', '0004_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', '处理中'), ('completed', '已完成'), ('failed', '失败')], default='running', max_length=20, verbose_name='状态')),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='文件名')),
+                ('import_format', models.CharField(max_length=10, verbose_name='导入格式')),
+                ('target', models.CharField(default='bookmarks', max_length=20, verbose_name='导入目标')),
+                ('processed_count', models.PositiveIntegerField(default=0, verbose_name='已处理条目')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='新建条目')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='跳过条目')),
+                ('invalid_count', models.PositiveIntegerField(default=0, verbose_name='无效条目')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '导入任务',
+                'verbose_name_plural': '导入任务',
+                'db_table': 'import_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='import_jobs_user_id_b64671_idx')],
+            },
+        ),
+    ]
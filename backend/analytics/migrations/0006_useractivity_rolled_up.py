@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-20 05:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def mark_rolled_up(apps, schema_editor):
+    """用户水位及以下的事件已经汇总过"""
+    UserActivity = apps.get_model('analytics', 'UserActivity')
+    UserStatistics = apps.get_model('analytics', 'UserStatistics')
+    watermark = UserStatistics.objects.filter(user_id=OuterRef('user_id')).values('last_activity_id')[:1]
+    UserActivity.objects.filter(id__lte=Subquery(watermark)).update(rolled_up=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useractivity',
+            name='rolled_up',
+            field=models.BooleanField(default=False, verbose_name='已汇总'),
+        ),
+        migrations.RunPython(mark_rolled_up, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(condition=models.Q(('rolled_up', False)), fields=['id'], name='activity_pending_rollup_idx'),
+        ),
+    ]
@@ -32,6 +32,9 @@ class UserActivity(models.Model):
     user_agent = models.TextField(blank=True, verbose_name='用户代理')
     
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    # 由 rollup 汇总后置为 True，见 analytics/rollup.py
+    rolled_up = models.BooleanField(default=False, verbose_name='已汇总')
     
     class Meta:
         verbose_name = '用户活动'
@@ -41,6 +44,7 @@ class UserActivity(models.Model):
         indexes = [
             models.Index(fields=['user', 'activity_type']),
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['id'], condition=models.Q(rolled_up=False), name='activity_pending_rollup_idx'),
         ]
     
     def __str__(self):
@@ -119,6 +123,9 @@ class UserStatistics(models.Model):
     favorite_tags = models.JSONField(default=list, verbose_name='偏好标签')
     browsing_patterns = models.JSONField(default=dict, verbose_name='浏览模式')
     
+    # 增量汇总水位：已汇总的最大 UserActivity.id
+    last_activity_id = models.BigIntegerField(default=0, verbose_name='已汇总活动水位')
+    
     last_updated = models.DateTimeField(auto_now=True, verbose_name='最后更新时间')
     
     class Meta:
@@ -129,6 +136,99 @@ class UserStatistics(models.Model):
     def __str__(self):
         return f"{self.user.username} - 统计"
 
+class RollupCheckpoint(models.Model):
+    """增量汇总检查点"""
+    name = models.CharField(max_length=100, unique=True, verbose_name='名称')
+    position = models.BigIntegerField(default=0, verbose_name='已处理位置')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '汇总检查点'
+        verbose_name_plural = '汇总检查点'
+        db_table = 'rollup_checkpoints'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+class ExportJob(models.Model):
+    """后台导出任务"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs', verbose_name='用户')
+    
+    STATUS_CHOICES = [
+        ('pending', '排队中'),
+        ('running', '处理中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
+    
+    COMPRESSION_CHOICES = [
+        ('gzip', 'gzip'),
+        ('zstd', 'zstd'),
+    ]
+    export_types = models.JSONField(default=list, verbose_name='导出类型')
+    export_format = models.CharField(max_length=10, default='jsonl', verbose_name='导出格式')
+    compression = models.CharField(max_length=10, choices=COMPRESSION_CHOICES, default='gzip', verbose_name='压缩方式')
+    
+    # 导出结果
+    file = models.FileField(upload_to='exports/%Y/%m/', blank=True, verbose_name='导出文件')
+    file_size = models.BigIntegerField(default=0, verbose_name='文件大小')
+    error = models.TextField(blank=True, verbose_name='错误信息')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    
+    class Meta:
+        verbose_name = '导出任务'
+        verbose_name_plural = '导出任务'
+        db_table = 'export_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - 导出 {self.export_format} ({self.get_status_display()})"
+
+class ImportJob(models.Model):
+    """数据导入任务（记录进度和结果）"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs', verbose_name='用户')
+    
+    STATUS_CHOICES = [
+        ('running', '处理中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', verbose_name='状态')
+    
+    file_name = models.CharField(max_length=255, blank=True, verbose_name='文件名')
+    import_format = models.CharField(max_length=10, verbose_name='导入格式')
+    target = models.CharField(max_length=20, default='bookmarks', verbose_name='导入目标')
+    
+    # 进度
+    processed_count = models.PositiveIntegerField(default=0, verbose_name='已处理条目')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='新建条目')
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name='跳过条目')
+    invalid_count = models.PositiveIntegerField(default=0, verbose_name='无效条目')
+    error = models.TextField(blank=True, verbose_name='错误信息')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    
+    class Meta:
+        verbose_name = '导入任务'
+        verbose_name_plural = '导入任务'
+        db_table = 'import_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - 导入 {self.file_name} ({self.get_status_display()})"
+
 class SearchLog(models.Model):
     """搜索日志"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
@@ -0,0 +1,162 @@
+"""
+用户统计增量汇总
+
+按主键顺序消费尚未汇总的 UserActivity 事件，把它们累加到 UserStatistics 的
+时间分布和偏好字段中，并在同一事务中把事件标记为已汇总。
+
+主键在插入时分配，长事务中较小的主键可能晚于较大的主键提交，按主键推进的位置会永久跳过它；
+改为按标记选取后，晚提交的事件在下一次汇总时仍是未汇总状态。未汇总事件有部分索引，
+每批只读取这部分。检查点行用来串行化同一分片的并发执行，position 记录最近汇总的主键。
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from .models import RollupCheckpoint, UserActivity, UserStatistics
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+FAVORITES_LIMIT = 10
+
+# 计入访问次数的活动类型
+VISIT_ACTIVITY_TYPES = {'bookmark_visit'}
+
+ROLLUP_FIELDS = [
+    'login_count', 'total_visits', 'active_days', 'avg_daily_visits',
+    'activity_by_hour', 'activity_by_day', 'activity_by_month',
+    'favorite_categories', 'favorite_tags', 'browsing_patterns',
+    'last_activity_id', 'last_updated',
+]
+
+
+def checkpoint_name(shard_count=1, shard_index=0):
+    """分片检查点名称"""
+    return f"user_statistics:{shard_count}:{shard_index}"
+
+
+def _increment(mapping, key, amount=1):
+    mapping[key] = mapping.get(key, 0) + amount
+
+
+def _top(counts, limit=FAVORITES_LIMIT):
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [{'name': name, 'count': count} for name, count in ranked]
+
+
+def apply_event(stats, event):
+    """把单个活动事件累加到用户统计上"""
+    created_at = timezone.localtime(event['created_at'])
+    activity_type = event['activity_type']
+    metadata = event['metadata'] or {}
+    patterns = stats.browsing_patterns
+
+    _increment(stats.activity_by_hour, str(created_at.hour))
+    _increment(stats.activity_by_day, created_at.date().isoformat())
+    _increment(stats.activity_by_month, created_at.strftime('%Y-%m'))
+    _increment(patterns.setdefault('activity_types', {}), activity_type)
+    _increment(patterns.setdefault('weekdays', {}), str(created_at.isoweekday()))
+
+    if activity_type == 'login':
+        stats.login_count += 1
+
+    if activity_type in VISIT_ACTIVITY_TYPES:
+        stats.total_visits += 1
+        category = metadata.get('category')
+        if category:
+            _increment(patterns.setdefault('category_counts', {}), category)
+        for tag in metadata.get('tags') or []:
+            _increment(patterns.setdefault('tag_counts', {}), tag)
+
+    stats.last_activity_id = max(stats.last_activity_id, event['id'])
+
+
+def refresh_derived(stats):
+    """根据累加结果重新计算派生字段"""
+    stats.active_days = len(stats.activity_by_day)
+    stats.avg_daily_visits = (
+        stats.total_visits / stats.active_days if stats.active_days else 0.0
+    )
+    patterns = stats.browsing_patterns
+    stats.favorite_categories = _top(patterns.get('category_counts', {}))
+    stats.favorite_tags = _top(patterns.get('tag_counts', {}))
+    stats.last_updated = timezone.now()
+
+
+def _load_statistics(user_ids):
+    """加锁读取用户统计，不存在时创建"""
+    existing = set(
+        UserStatistics.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+    )
+    missing = [UserStatistics(user_id=user_id) for user_id in user_ids if user_id not in existing]
+    if missing:
+        UserStatistics.objects.bulk_create(missing, ignore_conflicts=True)
+
+    return {
+        stats.user_id: stats
+        for stats in UserStatistics.objects.select_for_update().filter(user_id__in=user_ids)
+    }
+
+
+def _fold_batch(events):
+    """把一批事件按用户累加并写回"""
+    by_user = defaultdict(list)
+    for event in events:
+        by_user[event['user_id']].append(event)
+
+    statistics = _load_statistics(list(by_user))
+    changed = []
+    for user_id, user_events in by_user.items():
+        stats = statistics[user_id]
+        for event in user_events:
+            apply_event(stats, event)
+        refresh_derived(stats)
+        changed.append(stats)
+
+    if changed:
+        UserStatistics.objects.bulk_update(changed, ROLLUP_FIELDS)
+    return len(changed)
+
+
+def run_rollup(shard_count=1, shard_index=0, batch_size=BATCH_SIZE, max_batches=None):
+    """
+    执行一个分片的增量汇总
+
+    按 user_id 对 shard_count 取模分片，各分片拥有独立检查点，可由不同进程并行执行。
+    返回 (处理事件数, 更新用户数)。
+    """
+    name = checkpoint_name(shard_count, shard_index)
+    checkpoint, _ = RollupCheckpoint.objects.get_or_create(name=name)
+
+    events_total = 0
+    users_total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            checkpoint = RollupCheckpoint.objects.select_for_update().get(pk=checkpoint.pk)
+            queryset = UserActivity.objects.filter(rolled_up=False)
+            if shard_count > 1:
+                queryset = queryset.annotate(shard=Mod('user_id', shard_count)).filter(shard=shard_index)
+            events = list(
+                queryset.order_by('id').values(
+                    'id', 'user_id', 'activity_type', 'created_at', 'metadata'
+                )[:batch_size]
+            )
+            if not events:
+                break
+
+            users_total += _fold_batch(events)
+            UserActivity.objects.filter(id__in=[event['id'] for event in events]).update(rolled_up=True)
+            events_total += len(events)
+            checkpoint.position = events[-1]['id']
+            checkpoint.save(update_fields=['position', 'updated_at'])
+
+        batches += 1
+        if len(events) < batch_size:
+            break
+
+    logger.info("统计汇总完成: 分片=%s 事件=%s 用户=%s", name, events_total, users_total)
+    return events_total, users_total
@@ -0,0 +1,59 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .exporters import EXPORT_FORMATS, EXPORT_SOURCES
+from .jobs import available_compressions
+from .models import ExportJob, ImportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """导出任务序列化器"""
+    export_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(EXPORT_SOURCES)),
+        required=False,
+    )
+    export_format = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='jsonl')
+    compression = serializers.ChoiceField(choices=available_compressions(), default='gzip')
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'export_types', 'export_format', 'compression', 'status',
+            'file_size', 'error', 'download_url',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'status', 'file_size', 'error', 'created_at', 'started_at', 'finished_at'
+        ]
+    
+    def validate_export_types(self, value):
+        """去重并保持顺序"""
+        return list(dict.fromkeys(value))
+    
+    def validate(self, attrs):
+        # 未指定或为空时导出全部类型
+        if not attrs.get('export_types'):
+            attrs['export_types'] = list(EXPORT_SOURCES)
+        return attrs
+    
+    def get_download_url(self, obj):
+        """下载地址经过权限校验的接口，不直接暴露存储地址"""
+        if obj.status != 'completed' or not obj.file:
+            return None
+        url = reverse('export-job-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """导入任务序列化器"""
+    
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'status', 'file_name', 'import_format', 'target',
+            'processed_count', 'created_count', 'skipped_count', 'invalid_count',
+            'error', 'created_at', 'finished_at'
+        ]
+        read_only_fields = fields
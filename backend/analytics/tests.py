@@ -1,3 +1,357 @@
-from django.test import TestCase
+import gzip
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from config import slow_queries
+from users.models import User
+from websites.models import Category, Tag, Website
+from bookmarks.models import Bookmark, Collection
+from .exporters import export_chunks
+from .importers import IMPORT_FAILED_MESSAGE
+from .jobs import claim_next_job, run_export_job
+from .models import RollupCheckpoint, UserActivity, UserStatistics
+from .rollup import checkpoint_name, run_rollup
+
+
+class ExportJobTests(APITestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(50):
+            Website.objects.create(title=f'site {i}', url=f'https://example.com/{i}', user=self.user)
+
+    def create_completed_job(self):
+        response = self.client.post('/api/analytics/export-jobs/', {'export_format': 'jsonl'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertIsNone(response.data['download_url'])
+        run_export_job(claim_next_job())
+        return self.client.get(f"/api/analytics/export-jobs/{response.data['id']}/").data
+
+    def test_job_produces_compressed_file(self):
+        job = self.create_completed_job()
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['export_types'], ['websites', 'bookmarks', 'notes', 'tags', 'collections'])
+
+        response = self.client.get(job['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 50)
+        self.assertEqual(json.loads(lines[0])['type'], 'website')
+
+    def test_range_download_resumes(self):
+        job = self.create_completed_job()
+        full = b''.join(self.client.get(job['download_url']).streaming_content)
+        etag = self.client.get(job['download_url'])['ETag']
+
+        response = self.client.get(job['download_url'], HTTP_RANGE='bytes=10-', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-{len(full) - 1}/{len(full)}')
+        self.assertEqual(full[:10] + b''.join(response.streaming_content), full)
+
+        # If-Range 不匹配时返回完整文件
+        response = self.client.get(job['download_url'], HTTP_RANGE='bytes=10-', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(job['download_url'], HTTP_RANGE=f'bytes={len(full)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_jobs_are_private(self):
+        job = self.create_completed_job()
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(job['download_url']).status_code, 404)
+
+
+NETSCAPE_FILE = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3>开发</H3>
+    <DL><p>
+        <DT><A HREF="https://docs.djangoproject.com/" ADD_DATE="1700000000" TAGS="python,django">Django &amp; docs</A>
+        <DD>Web framework
+        <DT><H3>前端</H3>
+        <DL><p>
+            <DT><A HREF="https://vuejs.org/">Vue</A>
+        </DL><p>
+    </DL><p>
+    <DT><A HREF="https://example.com/">Example</A>
+    <DT><A HREF="javascript:void(0)">Bookmarklet</A>
+    <DT><A HREF="https://example.com/">Example again</A>
+</DL><p>
+"""
+
+
+class ImportTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post('/api/analytics/import/', {'file': upload, **data}, format='multipart')
+
+    def test_netscape_bookmarks(self):
+        response = self.upload('bookmarks.html', NETSCAPE_FILE)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 3)
+        self.assertEqual(response.data['skipped_count'], 1)
+        self.assertEqual(response.data['invalid_count'], 1)
+
+        django = Bookmark.objects.get(url='https://docs.djangoproject.com/')
+        self.assertEqual(django.title, 'Django & docs')
+        self.assertEqual(django.description, 'Web framework')
+        self.assertEqual(django.collection.name, '开发')
+        self.assertEqual(Bookmark.objects.get(url='https://vuejs.org/').collection.name, '前端')
+        self.assertTrue(Bookmark.objects.get(url='https://example.com/').collection.is_default)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_bookmarks, 3)
+        self.assertTrue(UserActivity.objects.filter(user=self.user, activity_type='import').exists())
+
+        # 再次导入时全部跳过
+        response = self.upload('bookmarks.html', NETSCAPE_FILE)
+        self.assertEqual(response.data['created_count'], 0)
+        self.assertEqual(Bookmark.objects.count(), 3)
+
+    def test_netscape_websites(self):
+        existing = Tag.objects.create(name='python', user=self.user)
+        response = self.upload('bookmarks.html', NETSCAPE_FILE, target='websites')
+        self.assertEqual(response.status_code, 201)
+
+        django = Website.objects.get(url='https://docs.djangoproject.com/')
+        self.assertEqual(django.category.name, '开发')
+        self.assertEqual(sorted(django.tags.values_list('name', flat=True)), ['django', 'python'])
+        vue = Website.objects.get(url='https://vuejs.org/')
+        self.assertEqual(vue.category.get_full_path(), '开发 > 前端')
+        self.assertIsNone(Website.objects.get(url='https://example.com/').category)
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.usage_count, 1)
+        self.assertEqual(django.category.website_count, 1)
+
+    def test_json_document_is_streamed(self):
+        document = '\ufeff' + json.dumps({
+            'websites': [{'url': 'https://example.com/a', 'title': 'a'}],
+            'bookmarks': [{'url': 'https://example.com/b', 'title': 'b'}],
+        })
+        response = self.upload('export.json', document, target='websites')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertTrue(Website.objects.filter(url='https://example.com/a').exists())
+        self.assertTrue(Bookmark.objects.filter(url='https://example.com/b').exists())
+
+    def test_failure_does_not_leak_exception_text(self):
+        response = self.upload('broken.json', '[{"url": "https://example.com/", "title": ')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], IMPORT_FAILED_MESSAGE)
+
+    def test_export_round_trip(self):
+        for i in range(5):
+            Website.objects.create(title=f'site {i}', url=f'https://example.com/{i}', user=self.user)
+        exported = ''.join(export_chunks(self.user, ['websites'], 'csv'))
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.client.force_authenticate(other)
+
+        response = self.upload('export.csv', exported)
+        self.assertEqual(response.data['created_count'], 5)
+        self.assertEqual(Website.objects.filter(user=other).count(), 5)
+
+    def test_large_import_uses_chunked_queries(self):
+        lines = [
+            json.dumps({'title': f'link {i}', 'url': f'https://example.com/{i}', 'collection': f'folder {i % 10}'})
+            for i in range(3000)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.upload('links.jsonl', '\n'.join(lines))
+        self.assertEqual(response.data['created_count'], 3000)
+        # SQLite 会按参数上限拆分批量 INSERT，只统计其余查询；
+        # 每块记录同步变更时另有锁定用户行和读取最大序号两条查询
+        queries = [q['sql'] for q in context.captured_queries if not q['sql'].startswith('INSERT')]
+        self.assertLess(len(queries), 40)
+        self.assertEqual(sum(1 for sql in queries if sql.startswith('SELECT "bookmarks"."url_hash"')), 3)
+        self.assertEqual(Collection.objects.filter(user=self.user).count(), 10)
+
+        job = self.client.get(f"/api/analytics/import-jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['processed_count'], 3000)
+
+
+
+class RollupTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', email='t@example.com', password='pass12345')
+        self.category = Category.objects.create(user=self.user, name='工具')
+        self.website = Website.objects.create(
+            user=self.user, title='Example', url='https://example.com/', category=self.category
+        )
+        self.website.tags.add(Tag.objects.create(user=self.user, name='python'))
+
+    def visit(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(f'/api/websites/{self.website.pk}/').status_code, 200)
+        self.client.force_authenticate(None)
+
+    def test_visits_and_logins_are_recorded_at_the_source(self):
+        response = self.client.post('/api/users/login/', {'username': 'tester', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        self.visit()
+
+        visit = UserActivity.objects.get(activity_type='bookmark_visit')
+        self.assertEqual(visit.metadata['category'], '工具')
+        self.assertEqual(visit.metadata['tags'], ['python'])
+        self.assertTrue(UserActivity.objects.filter(user=self.user, activity_type='login').exists())
+
+        self.assertEqual(run_rollup(), (2, 1))
+        stats = UserStatistics.objects.get(user=self.user)
+        self.assertEqual(stats.login_count, 1)
+        self.assertEqual(stats.total_visits, 1)
+        self.assertEqual(stats.favorite_categories, [{'name': '工具', 'count': 1}])
+        self.assertEqual(stats.favorite_tags, [{'name': 'python', 'count': 1}])
+
+    def test_rerun_does_not_double_count(self):
+        self.visit()
+        run_rollup()
+        self.assertEqual(run_rollup(), (0, 0))
+
+        # 已汇总的事件有标记，与检查点位置无关
+        RollupCheckpoint.objects.filter(name=checkpoint_name()).update(position=0)
+        self.visit()
+        self.assertEqual(run_rollup(), (1, 1))
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_visits, 2)
+
+    def test_events_committed_out_of_order_are_not_skipped(self):
+        # 模拟长事务：主键较小的事件在较大主键的事件汇总之后才提交
+        other = User.objects.create_user(username='other', email='o@example.com', password='pass12345')
+        UserActivity.objects.create(id=100, user=self.user, activity_type='bookmark_visit', metadata={})
+        UserActivity.objects.create(id=101, user=other, activity_type='bookmark_visit', metadata={})
+        self.assertEqual(run_rollup(), (2, 2))
+
+        for user in (self.user, other):
+            UserActivity.objects.create(id=50 + user.id, user=user, activity_type='bookmark_visit', metadata={})
+        self.assertEqual(run_rollup(), (2, 2))
+        for user in (self.user, other):
+            self.assertEqual(UserStatistics.objects.get(user=user).total_visits, 2)
+        self.assertEqual(run_rollup(), (0, 0))
+
+    def test_batches_advance_the_checkpoint(self):
+        for _ in range(5):
+            self.visit()
+        self.assertEqual(run_rollup(batch_size=2, max_batches=1), (2, 1))
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_visits, 2)
+        self.assertEqual(run_rollup(batch_size=2)[0], 3)
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_visits, 5)
+
+    def test_shards_cover_every_user_once(self):
+        other = User.objects.create_user(username='other', email='o@example.com', password='pass12345')
+        for user in (self.user, other):
+            UserActivity.objects.create(user=user, activity_type='bookmark_visit', metadata={})
+
+        out = StringIO()
+        call_command('rollup_user_statistics', '--shards', '2', stdout=out)
+        self.assertIn('用户统计汇总完成', out.getvalue())
+        self.assertEqual(
+            sorted(RollupCheckpoint.objects.values_list('name', flat=True)),
+            [checkpoint_name(2, 0), checkpoint_name(2, 1)],
+        )
+        for user in (self.user, other):
+            self.assertEqual(UserStatistics.objects.get(user=user).total_visits, 1)
+
+        call_command('rollup_user_statistics', '--shards', '2', stdout=StringIO())
+        for user in (self.user, other):
+            self.assertEqual(UserStatistics.objects.get(user=user).total_visits, 1)
+
+
+@override_settings(SLOW_QUERY_MS=0.001, SLOW_QUERY_EXPLAIN_RATE=1)
+class SlowQueryLogTests(APITestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 阈值极低时每条查询都会输出 WARNING，测试中不需要
+        patcher = mock.patch.object(slow_queries.logger, 'warning')
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        super().setUpClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', email='t@example.com', password='pass12345')
+        self.client.force_authenticate(self.user)
+        Website.objects.create(user=self.user, title='Example', url='https://example.com/')
+        slow_queries.clear()
+
+    def tearDown(self):
+        slow_queries.clear()
+
+    def test_records_origin_and_explain(self):
+        response = self.client.get('/api/websites/search/', {'q': 'exam'})
+        self.assertEqual(response.status_code, 200)
+
+        entries = [entry for entry in slow_queries.recent() if 'LIKE' in entry['sql']]
+        self.assertEqual(len(entries), 1)
+        entry = entries[0]
+        self.assertEqual(entry['database'], 'default')
+        self.assertIsNone(entry['params'])
+        self.assertTrue(entry['view'].startswith('websites/views.py:search_websites'))
+        self.assertEqual(entry['serializer'], 'WebsiteListSerializer(many=True)')
+        self.assertIn('websites', entry['explain'])
+
+    @override_settings(SLOW_QUERY_LOG_PARAMS=True)
+    def test_params_are_recorded_when_enabled(self):
+        self.client.get('/api/websites/search/', {'q': 'exam'})
+        entry = next(entry for entry in slow_queries.recent() if 'LIKE' in entry['sql'])
+        self.assertIn('%exam%', entry['params'])
+
+    def test_explain_literals_are_redacted(self):
+        with mock.patch.object(slow_queries, '_explain', return_value="Filter: (title ~~ '%it''s secret%'::text)"):
+            self.client.get('/api/websites/search/', {'q': 'secret'})
+        entry = next(entry for entry in slow_queries.recent() if 'LIKE' in entry['sql'])
+        self.assertEqual(entry['explain'], "Filter: (title ~~ '?'::text)")
+        self.assertNotIn('secret', json.dumps(slow_queries.recent()))
+
+    def test_management_command(self):
+        self.client.get('/api/websites/search/', {'q': 'exam'})
+        out = StringIO()
+        call_command('slow_queries', stdout=out)
+        self.assertIn('websites/views.py:search_websites', out.getvalue())
+
+        call_command('slow_queries', '--clear', stdout=StringIO())
+        self.assertEqual(slow_queries.recent(), [])
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_disabled(self):
+        self.client.get('/api/websites/search/', {'q': 'exam'})
+        self.assertEqual(slow_queries.recent(), [])
+
+    def test_admin_page(self):
+        self.client.get('/api/websites/search/', {'q': 'exam'})
+        admin_user = User.objects.create_superuser(username='admin', email='a@example.com', password='pass12345')
+        self.client.force_login(admin_user)
+        response = self.client.get('/admin/slow-queries/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'search_websites')
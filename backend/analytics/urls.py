@@ -4,4 +4,11 @@ from . import views
 urlpatterns = [
     # 暂时注释掉，等视图实现后再启用
     # path('dashboard/', views.DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('export/', views.export_data, name='export-data'),
+    path('export-jobs/', views.ExportJobListCreateView.as_view(), name='export-job-list'),
+    path('export-jobs/<int:pk>/', views.ExportJobDetailView.as_view(), name='export-job-detail'),
+    path('export-jobs/<int:pk>/download/', views.download_export_job, name='export-job-download'),
+    path('import/', views.import_data, name='import-data'),
+    path('import-jobs/', views.ImportJobListView.as_view(), name='import-job-list'),
+    path('import-jobs/<int:pk>/', views.ImportJobDetailView.as_view(), name='import-job-detail'),
 ]
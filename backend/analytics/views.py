@@ -1,7 +1,11 @@
 from django.db.models import Count, Sum, Avg, Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import http_date, quote_etag
 from django.utils import timezone
 from datetime import timedelta, datetime
 from rest_framework import permissions, status
+from rest_framework import generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -10,6 +14,13 @@ import logging
 from users.models import User
 from websites.models import Website, Category, Tag
 from bookmarks.models import Bookmark, Collection
+from config.db_router import iterate_on_replica
+from config.throttling import throttle_scope
+from .exporters import DEFAULT_SOURCES, EXPORT_FORMATS, EXPORT_SOURCES, export_chunks
+from .importers import IMPORT_FAILED_MESSAGE, IMPORT_FORMATS, IMPORT_TARGETS, detect_format, import_file
+from .jobs import COMPRESSIONS, export_filename
+from .models import ExportJob, ImportJob, UserActivity
+from .serializers import ExportJobSerializer, ImportJobSerializer
 
 logger = logging.getLogger(__name__)
 
@@ -123,28 +134,24 @@ class CategoryAnalysisView(APIView):
             user = request.user
             
             # 分类统计
-            categories = Category.objects.filter(user=user).annotate(
-                websites_count=Count('websites')
-            ).order_by('-websites_count')[:10]
+            categories = Category.objects.filter(user=user).order_by('-website_count')[:10]
             
             category_stats = []
             for category in categories:
                 category_stats.append({
                     'name': category.name,
-                    'count': category.websites_count,
+                    'count': category.website_count,
                     'color': category.color,
                 })
             
             # 标签统计
-            tags = Tag.objects.filter(user=user).annotate(
-                websites_count=Count('websites')
-            ).order_by('-websites_count')[:20]
+            tags = Tag.objects.filter(user=user).order_by('-usage_count')[:20]
             
             tag_stats = []
             for tag in tags:
                 tag_stats.append({
                     'name': tag.name,
-                    'count': tag.websites_count,
+                    'count': tag.usage_count,
                     'color': tag.color,
                 })
             
@@ -216,50 +223,286 @@ class PopularContentView(APIView):
             )
 
 
+@throttle_scope('bulk')
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def export_data(request):
-    """导出数据"""
+    """
+    导出数据
+    
+    以流式响应输出，数据边读边写，内存占用不随账户数据量增长。
+    查询参数 type: all（网站和书签）/ websites / bookmarks / notes / tags / collections；
+    export_format: json（默认）/ jsonl / csv / html（Netscape 书签格式）
+    """
     try:
         user = request.user
         export_type = request.GET.get('type', 'all')
+        export_format = request.GET.get('export_format', 'json')
         
-        data = {}
+        if export_type == 'all':
+            sources = DEFAULT_SOURCES
+        elif export_type in EXPORT_SOURCES:
+            sources = [export_type]
+        else:
+            return Response(
+                {'error': '不支持的导出类型'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        if export_type in ['all', 'websites']:
-            websites = Website.objects.filter(user=user).select_related('category').prefetch_related('tags')
-            data['websites'] = []
-            for website in websites:
-                data['websites'].append({
-                    'title': website.title,
-                    'url': website.url,
-                    'description': website.description,
-                    'category': website.category.name if website.category else '',
-                    'tags': [tag.name for tag in website.tags.all()],
-                    'visit_count': website.visit_count,
-                    'created_at': website.created_at.isoformat(),
-                })
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': '不支持的导出格式'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        if export_type in ['all', 'bookmarks']:
-            bookmarks = Bookmark.objects.filter(user=user).select_related('collection')
-            data['bookmarks'] = []
-            for bookmark in bookmarks:
-                data['bookmarks'].append({
-                    'title': bookmark.title,
-                    'url': bookmark.url,
-                    'description': bookmark.description,
-                    'notes': bookmark.notes,
-                    'collection': bookmark.collection.name,
-                    'is_favorite': bookmark.is_favorite,
-                    'visit_count': bookmark.visit_count,
-                    'created_at': bookmark.created_at.isoformat(),
-                })
+        _, content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            iterate_on_replica(export_chunks(user, sources, export_format), user_id=user.pk),
+            content_type=content_type
+        )
+        filename = f"export-{timezone.localdate().isoformat()}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # 禁止反向代理缓冲，让数据尽快到达客户端
+        response['X-Accel-Buffering'] = 'no'
         
-        return Response(data)
+        UserActivity.objects.create(
+            user=user,
+            activity_type='export',
+            description=f'导出数据 ({export_type}, {export_format})',
+            metadata={'type': export_type, 'format': export_format},
+        )
+        return response
         
     except Exception as e:
         logger.error(f"导出数据失败: {str(e)}")
         return Response(
             {'error': '导出数据失败'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+class ExportJobListCreateView(generics.ListCreateAPIView):
+    """导出任务列表和创建：创建后由 run_export_jobs 工作进程在后台生成文件"""
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        job = serializer.save(user=self.request.user)
+        UserActivity.objects.create(
+            user=self.request.user,
+            activity_type='export',
+            description=f'创建导出任务 ({job.export_format}, {job.compression})',
+            metadata={'job_id': job.id, 'types': job.export_types, 'format': job.export_format},
+        )
+
+
+class ExportJobDetailView(generics.RetrieveDestroyAPIView):
+    """导出任务详情（轮询状态）和删除"""
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user)
+    
+    def perform_destroy(self, instance):
+        if instance.file:
+            instance.file.delete(save=False)
+        instance.delete()
+
+
+def _parse_range(header, size):
+    """
+    解析单段 Range 请求头，返回 (起始, 结束)（闭区间）
+
+    不是 bytes 单位或包含多段时返回 None（按完整响应处理）；
+    范围无法满足时抛出 ValueError。
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, sep, end = header[len('bytes='):].strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if start == '':
+            # 后缀范围：最后 N 个字节
+            length = int(end)
+            if length <= 0:
+                raise ValueError
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        raise ValueError('无效的范围')
+    if start >= size or end < start:
+        raise ValueError('无效的范围')
+    return start, min(end, size - 1)
+
+
+def _file_iterator(fileobj, start, length, chunk_size=64 * 1024):
+    try:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = fileobj.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        fileobj.close()
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def download_export_job(request, pk):
+    """
+    下载导出文件
+    
+    支持 Range 断点续传：单段范围返回 206，If-Range 与 ETag 不一致时返回完整文件。
+    """
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user)
+    if job.status != 'completed' or not job.file:
+        return Response(
+            {'error': '导出文件尚未生成'},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    try:
+        size = job.file.size
+        etag = quote_etag(f"{job.pk}-{size}-{int(job.finished_at.timestamp())}")
+        _, content_type = COMPRESSIONS[job.compression]
+        
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range and if_range != etag:
+            # 文件已变化，忽略 Range 返回完整内容
+            range_header = None
+        
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        
+        fileobj = job.file.open('rb')
+        if byte_range is None:
+            response = FileResponse(fileobj, content_type=content_type)
+            response['Content-Length'] = str(size)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _file_iterator(fileobj, start, end - start + 1),
+                status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type=content_type
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(job.finished_at.timestamp())
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(job)}"'
+        return response
+        
+    except Exception as e:
+        logger.error(f"下载导出文件失败: {str(e)}")
+        return Response(
+            {'error': '下载导出文件失败'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@throttle_scope('bulk')
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def import_data(request):
+    """
+    导入数据
+    
+    multipart 上传 file，可选 import_format（html / json / jsonl / csv，默认按扩展名识别）
+    和 target（bookmarks（默认）/ websites）。导入按批提交，处理过程中可通过
+    导入任务详情接口查看进度；已存在的链接会被跳过。
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response(
+            {'error': '请上传导入文件'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    import_format = request.data.get('import_format') or detect_format(upload.name)
+    if import_format not in IMPORT_FORMATS:
+        return Response(
+            {'error': '不支持的导入格式'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    target = request.data.get('target', 'bookmarks')
+    if target not in IMPORT_TARGETS:
+        return Response(
+            {'error': '不支持的导入目标'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    job = ImportJob.objects.create(
+        user=request.user,
+        file_name=upload.name[:255],
+        import_format=import_format,
+        target=target,
+    )
+    
+    def report(stats):
+        ImportJob.objects.filter(pk=job.pk).update(
+            processed_count=stats['processed'],
+            created_count=stats['created'],
+            skipped_count=stats['skipped'],
+            invalid_count=stats['invalid'],
+        )
+    
+    try:
+        import_file(request.user, upload, import_format, target=target, progress=report)
+        job.refresh_from_db()
+        job.status = 'completed'
+    except Exception as e:
+        logger.error(f"导入数据失败: {str(e)}")
+        job.refresh_from_db()
+        job.status = 'failed'
+        # 异常信息可能包含数据库和内部细节，只记录日志
+        job.error = IMPORT_FAILED_MESSAGE
+    
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    
+    UserActivity.objects.create(
+        user=request.user,
+        activity_type='import',
+        description=f'导入数据 ({upload.name}, 新建 {job.created_count} 条)',
+        metadata={'job_id': job.id, 'format': import_format, 'target': target},
+    )
+    
+    serializer = ImportJobSerializer(job)
+    if job.status == 'failed':
+        return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ImportJobListView(generics.ListAPIView):
+    """导入任务列表"""
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user)
+
+
+class ImportJobDetailView(generics.RetrieveAPIView):
+    """导入任务详情（查询进度）"""
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user)
@@ -0,0 +1,83 @@
+"""
+书签批量操作
+"""
+from rest_framework import status
+
+from config.bulk import BulkOperationError, BulkOperations, BulkWriter, apply_changes, fast_delete
+from resources.registry import attach_resources
+from users.counters import adjust_user_counts
+
+from .models import Bookmark, Collection
+from .serializers import BookmarkSerializer
+
+
+class BookmarkBulkOperations(BulkOperations):
+    model = Bookmark
+    sync_model = 'bookmarks'
+    messages = {
+        'delete': '已删除 {count} 个书签',
+        'archive': '已归档 {count} 个书签',
+        'unarchive': '已取消归档 {count} 个书签',
+        'favorite': '已收藏 {count} 个书签',
+        'unfavorite': '已取消收藏 {count} 个书签',
+        'move': '已移动 {count} 个书签到 {collection}',
+    }
+
+    def action_delete(self, queryset, ids, params):
+        # 直接删除不触发 post_delete，用户书签数在这里统一扣减
+        deleted = fast_delete(queryset)
+        adjust_user_counts(self.user.id, bookmarks=-deleted)
+
+    def action_archive(self, queryset, ids, params):
+        queryset.update(is_archived=True)
+
+    def action_unarchive(self, queryset, ids, params):
+        queryset.update(is_archived=False)
+
+    def action_favorite(self, queryset, ids, params):
+        queryset.update(is_favorite=True)
+
+    def action_unfavorite(self, queryset, ids, params):
+        queryset.update(is_favorite=False)
+
+    def prepare_move(self, params):
+        collection_id = params.get('collection_id')
+        if not collection_id:
+            raise BulkOperationError('请提供目标收藏夹ID')
+        try:
+            return {'collection': Collection.objects.get(id=collection_id, user=self.user)}
+        except (Collection.DoesNotExist, ValueError):
+            raise BulkOperationError('收藏夹不存在', status.HTTP_404_NOT_FOUND)
+
+    def action_move(self, queryset, ids, params):
+        queryset.update(collection=params['collection'])
+
+
+class BookmarkBulkWriter(BulkWriter):
+    """书签批量创建 / 更新：一条 bulk_create 写入，用户书签数统一调整"""
+    model = Bookmark
+    serializer_class = BookmarkSerializer
+    payload_key = 'bookmarks'
+    sync_model = 'bookmarks'
+
+    def preload(self, items):
+        collection_ids = {
+            item.get('collection') for item in items
+            if isinstance(item.get('collection'), int) and not isinstance(item.get('collection'), bool)
+        }
+        return {
+            Collection: {
+                collection.id: collection
+                for collection in Collection.objects.filter(user=self.user, id__in=collection_ids)
+            },
+        }
+
+    def perform_create(self, validated):
+        bookmarks = [Bookmark(user=self.user, **data) for data in validated]
+        attach_resources(bookmarks)
+        Bookmark.objects.bulk_create(bookmarks)
+        adjust_user_counts(self.user.id, bookmarks=len(bookmarks))
+        return bookmarks
+
+    def perform_update(self, changes):
+        apply_changes(changes)
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from bookmarks.models import Collection, Bookmark
+from config.canonical import url_hash
 
 User = get_user_model()
 
@@ -172,8 +173,9 @@ class Command(BaseCommand):
                 for bookmark_data in collection_info['bookmarks']:
                     bookmark, created = Bookmark.objects.get_or_create(
                         user=user,
-                        url=bookmark_data['url'],
+                        url_hash=url_hash(bookmark_data['url']),
                         defaults={
+                            'url': bookmark_data['url'],
                             'title': bookmark_data['title'],
                             'description': bookmark_data['description'],
                             'collection': collection,
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookmark',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='bookmarks_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:03
+
+from itertools import groupby
+
+from config.canonical import canonicalize_url
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def link_resources(Bookmark, Resource, groups):
+    keys = [key for key, _ in groups]
+    ids = dict(Resource.objects.filter(url_hash__in=keys).values_list('url_hash', 'id'))
+    Resource.objects.bulk_create([
+        Resource(url=canonicalize_url(members[0].url), url_hash=key)
+        for key, members in groups if key not in ids
+    ])
+    ids.update(Resource.objects.filter(url_hash__in=keys).values_list('url_hash', 'id'))
+    bookmarks = []
+    for key, members in groups:
+        for bookmark in members:
+            bookmark.resource_id = ids[key]
+            bookmarks.append(bookmark)
+    Bookmark.objects.bulk_update(bookmarks, ['resource'])
+
+
+def attach_resources(apps, schema_editor):
+    Bookmark = apps.get_model('bookmarks', 'Bookmark')
+    Resource = apps.get_model('resources', 'Resource')
+    bookmarks = (
+        Bookmark.objects.only('id', 'url', 'url_hash')
+        .order_by('url_hash', 'id')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    groups = []
+    for key, members in groupby(bookmarks, key=lambda bookmark: bookmark.url_hash):
+        groups.append((key, list(members)))
+        if len(groups) >= BATCH_SIZE:
+            link_resources(Bookmark, Resource, groups)
+            groups = []
+    if groups:
+        link_resources(Bookmark, Resource, groups)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0001_initial'),
+        # 网站迁移先建好带元数据的资源
+        ('websites', '0004_website_resource'),
+        ('bookmarks', '0004_bookmark_url_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookmark',
+            name='resource',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookmarks', to='resources.resource', verbose_name='URL资源'),
+        ),
+        migrations.RunPython(attach_resources, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:20
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    合并规范化 URL 相同的书签，为 (user, url_hash) 唯一约束做准备
+
+    保留最早创建的一条，合并访问次数、收藏标记和笔记后删除其余记录，
+    写入同步删除记录并重算受影响用户的书签数。
+    """
+    Bookmark = apps.get_model('bookmarks', 'Bookmark')
+    User = apps.get_model('users', 'User')
+    ChangeLog = apps.get_model('sync', 'ChangeLog')
+
+    duplicates = (
+        Bookmark.objects.values('user_id', 'url_hash')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    users = set()
+    for row in list(duplicates):
+        bookmarks = list(Bookmark.objects.filter(user_id=row['user_id'], url_hash=row['url_hash']).order_by('id'))
+        keeper, extra = bookmarks[0], bookmarks[1:]
+        extra_ids = [bookmark.id for bookmark in extra]
+
+        keeper.visit_count += sum(bookmark.visit_count for bookmark in extra)
+        visited = [bookmark.last_visited for bookmark in bookmarks if bookmark.last_visited]
+        keeper.last_visited = max(visited) if visited else None
+        keeper.is_favorite = any(bookmark.is_favorite for bookmark in bookmarks)
+        keeper.notes = '\n\n'.join(dict.fromkeys(bookmark.notes for bookmark in bookmarks if bookmark.notes))
+        keeper.save(update_fields=['visit_count', 'last_visited', 'is_favorite', 'notes'])
+
+        Bookmark.objects.filter(id__in=extra_ids).delete()
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(user_id=keeper.user_id, model='bookmarks', object_id=keeper.id, operation='upsert')]
+            + [
+                ChangeLog(user_id=keeper.user_id, model='bookmarks', object_id=pk, operation='delete')
+                for pk in extra_ids
+            ]
+        )
+        users.add(keeper.user_id)
+
+    if users:
+        total_bookmarks = Coalesce(
+            Subquery(
+                Bookmark.objects.filter(user=OuterRef('pk'))
+                .order_by()
+                .values('user')
+                .annotate(total=Count('*'))
+                .values('total'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+        User.objects.filter(id__in=users).update(total_bookmarks=total_bookmarks)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_backfill_change_log'),
+        ('bookmarks', '0005_bookmark_resource'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0006_merge_duplicate_bookmarks'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookmark',
+            name='bookmarks_user_url_hash_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='bookmark',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='bookmark',
+            name='url',
+            field=models.URLField(max_length=2048, verbose_name='网址'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookmark',
+            constraint=models.UniqueConstraint(fields=('user', 'url_hash'), name='bookmarks_user_url_hash_uniq'),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models import F
 from django.conf import settings
 from django.utils import timezone
 
+from config.fields import UrlHashField
+from users.counters import adjust_user_counts
+
 
 class Collection(models.Model):
     """收藏夹模型"""
@@ -31,7 +35,8 @@ class Collection(models.Model):
 class Bookmark(models.Model):
     """书签模型"""
     title = models.CharField(max_length=200, verbose_name='标题')
-    url = models.URLField(verbose_name='网址')
+    url = models.URLField(max_length=2048, verbose_name='网址')
+    url_hash = UrlHashField(verbose_name='URL摘要')
     description = models.TextField(blank=True, verbose_name='描述')
     notes = models.TextField(blank=True, verbose_name='笔记')
     thumbnail = models.URLField(blank=True, verbose_name='缩略图')
@@ -48,6 +53,14 @@ class Bookmark(models.Model):
         related_name='bookmarks',
         verbose_name='用户'
     )
+    resource = models.ForeignKey(
+        'resources.Resource',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bookmarks',
+        verbose_name='URL资源'
+    )
     
     is_favorite = models.BooleanField(default=False, verbose_name='收藏')
     is_archived = models.BooleanField(default=False, verbose_name='归档')
@@ -62,13 +75,22 @@ class Bookmark(models.Model):
         verbose_name_plural = '书签'
         db_table = 'bookmarks'
         ordering = ['-created_at']
-        unique_together = ['user', 'url']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'url_hash'], name='bookmarks_user_url_hash_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', 'id'], name='bookmarks_user_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
     def increment_visit_count(self):
-        """增加访问次数"""
-        self.visit_count += 1
+        """增加访问次数（原子递增，并同步用户访问总数）"""
         self.last_visited = timezone.now()
-        self.save(update_fields=['visit_count', 'last_visited'])
\ No newline at end of file
+        type(self).objects.filter(pk=self.pk).update(
+            visit_count=F('visit_count') + 1,
+            last_visited=self.last_visited,
+        )
+        self.visit_count += 1
+        adjust_user_counts(self.user_id, visits=1)
\ No newline at end of file
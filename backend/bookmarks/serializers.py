@@ -1,10 +1,13 @@
 from rest_framework import serializers
+from config.serializers import (
+    AnnotatedCountField, CountAnnotationMixin, PreloadedPrimaryKeyRelatedField, url_taken
+)
 from .models import Collection, Bookmark
 
 
-class CollectionSerializer(serializers.ModelSerializer):
+class CollectionSerializer(CountAnnotationMixin, serializers.ModelSerializer):
     """收藏夹序列化器"""
-    bookmarks_count = serializers.SerializerMethodField()
+    bookmarks_count = AnnotatedCountField('bookmarks')
     
     class Meta:
         model = Collection
@@ -14,9 +17,6 @@ class CollectionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
     
-    def get_bookmarks_count(self, obj):
-        return obj.bookmarks.count()
-    
     def validate_name(self, value):
         """验证收藏夹名称"""
         user = self.context['request'].user
@@ -36,12 +36,14 @@ class CollectionSerializer(serializers.ModelSerializer):
 
 class BookmarkSerializer(serializers.ModelSerializer):
     """书签序列化器"""
+    collection = PreloadedPrimaryKeyRelatedField(queryset=Collection.objects.all())
     collection_name = serializers.CharField(source='collection.name', read_only=True)
+    favicon = serializers.CharField(source='resource.favicon', read_only=True)
     
     class Meta:
         model = Bookmark
         fields = [
-            'id', 'title', 'url', 'description', 'notes', 'thumbnail',
+            'id', 'title', 'url', 'description', 'notes', 'thumbnail', 'favicon',
             'collection', 'collection_name', 'is_favorite', 'is_archived',
             'visit_count', 'last_visited', 'created_at', 'updated_at'
         ]
@@ -49,23 +51,13 @@ class BookmarkSerializer(serializers.ModelSerializer):
     
     def validate_collection(self, value):
         """验证收藏夹"""
-        if value and value.user != self.context['request'].user:
+        if value and value.user_id != self.context['request'].user.id:
             raise serializers.ValidationError("只能选择自己的收藏夹")
         return value
     
     def validate_url(self, value):
-        """验证URL"""
-        user = self.context['request'].user
-        if self.instance:
-            # 更新时排除自己
-            existing = Bookmark.objects.filter(
-                url=value, user=user
-            ).exclude(id=self.instance.id)
-        else:
-            # 创建时检查重复
-            existing = Bookmark.objects.filter(url=value, user=user)
-        
-        if existing.exists():
+        """验证URL（更新时排除自己）"""
+        if url_taken(self, Bookmark, value):
             raise serializers.ValidationError("该书签已存在")
         return value
     
@@ -78,11 +70,12 @@ class BookmarkSerializer(serializers.ModelSerializer):
 class BookmarkListSerializer(serializers.ModelSerializer):
     """书签列表序列化器（简化版）"""
     collection_name = serializers.CharField(source='collection.name', read_only=True)
+    favicon = serializers.CharField(source='resource.favicon', read_only=True)
     
     class Meta:
         model = Bookmark
         fields = [
-            'id', 'title', 'url', 'description', 'thumbnail',
+            'id', 'title', 'url', 'description', 'thumbnail', 'favicon',
             'collection_name', 'is_favorite', 'is_archived',
             'visit_count', 'last_visited', 'created_at'
         ]
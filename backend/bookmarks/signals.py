@@ -0,0 +1,20 @@
+"""
+书签相关计数器的信号处理
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.counters import adjust_user_counts
+
+from .models import Bookmark
+
+
+@receiver(post_save, sender=Bookmark)
+def update_user_bookmarks_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_user_counts(instance.user_id, bookmarks=1)
+
+
+@receiver(post_delete, sender=Bookmark)
+def update_user_bookmarks_on_delete(sender, instance, **kwargs):
+    adjust_user_counts(instance.user_id, bookmarks=-1)
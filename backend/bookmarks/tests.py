@@ -1,3 +1,123 @@
-from django.test import TestCase
+from websites.tests import ListQueryCountTestCase
 
-# Create your tests here.
+from .models import Bookmark, Collection
+
+
+class BookmarkListQueryCountTests(ListQueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.collection = Collection.objects.create(name='默认收藏夹', user=self.user, is_default=True)
+
+    def populate_bookmarks(self, count):
+        start = Bookmark.objects.count()
+        for i in range(start, start + count):
+            Bookmark.objects.create(
+                title=f'bookmark {i}', url=f'https://example.com/{i}',
+                user=self.user, collection=self.collection,
+            )
+
+    def populate_collections(self, count):
+        start = Collection.objects.count()
+        for i in range(start, start + count):
+            collection = Collection.objects.create(name=f'collection {i}', user=self.user)
+            Bookmark.objects.create(
+                title=f'in collection {i}', url=f'https://example.org/{i}',
+                user=self.user, collection=collection,
+            )
+
+    def test_bookmark_list(self):
+        self.assertConstantQueries('/api/bookmarks/', self.populate_bookmarks, 2)
+
+    def test_collection_list(self):
+        response = self.assertConstantQueries(
+            '/api/bookmarks/collections/', self.populate_collections, 2
+        )
+        self.assertEqual(response.data['results'][0]['bookmarks_count'], 1)
+
+
+class BookmarkCursorPaginationTests(ListQueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.collection = Collection.objects.create(name='默认收藏夹', user=self.user, is_default=True)
+        for i in range(45):
+            Bookmark.objects.create(
+                title=f'bookmark {i}', url=f'https://example.com/{i}',
+                user=self.user, collection=self.collection,
+                visit_count=i % 4,
+            )
+
+    def walk(self, url):
+        seen = []
+        while url:
+            queries, response = self.count_queries(url)
+            self.assertEqual(queries, 1)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_walk_default_ordering(self):
+        seen = self.walk('/api/bookmarks/?pagination=cursor')
+        expected = list(Bookmark.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_walk_non_unique_ordering(self):
+        seen = self.walk('/api/bookmarks/?pagination=cursor&ordering=visit_count&page_size=7')
+        expected = list(Bookmark.objects.order_by('visit_count', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_walk_nullable_ordering(self):
+        Bookmark.objects.filter(id__in=Bookmark.objects.values('id')[:10]).update(last_visited=None)
+        Bookmark.objects.filter(last_visited__isnull=True).exclude(
+            id__in=Bookmark.objects.values('id')[:10]
+        ).update(last_visited='2024-01-01T00:00:00Z')
+        for ordering in ('last_visited', '-last_visited'):
+            seen = self.walk(f'/api/bookmarks/?pagination=cursor&ordering={ordering}&page_size=6')
+            self.assertEqual(sorted(seen), sorted(Bookmark.objects.values_list('id', flat=True)))
+            self.assertEqual(len(seen), len(set(seen)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/bookmarks/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class BookmarkBulkOperationTests(ListQueryCountTestCase):
+
+    def test_delete_updates_user_total(self):
+        collection = Collection.objects.create(name='默认收藏夹', user=self.user, is_default=True)
+        ids = [
+            Bookmark.objects.create(
+                title=f'b {i}', url=f'https://example.com/{i}', user=self.user, collection=collection
+            ).id
+            for i in range(4)
+        ]
+        response = self.client.post('/api/bookmarks/bulk-operations/', {
+            'action': 'delete', 'bookmark_ids': ids[:3],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['message'], '已删除 3 个书签')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_bookmarks, 1)
+
+        response = self.client.post('/api/bookmarks/bulk-operations/', {
+            'action': 'move', 'bookmark_ids': ids, 'collection_id': 999999,
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class BookmarkBatchTests(ListQueryCountTestCase):
+
+    def test_create(self):
+        collection = Collection.objects.create(name='阅读', user=self.user)
+        items = [
+            {'title': f'b {i}', 'url': f'https://example.com/{i}', 'collection': collection.id}
+            for i in range(10)
+        ]
+        items.append({'title': 'dup', 'url': 'https://example.com/0', 'collection': collection.id})
+        response = self.client.post('/api/bookmarks/batch/', {'bookmarks': items}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['succeeded'], 10)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_bookmarks, 10)
@@ -15,5 +15,6 @@ urlpatterns = [
     # 其他功能
     path('search/', views.search_bookmarks, name='bookmark-search'),
     path('stats/', views.BookmarkStatsView.as_view(), name='bookmark-stats'),
+    path('batch/', views.batch_bookmarks, name='bookmark-batch'),
     path('bulk-operations/', views.bulk_operations, name='bookmark-bulk-operations'),
 ]
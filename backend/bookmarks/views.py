@@ -8,6 +8,12 @@ from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 import logging
 
+from analytics.activity import record_activity
+from config.bulk import bulk_operation_response, bulk_write_response
+from config.canonical import is_url, url_hash
+from config.pagination import HybridPagination
+from config.throttling import throttle_scope
+from .bulk import BookmarkBulkOperations, BookmarkBulkWriter
 from .models import Collection, Bookmark
 from .serializers import (
     CollectionSerializer, BookmarkSerializer, BookmarkListSerializer,
@@ -27,7 +33,9 @@ class CollectionListCreateView(generics.ListCreateAPIView):
     ordering = ['name']
     
     def get_queryset(self):
-        return Collection.objects.filter(user=self.request.user)
+        return CollectionSerializer.annotate_queryset(
+            Collection.objects.filter(user=self.request.user)
+        )
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -39,7 +47,9 @@ class CollectionDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Collection.objects.filter(user=self.request.user)
+        return CollectionSerializer.annotate_queryset(
+            Collection.objects.filter(user=self.request.user)
+        )
     
     def destroy(self, request, *args, **kwargs):
         """删除收藏夹时检查是否为默认收藏夹"""
@@ -54,6 +64,7 @@ class CollectionDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class BookmarkListCreateView(generics.ListCreateAPIView):
     """书签列表和创建视图"""
+    pagination_class = HybridPagination
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['collection', 'is_favorite', 'is_archived']
@@ -62,7 +73,12 @@ class BookmarkListCreateView(generics.ListCreateAPIView):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return Bookmark.objects.filter(user=self.request.user).select_related('collection')
+        queryset = Bookmark.objects.filter(user=self.request.user).select_related('collection', 'resource')
+        url = self.request.query_params.get('url')
+        if url:
+            # 按规范化 URL 查找，等价写法都能命中
+            queryset = queryset.filter(url_hash=url_hash(url))
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -88,12 +104,19 @@ class BookmarkDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Bookmark.objects.filter(user=self.request.user).select_related('collection')
+        return Bookmark.objects.filter(user=self.request.user).select_related('collection', 'resource')
     
     def retrieve(self, request, *args, **kwargs):
         """获取书签详情时增加访问次数"""
         instance = self.get_object()
         instance.increment_visit_count()
+        record_activity(
+            request.user.pk, 'bookmark_visit', request,
+            description=f'访问书签 {instance.title}',
+            kind='bookmark',
+            object_id=instance.pk,
+            category=instance.collection.name,
+        )
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -184,6 +207,7 @@ def toggle_archive(request, pk):
         )
 
 
+@throttle_scope('search')
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def search_bookmarks(request):
@@ -196,12 +220,18 @@ def search_bookmarks(request):
         bookmarks = Bookmark.objects.filter(
             user=request.user,
             is_archived=False
-        ).filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(url__icontains=query) |
-            Q(notes__icontains=query)
-        ).select_related('collection')[:20]
+        )
+        if is_url(query):
+            # 完整链接走 (user, url_hash) 唯一索引
+            bookmarks = bookmarks.filter(url_hash=url_hash(query))
+        else:
+            bookmarks = bookmarks.filter(
+                Q(title__icontains=query) |
+                Q(description__icontains=query) |
+                Q(url__icontains=query) |
+                Q(notes__icontains=query)
+            )
+        bookmarks = bookmarks.select_related('collection', 'resource')[:20]
         
         serializer = BookmarkListSerializer(bookmarks, many=True)
         return Response({'results': serializer.data})
@@ -214,72 +244,29 @@ def search_bookmarks(request):
         )
 
 
+@throttle_scope('bulk')
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def bulk_operations(request):
-    """批量操作书签"""
-    try:
-        action = request.data.get('action')
-        bookmark_ids = request.data.get('bookmark_ids', [])
-        
-        if not action or not bookmark_ids:
-            return Response(
-                {'error': '请提供操作类型和书签ID'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        bookmarks = Bookmark.objects.filter(
-            id__in=bookmark_ids,
-            user=request.user
-        )
-        
-        if action == 'delete':
-            count = bookmarks.count()
-            bookmarks.delete()
-            return Response({'message': f'已删除 {count} 个书签'})
-        
-        elif action == 'archive':
-            count = bookmarks.update(is_archived=True)
-            return Response({'message': f'已归档 {count} 个书签'})
-        
-        elif action == 'unarchive':
-            count = bookmarks.update(is_archived=False)
-            return Response({'message': f'已取消归档 {count} 个书签'})
-        
-        elif action == 'favorite':
-            count = bookmarks.update(is_favorite=True)
-            return Response({'message': f'已收藏 {count} 个书签'})
-        
-        elif action == 'unfavorite':
-            count = bookmarks.update(is_favorite=False)
-            return Response({'message': f'已取消收藏 {count} 个书签'})
-        
-        elif action == 'move':
-            collection_id = request.data.get('collection_id')
-            if not collection_id:
-                return Response(
-                    {'error': '请提供目标收藏夹ID'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            collection = Collection.objects.get(id=collection_id, user=request.user)
-            count = bookmarks.update(collection=collection)
-            return Response({'message': f'已移动 {count} 个书签到 {collection.name}'})
-        
-        else:
-            return Response(
-                {'error': '不支持的操作类型'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            
-    except Collection.DoesNotExist:
-        return Response(
-            {'error': '收藏夹不存在'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    except Exception as e:
-        logger.error(f"批量操作失败: {str(e)}")
-        return Response(
-            {'error': '操作失败'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+    """
+    批量操作书签
+    
+    action: delete / archive / unarchive / favorite / unfavorite / move（需 collection_id），
+    按批执行并返回每个书签的处理结果。
+    """
+    return bulk_operation_response(
+        BookmarkBulkOperations(request.user), request, ids_field='bookmark_ids'
+    )
+
+
+@throttle_scope('bulk')
+@api_view(['POST', 'PATCH'])
+@permission_classes([permissions.IsAuthenticated])
+def batch_bookmarks(request):
+    """
+    批量创建（POST）或更新（PATCH）书签
+    
+    请求体为对象列表（更新时每项需带 id），整批一次校验和写入，逐项返回结果：
+    全部成功 201 / 200，部分成功 207，全部失败 400。
+    """
+    return bulk_write_response(BookmarkBulkWriter(request), request)
@@ -0,0 +1,102 @@
+"""
+异步视图支持
+
+DRF 的视图只能同步执行，发起外部请求的接口在等待期间会占住整个 worker。
+这里的 async_api_view 把普通的 async 视图函数包装成与 DRF 接口行为一致的 API：
+使用同样的认证类（ClaimsJWTAuthentication 通常只读取进程内缓存）和限流类，
+错误时返回与 DRF 相同格式的 JSON。
+
+ASGI 部署（gunicorn + uvicorn worker）下这些视图直接在事件循环中运行；
+WSGI 下 Django 会为每个请求创建事件循环执行，行为相同，只是没有并发收益。
+"""
+import json
+import math
+from functools import wraps
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+
+def json_response(data, status=200):
+    """与 DRF JSONRenderer 一致：中文不转义"""
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def _error(exc, headers=None):
+    response = json_response({'detail': str(exc.detail)}, status=exc.status_code)
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def _unauthorized(exc, request, authenticators):
+    # 与 DRF 相同：第一个认证类提供 WWW-Authenticate
+    header = authenticators[0].authenticate_header(request) if authenticators else None
+    return _error(exc, {'WWW-Authenticate': header} if header else None)
+
+
+def _check_request(request, view):
+    """认证和限流，返回拒绝请求的响应，通过时返回 None"""
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    for authenticator in authenticators:
+        try:
+            result = authenticator.authenticate(request)
+        except exceptions.AuthenticationFailed as exc:
+            return _unauthorized(exc, request, authenticators)
+        if result is not None:
+            request.user, request.auth = result
+            break
+    else:
+        request.user, request.auth = AnonymousUser(), None
+        return _unauthorized(exceptions.NotAuthenticated(), request, authenticators)
+
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view):
+            wait = throttle.wait()
+            headers = {'Retry-After': str(math.ceil(wait))} if wait is not None else None
+            return _error(exceptions.Throttled(wait), headers)
+    return None
+
+
+def async_api_view(methods, throttle_scope=None):
+    """
+    把 async 视图函数包装成需要登录的 API：
+
+        @async_api_view(['POST'], throttle_scope='scrape')
+        async def fetch(request):
+            url = request.data.get('url')
+            ...
+
+    JSON 请求体解析到 request.data，查询参数仍从 request.GET 读取。
+    """
+    def decorator(func):
+        # 限流类从视图上读取 throttle_scope
+        view = SimpleNamespace(throttle_scope=throttle_scope)
+
+        @wraps(func)
+        async def wrapper(request, *args, **kwargs):
+            # 认证类在缓存未命中时会查询数据库，限流可能访问缓存，放到线程中执行
+            denied = await sync_to_async(_check_request)(request, view)
+            if denied is not None:
+                return denied
+            if request.method not in methods:
+                return _error(exceptions.MethodNotAllowed(request.method), {'Allow': ', '.join(methods)})
+
+            request.data = {}
+            if request.body:
+                try:
+                    request.data = json.loads(request.body)
+                except ValueError:
+                    return _error(exceptions.ParseError())
+            return await func(request, *args, **kwargs)
+
+        # 使用 Authorization 请求头认证，不依赖 Cookie，无需 CSRF 校验；
+        # Django 4.2 的 csrf_exempt 不支持 async 视图，直接设置标记
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
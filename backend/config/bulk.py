@@ -0,0 +1,384 @@
+"""
+通用批量操作引擎
+
+对象ID按 chunk_size 分批，每批在独立事务中执行，单批失败不影响其他批次；
+结果逐项返回（ok / not_found / error）。各应用继承 BulkOperations，
+以 action_<名称>(queryset, ids, params) 方法实现具体操作，返回 {ID: 错误信息}
+表示个别对象未处理；需要校验参数时提供 prepare_<名称>(params) 方法。
+
+BulkWriter 负责列表形式的批量创建和更新：逐项用单对象序列化器校验，
+唯一性和关联对象由预先载入的上下文判断，通过校验的条目一次写入。
+"""
+import logging
+from abc import ABC, abstractmethod
+
+from django.db import NotSupportedError, models, transaction
+from django.db.models import signals
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from resources.registry import attach_resources
+from sync.changes import record_changes
+
+from .canonical import url_hash
+
+logger = logging.getLogger(__name__)
+
+
+class BulkOperationError(Exception):
+    """批量操作参数错误"""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class BulkOperations:
+    model = None
+    chunk_size = 500
+    max_items = 10000
+    # 操作名 -> 汇总消息模板，可引用 count 和 prepare 返回的参数
+    messages = {}
+    # 同步变更日志中的数据类型；操作成功的对象自动记录变更，
+    # delete_actions 中的操作记为删除；signal_actions 中的操作经由模型信号记录，不重复记录
+    sync_model = None
+    delete_actions = ('delete',)
+    signal_actions = ()
+
+    def __init__(self, user):
+        self.user = user
+
+    def get_queryset(self):
+        return self.model.objects.filter(user=self.user)
+
+    @classmethod
+    def action_names(cls):
+        return [name[len('action_'):] for name in dir(cls) if name.startswith('action_')]
+
+    def clean_ids(self, ids):
+        if not isinstance(ids, list) or not ids:
+            raise BulkOperationError('请提供对象ID列表')
+        if len(ids) > self.max_items:
+            raise BulkOperationError(f'单次最多操作 {self.max_items} 个对象')
+        try:
+            # 去重并保持顺序
+            return list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            raise BulkOperationError('对象ID必须为整数')
+
+    def run(self, action, ids, params=None):
+        """执行批量操作，返回汇总和逐项结果"""
+        handler = getattr(self, f'action_{action}', None) if action else None
+        if handler is None:
+            raise BulkOperationError('不支持的操作类型')
+        ids = self.clean_ids(ids)
+        params = params or {}
+        prepare = getattr(self, f'prepare_{action}', None)
+        if prepare is not None:
+            params = prepare(params)
+
+        results = {}
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            try:
+                with transaction.atomic():
+                    found = list(
+                        self.get_queryset().filter(pk__in=chunk)
+                        .select_for_update().values_list('pk', flat=True)
+                    )
+                    errors = {}
+                    if found:
+                        errors = handler(self.get_queryset().filter(pk__in=found), found, params) or {}
+                        self.record_changes(action, [pk for pk in found if pk not in errors])
+                for pk in found:
+                    if pk in errors:
+                        results[pk] = {'id': pk, 'status': 'error', 'error': errors[pk]}
+                    else:
+                        results[pk] = {'id': pk, 'status': 'ok'}
+            except Exception as e:
+                logger.error(f"批量操作 {action} 失败: {str(e)}")
+                for pk in chunk:
+                    results[pk] = {'id': pk, 'status': 'error', 'error': '操作失败'}
+            for pk in chunk:
+                results.setdefault(pk, {'id': pk, 'status': 'not_found'})
+
+        items = [results[pk] for pk in ids]
+        succeeded = sum(1 for item in items if item['status'] == 'ok')
+        summary = {
+            'action': action,
+            'total': len(items),
+            'succeeded': succeeded,
+            'failed': len(items) - succeeded,
+            'results': items,
+        }
+        if action in self.messages:
+            summary['message'] = self.messages[action].format(count=succeeded, **params)
+        return summary
+
+    def record_changes(self, action, ids):
+        if self.sync_model and ids and action not in self.signal_actions:
+            operation = 'delete' if action in self.delete_actions else 'upsert'
+            record_changes(self.user.id, self.sync_model, ids, operation)
+
+
+def bulk_operation_response(operations, request, ids_field='ids'):
+    """
+    批量操作视图的通用处理
+
+    请求体为 {"action": ..., ids_field: [...], 其他参数}。
+    """
+    params = {
+        key: value for key, value in request.data.items()
+        if key not in ('action', ids_field)
+    }
+    try:
+        return Response(operations.run(
+            request.data.get('action'), request.data.get(ids_field), params
+        ))
+    except BulkOperationError as e:
+        return Response({'error': e.message}, status=e.status_code)
+    except Exception as e:
+        logger.error(f"批量操作失败: {str(e)}")
+        return Response(
+            {'error': '操作失败'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+class BulkWriter(ABC):
+    model = None
+    serializer_class = None
+    max_items = 500
+    # 也接受 {payload_key: [...]} 形式的请求体
+    payload_key = None
+    sync_model = None
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+
+    def get_queryset(self):
+        return self.model.objects.filter(user=self.user)
+
+    def get_items(self):
+        items = self.request.data
+        if isinstance(items, dict) and self.payload_key in items:
+            items = items[self.payload_key]
+        if not isinstance(items, list) or not items:
+            raise BulkOperationError('请提供对象列表')
+        if len(items) > self.max_items:
+            raise BulkOperationError(f'单次最多提交 {self.max_items} 个对象')
+        if not all(isinstance(item, dict) for item in items):
+            raise BulkOperationError('列表中的每一项必须是对象')
+        return items
+
+    def preload(self, items):
+        """一次性载入条目引用的关联对象，返回 {模型: {主键: 对象}}"""
+        return {}
+
+    def get_context(self, items):
+        hashes = {url_hash(item['url']) for item in items if isinstance(item.get('url'), str)}
+        return {
+            'request': self.request,
+            'url_owners': dict(
+                self.get_queryset().filter(url_hash__in=hashes).values_list('url_hash', 'id')
+            ),
+            'preloaded': self.preload(items),
+        }
+
+    @abstractmethod
+    def perform_create(self, validated):
+        """写入通过校验的数据，返回与之对应的新对象列表"""
+
+    @abstractmethod
+    def perform_update(self, changes):
+        """changes 为 [(对象, 校验后的数据)]"""
+
+    def create(self):
+        items = self.get_items()
+        context = self.get_context(items)
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = self.serializer_class(data=item, context=context)
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+                continue
+            # 占用 URL，本批后续条目不能重复
+            context['url_owners'][url_hash(serializer.validated_data['url'])] = 0
+            valid.append((index, serializer.validated_data))
+
+        with transaction.atomic():
+            created = self.perform_create([data for _, data in valid]) if valid else []
+            if self.sync_model:
+                record_changes(self.user.id, self.sync_model, [instance.id for instance in created])
+        for (index, _), instance in zip(valid, created):
+            results[index] = {'index': index, 'status': 'created', 'id': instance.id}
+        return self.summarize(results, status.HTTP_201_CREATED)
+
+    def update(self):
+        items = self.get_items()
+        ids = [item.get('id') for item in items]
+        instances = {
+            instance.id: instance
+            for instance in self.get_queryset().filter(
+                id__in=[pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)]
+            )
+        }
+        context = self.get_context(items)
+        results = [None] * len(items)
+        changes = []
+        seen = set()
+        for index, item in enumerate(items):
+            instance = instances.get(item.get('id'))
+            if instance is None or instance.id in seen:
+                error = '对象不存在' if instance is None else '同一对象在本批中重复出现'
+                results[index] = {'index': index, 'id': item.get('id'), 'status': 'error', 'errors': {'id': [error]}}
+                continue
+            seen.add(instance.id)
+            serializer = self.serializer_class(instance, data=item, partial=True, context=context)
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'id': instance.id, 'status': 'error', 'errors': serializer.errors}
+                continue
+            if 'url' in serializer.validated_data:
+                context['url_owners'][url_hash(serializer.validated_data['url'])] = instance.id
+            changes.append((index, instance, serializer.validated_data))
+
+        with transaction.atomic():
+            if changes:
+                self.perform_update([(instance, data) for _, instance, data in changes])
+                if self.sync_model:
+                    record_changes(self.user.id, self.sync_model, [instance.id for _, instance, _ in changes])
+        for index, instance, _ in changes:
+            results[index] = {'index': index, 'id': instance.id, 'status': 'updated'}
+        return self.summarize(results, status.HTTP_200_OK)
+
+    def summarize(self, results, success_status):
+        succeeded = sum(1 for item in results if item['status'] != 'error')
+        if succeeded == len(results):
+            response_status = success_status
+        elif succeeded:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        }, status=response_status)
+
+
+def apply_changes(changes, extra_fields=()):
+    """把校验后的数据写回对象并用一条 bulk_update 保存，返回更新的字段"""
+    fields = set(extra_fields)
+    moved = []
+    for instance, data in changes:
+        for attr, value in data.items():
+            setattr(instance, attr, value)
+            fields.add(attr)
+        if 'url' in data and hasattr(instance, 'url_hash'):
+            # bulk_update 不调用 pre_save，URL 摘要和资源关联需要手动更新
+            instance.url_hash = url_hash(instance.url)
+            fields.add('url_hash')
+            moved.append(instance)
+    if moved and hasattr(moved[0], 'resource_id'):
+        attach_resources(moved)
+        fields.add('resource')
+    if 'updated_at' in {field.name for field in changes[0][0]._meta.concrete_fields}:
+        # bulk_update 不处理 auto_now
+        now = timezone.now()
+        for instance, _ in changes:
+            instance.updated_at = now
+        fields.add('updated_at')
+    if fields:
+        type(changes[0][0]).objects.bulk_update([instance for instance, _ in changes], sorted(fields))
+    return fields
+
+
+def bulk_write_response(writer, request):
+    """批量写入视图的通用处理：POST 创建，PATCH 更新"""
+    try:
+        if request.method == 'PATCH':
+            return writer.update()
+        return writer.create()
+    except BulkOperationError as e:
+        return Response({'error': e.message}, status=e.status_code)
+    except Exception as e:
+        logger.error(f"批量写入失败: {str(e)}")
+        return Response(
+            {'error': '批量写入失败'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def _has_delete_hooks(model):
+    return signals.pre_delete.has_listeners(model) or signals.post_delete.has_listeners(model)
+
+
+def _can_fast_delete(model, ignore_hooks=False):
+    """没有删除信号、也没有需要 Collector 处理的下级关联的模型可以直接 DELETE"""
+    if not ignore_hooks and _has_delete_hooks(model):
+        return False
+    return not any(
+        relation.on_delete is not models.DO_NOTHING
+        for relation in model._meta.related_objects
+        if not relation.many_to_many
+    )
+
+
+def fast_delete(queryset, handled=()):
+    """
+    绕过 Collector 删除查询集
+
+    Django 在有级联或删除信号时会把对象全部载入内存逐个处理。这里按关联关系
+    直接对从表执行 DELETE / UPDATE ... SET NULL，再删除主表行，调用方负责
+    删除信号原本维护的计数器和变更记录。从表本身还有级联、或有删除信号且不在
+    handled（调用方已自行处理其信号副作用的模型）中时抛出 NotSupportedError：
+    退回到 queryset.delete() 会触发删除信号，与调用方的手动处理重复计算。
+    返回删除的主表行数。
+    """
+    model = queryset.model
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return 0
+
+    plan = []
+    for relation in model._meta.related_objects:
+        field = relation.field
+        if relation.many_to_many:
+            # 其他模型指向本模型的多对多：删除中间表行
+            through = field.remote_field.through
+            plan.append(('delete', through._base_manager.filter(
+                **{f'{field.m2m_reverse_field_name()}__in': pks}
+            )))
+            continue
+        related = relation.related_model._base_manager.filter(**{f'{field.name}__in': pks})
+        if relation.on_delete is models.CASCADE and _can_fast_delete(
+            relation.related_model, ignore_hooks=relation.related_model in handled
+        ):
+            plan.append(('delete', related))
+        elif relation.on_delete is models.SET_NULL:
+            plan.append(('set_null', related, field.name))
+        elif relation.on_delete is models.DO_NOTHING:
+            continue
+        else:
+            raise NotSupportedError(
+                f'fast_delete 无法处理 {relation.related_model._meta.label}.{field.name} 的删除'
+            )
+
+    with transaction.atomic():
+        for step in plan:
+            if step[0] == 'delete':
+                step[1]._raw_delete(step[1].db)
+            else:
+                step[1].update(**{step[2]: None})
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            through._base_manager.filter(
+                **{f'{field.m2m_field_name()}__in': pks}
+            )._raw_delete(queryset.db)
+        base = model._base_manager.filter(pk__in=pks)
+        return base._raw_delete(base.db)
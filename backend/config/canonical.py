@@ -0,0 +1,83 @@
+"""
+URL 规范化
+
+把写法不同但指向同一页面的 URL 归一为同一个规范形式，用于查重：
+- http / https 视为相同，默认端口去掉
+- 主机名小写、去掉末尾的点和 www. 前缀，国际化域名转为 punycode
+- 路径末尾的斜杠去掉（根路径除外）
+- 去掉 utm_* 等跟踪参数，其余查询参数按名称排序
+- 去掉片段，#! 和 #/ 开头的前端路由除外
+"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset([
+    'fbclid', 'gclid', 'gclsrc', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid',
+    'igshid', 'twclid', 'ttclid', 'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi',
+    'mkt_tok', 'vero_id', 'oly_enc_id', 'oly_anon_id', 'rb_clickid', 's_cid', 'spm',
+])
+DEFAULT_PORTS = {80, 443}
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _canonical_host(host):
+    host = host.lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    try:
+        return host.encode('idna').decode('ascii')
+    except UnicodeError:
+        return host
+
+
+def canonicalize_url(url):
+    """返回 URL 的规范形式；无法解析时返回去掉首尾空白的原始字符串"""
+    url = (url or '').strip()
+    if not url:
+        return url
+    if '://' not in url:
+        url = f'http://{url}'
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    if scheme in ('http', 'https'):
+        scheme = 'https'
+
+    netloc = _canonical_host(parts.hostname or '')
+    if port and port not in DEFAULT_PORTS:
+        netloc = f'{netloc}:{port}'
+    if parts.username:
+        userinfo = parts.username + (f':{parts.password}' if parts.password else '')
+        netloc = f'{userinfo}@{netloc}'
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = urlencode(sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    ))
+
+    fragment = parts.fragment if parts.fragment.startswith(('!', '/')) else ''
+    return urlunsplit((scheme, netloc, path, query, fragment))
+
+
+def is_url(value):
+    """搜索词是否为完整链接（按摘要精确查找）"""
+    return value.lower().startswith(('http://', 'https://')) and ' ' not in value
+
+
+def url_hash(url):
+    """规范化 URL 的 128 位 blake2b 摘要（32 位十六进制）"""
+    return hashlib.blake2b(canonicalize_url(url).encode('utf-8'), digest_size=16).hexdigest()
@@ -0,0 +1,178 @@
+"""
+只读副本路由
+
+配置只读副本（DB_REPLICAS）后：
+- /api/ 下的 GET / HEAD / OPTIONS 请求的读查询发往随机一个副本，统计、搜索、列表和导出都在其中
+- 其他方法的请求、事务中的查询和写入之后的读查询仍走主库
+- 用户发生写入后的 REPLICA_STICKY_SECONDS 秒内，其请求全部读主库（读到自己的写入）
+- 用户和令牌黑名单始终读主库，认证不受复制延迟影响
+
+请求之外（后台任务）默认读主库，可用 replica_reads() 显式切换。
+粘滞标记保存在默认缓存中，配置 Redis 时所有 worker 共享。
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PRIMARY_ONLY_MODELS = {
+    'users.user',
+    'token_blacklist.outstandingtoken',
+    'token_blacklist.blacklistedtoken',
+}
+
+# 活动日志随读请求一起写入（如导出时记录一条活动），不影响用户读到自己的数据，写入不触发粘滞
+UNPINNED_MODELS = {
+    'analytics.useractivity',
+}
+
+
+class _State:
+    """当前请求或代码块的路由状态；写入时原地修改，复制到线程或协程的上下文中同样可见"""
+    __slots__ = ('use_replica', 'user_id', 'wrote')
+
+    def __init__(self, use_replica, user_id=None):
+        self.use_replica = use_replica
+        self.user_id = user_id
+        self.wrote = False
+
+
+_state = ContextVar('replica_state', default=None)
+
+
+def _pin_key(user_id):
+    return f'replica_pin:{user_id}'
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_pin_key(user_id)) is not None
+
+
+def pin(user_id):
+    """user_id 在粘滞期内读主库"""
+    if user_id is not None:
+        cache.set(_pin_key(user_id), 1, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+async def ais_pinned(user_id):
+    return user_id is not None and await cache.aget(_pin_key(user_id)) is not None
+
+
+async def apin(user_id):
+    if user_id is not None:
+        await cache.aset(_pin_key(user_id), 1, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+@contextmanager
+def replica_reads(user_id=None):
+    """代码块中的读查询发往副本；user_id 处于粘滞期时仍读主库"""
+    previous = _state.get()
+    state = _State(bool(settings.DATABASE_REPLICAS) and not is_pinned(user_id), user_id)
+    _state.set(state)
+    try:
+        yield
+    finally:
+        _state.set(previous)
+        if state.wrote:
+            pin(user_id)
+
+
+def iterate_on_replica(iterable, user_id=None):
+    """流式响应在视图返回后才迭代，需要单独切换到副本"""
+    with replica_reads(user_id):
+        yield from iterable
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.label_lower not in UNPINNED_MODELS:
+            state.wrote = True
+        # 显式返回主库：从副本读出的实例保存时也必须写主库
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _token_user_id(request):
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    按请求方法和用户的粘滞状态决定本次请求是否读副本
+
+    同时支持同步和异步调用：ASGI 下整条中间件链保持异步，异步视图不会被放进线程执行。
+    路由状态放在 ContextVar 中，sync_to_async 执行的查询同样能读到。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS or not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        # 认证在视图中进行，这里只解析令牌得到用户 ID（不查询数据库）
+        user_id = _token_user_id(request)
+        state = _State(request.method in SAFE_METHODS and not is_pinned(user_id), user_id)
+        token = _state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _state.reset(token)
+            if state.wrote:
+                pin(user_id)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS or not request.path.startswith('/api/'):
+            return await self.get_response(request)
+
+        user_id = _token_user_id(request)
+        state = _State(request.method in SAFE_METHODS and not await ais_pinned(user_id), user_id)
+        token = _state.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _state.reset(token)
+            if state.wrote:
+                await apin(user_id)
@@ -0,0 +1,36 @@
+"""
+通用模型字段
+"""
+from django.db import models
+
+from .canonical import url_hash
+
+
+class UrlHashField(models.CharField):
+    """
+    规范化 URL 摘要
+
+    保存和 bulk_create 时都会调用 pre_save，由 source 字段自动计算，无需手动赋值；
+    bulk_update / QuerySet.update 修改 URL 时需要同时更新本字段。
+    """
+
+    def __init__(self, *args, source='url', **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', 32)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.source != 'url':
+            kwargs['source'] = self.source
+        if kwargs.get('max_length') == 32:
+            del kwargs['max_length']
+        if kwargs.get('editable') is False:
+            del kwargs['editable']
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = url_hash(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
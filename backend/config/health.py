@@ -0,0 +1,146 @@
+"""
+健康检查
+
+- 存活检查（/api/health/live/）只说明进程能处理请求，不访问任何依赖，
+  依赖故障时不应导致容器被重启
+- 就绪检查（/api/health/ready/）并发探测数据库（主库和各只读副本）、缓存、存储和导出任务队列，
+  每项有 HEALTH_PROBE_TIMEOUT 秒的超时，返回各项的状态和耗时；关键依赖失败时返回 503，
+  负载均衡据此把节点摘除
+
+探测结果在进程内缓存 HEALTH_CACHE_SECONDS 秒，并发的检查请求共用同一次探测，
+探测频率不随检查方的数量增加。结果按进程缓存而不是放在共享缓存中：每个节点报告自己的状态。
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STORAGE_PROBE_NAME = '.health'
+
+# 探测超时后线程仍在等待依赖返回，线程数需能容纳几轮卡住的探测
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='health')
+_lock = threading.Lock()
+_result = None
+_checked_at = 0.0
+
+
+class Degraded(Exception):
+    """依赖可用但状态异常"""
+
+
+def _probe_database(alias):
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        # 探测线程不经过请求信号，不会回收旧连接，每次探测都重新连接
+        connection.close()
+
+
+def _probe_cache():
+    key = f'health:{socket.gethostname()}:{os.getpid()}'
+    value = time.time()
+    cache.set(key, value, timeout=60)
+    if cache.get(key) != value:
+        raise Degraded('缓存读写不一致')
+
+
+def _probe_storage():
+    default_storage.exists(STORAGE_PROBE_NAME)
+
+
+def _probe_jobs():
+    from analytics.models import ExportJob
+
+    try:
+        oldest = ExportJob.objects.filter(status='pending').order_by('created_at').values_list(
+            'created_at', flat=True
+        ).first()
+    finally:
+        connections['default'].close()
+    backlog = timedelta(seconds=settings.HEALTH_JOB_BACKLOG_SECONDS)
+    if oldest is not None and timezone.now() - oldest > backlog:
+        raise Degraded('导出任务积压，工作进程可能已停止')
+
+
+def probes():
+    """名称 -> (探测函数, 是否关键依赖)"""
+    checks = {}
+    for alias in settings.DATABASES:
+        name = 'database' if alias == 'default' else f'database:{alias}'
+        checks[name] = (lambda alias=alias: _probe_database(alias), True)
+    checks['cache'] = (_probe_cache, True)
+    checks['storage'] = (_probe_storage, False)
+    checks['jobs'] = (_probe_jobs, False)
+    return checks
+
+
+def _timed(probe):
+    started = time.perf_counter()
+    try:
+        probe()
+        status, error = 'ok', None
+    except Degraded as e:
+        status, error = 'degraded', str(e)
+    except Exception as e:
+        status, error = 'error', type(e).__name__
+        logger.warning(f"健康检查失败: {str(e)}")
+    result = {'status': status, 'latency_ms': round((time.perf_counter() - started) * 1000, 1)}
+    if error:
+        result['error'] = error
+    return result
+
+
+def run_probes():
+    checks = probes()
+    futures = {name: _executor.submit(_timed, probe) for name, (probe, _) in checks.items()}
+    wait(futures.values(), timeout=settings.HEALTH_PROBE_TIMEOUT)
+
+    results = {}
+    status = 'ok'
+    for name, future in futures.items():
+        if future.done():
+            results[name] = future.result()
+        else:
+            results[name] = {
+                'status': 'timeout',
+                'latency_ms': round(settings.HEALTH_PROBE_TIMEOUT * 1000, 1),
+            }
+        if results[name]['status'] != 'ok':
+            critical = checks[name][1]
+            if critical and results[name]['status'] != 'degraded':
+                status = 'unavailable'
+            elif status == 'ok':
+                status = 'degraded'
+    return {'status': status, 'checks': results}
+
+
+def readiness():
+    """(结果, 是否来自缓存)"""
+    global _result, _checked_at
+    with _lock:
+        if _result is not None and time.monotonic() - _checked_at < settings.HEALTH_CACHE_SECONDS:
+            return _result, True
+        _result = run_probes()
+        _checked_at = time.monotonic()
+        return _result, False
+
+
+def reset():
+    """清除缓存的探测结果"""
+    global _result
+    with _lock:
+        _result = None
@@ -0,0 +1,138 @@
+"""
+日志
+
+请求线程只把日志记录放入内存队列，格式化和写文件由 QueueListener 的后台线程完成：
+- JsonFormatter：每条记录一行 JSON，extra 中的字段原样输出
+- AsyncQueueHandler：队列满时丢弃记录并计数，不阻塞请求；有丢弃时最多每分钟输出一条 WARNING
+- SamplingFilter：按 logger 名称对 INFO 及以下级别抽样，WARNING 及以上始终保留
+
+配置见 settings.LOGGING。
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# LogRecord 自带的属性，其余属性来自 extra
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    rates: {logger 名称前缀: 保留比例}，最长前缀优先，未匹配的 logger 全部保留
+
+        {'users.views': 0.1}  # users.views 的 INFO 日志保留 10%
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    把记录放入有界队列，由后台线程交给 handlers 处理
+
+    handlers 为 dictConfig 中其他处理器的引用（'cfg://handlers.file'），
+    各处理器的级别和格式化器照常生效。进程退出时等待队列写完
+    （atexit 后进先出，先于 logging.shutdown 执行）。
+    """
+
+    def __init__(self, handlers, queue_size=10000, report_interval=60):
+        super().__init__(queue.Queue(queue_size))
+        # dictConfig 传入的是 ConvertingList，按下标访问时才解析出处理器对象
+        targets = [handlers[index] for index in range(len(handlers))]
+        self.dropped = 0
+        self.report_interval = report_interval
+        self._reported = 0
+        self._reported_at = None
+        self._dropped_lock = threading.Lock()
+        self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """等待队列中的记录写完并停止后台线程，可重复调用"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def prepare(self, record):
+        # 只合并消息参数（避免参数对象在写出前被修改），格式化留给后台线程
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            return
+        self._report_dropped()
+
+    def _report_dropped(self):
+        """队列恢复后报告上次报告以来丢弃的记录数"""
+        now = time.monotonic()
+        with self._dropped_lock:
+            count = self.dropped - self._reported
+            if not count or (self._reported_at is not None and now - self._reported_at < self.report_interval):
+                return
+            self._reported = self.dropped
+            self._reported_at = now
+        record = logging.makeLogRecord({
+            'name': __name__,
+            'levelno': logging.WARNING,
+            'levelname': logging.getLevelName(logging.WARNING),
+            'msg': f'日志队列已满，丢弃了 {count} 条记录',
+            'dropped': count,
+        })
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def parse_sample_rates(value):
+    """'users.views=0.1,django.request=0.5' -> {'users.views': 0.1, 'django.request': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
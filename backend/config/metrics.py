@@ -0,0 +1,326 @@
+"""
+请求指标
+
+MetricsMiddleware 为每个请求记录：
+- 处理时间、响应大小
+- SQL 查询数、SQL 总耗时、最慢一条查询的耗时（每个连接安装执行包装器，不依赖 DEBUG）
+- 序列化耗时（最外层序列化器的 .data）
+
+按路由模板（如 api/websites/<int:pk>/）累计到直方图，由 /api/metrics/ 以 Prometheus 文本格式输出；
+开启 METRICS_SERVER_TIMING 时同时写入 Server-Timing 响应头（会向客户端暴露服务端耗时，默认关闭）。
+
+中间件同时支持同步和异步调用，ASGI 下不会迫使整条中间件链在线程中执行。
+请求的统计对象放在 ContextVar 中，sync_to_async 会把上下文复制到执行线程，
+因此 ASGI 下同步视图和异步视图经 sync_to_async 执行的查询同样计入本次请求。
+
+指标先在进程内累计；配置 Redis 时每隔 FLUSH_INTERVAL 秒把增量合并到 Redis，
+所有 worker 的数据汇总后输出。未配置时只输出当前进程的数据。
+"""
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'url_manage_'
+FLUSH_INTERVAL = 5
+REDIS_KEY = 'metrics'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# 名称: (类型, 说明, 桶)
+METRICS = {
+    'http_requests_total': ('counter', '请求数', None),
+    'http_request_duration_seconds': ('histogram', '请求处理时间', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', '响应大小', SIZE_BUCKETS),
+    'db_queries_per_request': ('histogram', '每个请求的 SQL 查询数', COUNT_BUCKETS),
+    'db_time_seconds': ('histogram', '每个请求的 SQL 总耗时', LATENCY_BUCKETS),
+    'db_slowest_query_seconds': ('histogram', '每个请求中最慢一条 SQL 的耗时', LATENCY_BUCKETS),
+    'serializer_time_seconds': ('histogram', '每个请求的序列化耗时', LATENCY_BUCKETS),
+}
+
+
+class Registry:
+    """
+    进程内指标
+
+    每个序列 (名称, 标签) 对应 {字段: 值}：直方图的字段为各桶计数（非累计）、sum 和 count，
+    计数器只有 value。字段值都是可以直接相加的增量，便于合并到 Redis。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _fields(self, name, labels):
+        return self._series.setdefault((name, labels), {})
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            fields = self._fields(name, labels)
+            fields['value'] = fields.get('value', 0) + value
+
+    def observe(self, name, labels, value):
+        bucket = next((str(le) for le in METRICS[name][2] if value <= le), '+Inf')
+        with self._lock:
+            fields = self._fields(name, labels)
+            fields[bucket] = fields.get(bucket, 0) + 1
+            fields['sum'] = fields.get('sum', 0) + value
+            fields['count'] = fields.get('count', 0) + 1
+
+    def merge(self, series):
+        with self._lock:
+            for key, values in series.items():
+                fields = self._fields(*key)
+                for field, value in values.items():
+                    fields[field] = fields.get(field, 0) + value
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            series = {key: dict(fields) for key, fields in self._series.items()}
+            if reset:
+                self._series = {}
+        return series
+
+
+registry = Registry()
+_last_flush = time.monotonic()
+
+
+def _redis():
+    cache = caches['default']
+    if not isinstance(cache, RedisCache):
+        return None, None
+    key = cache.make_and_validate_key(REDIS_KEY)
+    return cache._cache.get_client(key, write=True), key
+
+
+def flush(force=False):
+    """把进程内的增量合并到 Redis，未配置 Redis 时什么也不做"""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    client, key = _redis()
+    if client is None:
+        return
+    _last_flush = now
+
+    series = registry.snapshot(reset=True)
+    if not series:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for (name, labels), fields in series.items():
+            for field, value in fields.items():
+                pipe.hincrbyfloat(key, json.dumps([name, labels, field]), value)
+        pipe.execute()
+    except Exception as e:
+        # Redis 不可用时保留增量，下次再合并
+        registry.merge(series)
+        logger.warning(f"指标写入 Redis 失败: {str(e)}")
+
+
+def collect():
+    """汇总后的全部序列"""
+    client, key = _redis()
+    if client is None:
+        return registry.snapshot()
+
+    flush(force=True)
+    series = {}
+    for raw_field, value in client.hgetall(key).items():
+        name, labels, field = json.loads(raw_field)
+        series.setdefault((name, tuple(map(tuple, labels))), {})[field] = float(value)
+    return series
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render():
+    """Prometheus 文本格式"""
+    series = collect()
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append(f'# HELP {PREFIX}{name} {description}')
+        lines.append(f'# TYPE {PREFIX}{name} {kind}')
+        for (series_name, labels), fields in sorted(series.items()):
+            if series_name != name:
+                continue
+            if kind == 'counter':
+                lines.append(f'{PREFIX}{name}{_label_text(labels)} {_number(fields.get("value", 0))}')
+                continue
+            cumulative = 0
+            for le in [str(le) for le in buckets] + ['+Inf']:
+                cumulative += fields.get(le, 0)
+                lines.append(f'{PREFIX}{name}_bucket{_label_text(labels, [("le", le)])} {_number(cumulative)}')
+            lines.append(f'{PREFIX}{name}_sum{_label_text(labels)} {_number(fields.get("sum", 0))}')
+            lines.append(f'{PREFIX}{name}_count{_label_text(labels)} {_number(fields.get("count", 0))}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql_time', 'slowest', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def add_query(self, elapsed):
+        self.queries += 1
+        self.sql_time += elapsed
+        self.slowest = max(self.slowest, elapsed)
+
+
+_stats = ContextVar('request_stats', default=None)
+
+
+def query_timing_wrapper(execute, sql, params, many, context):
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - started)
+
+
+def _install_query_wrapper(sender=None, connection=None, **kwargs):
+    if query_timing_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timing_wrapper)
+
+
+def install_query_timing():
+    """为当前线程已有的连接和之后建立的每个连接安装查询计时包装器"""
+    for connection in connections.all(initialized_only=True):
+        _install_query_wrapper(connection=connection)
+    connection_created.connect(_install_query_wrapper, dispatch_uid='metrics_query_wrapper')
+_original_data = serializers.BaseSerializer.data
+
+
+def _timed_data(self):
+    stats = _stats.get()
+    if stats is None or stats.serializer_depth:
+        # 嵌套序列化器的耗时计入最外层
+        return _original_data.fget(self)
+    stats.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_data.fget(self)
+    finally:
+        stats.serializer_time += time.perf_counter() - started
+        stats.serializer_depth -= 1
+
+
+def install_serializer_timing():
+    """
+    为序列化器的 .data 计时
+
+    Serializer 和 ListSerializer 的 .data 都通过 super() 调用 BaseSerializer.data，
+    只替换这一处即可覆盖所有序列化器；不在请求中时直接调用原实现。
+    """
+    serializers.BaseSerializer.data = property(_timed_data)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.route or match.view_name or 'unmatched'
+
+
+def _ms(seconds):
+    return f'{seconds * 1000:.1f}'
+
+
+class MetricsMiddleware:
+    """记录请求指标并添加 Server-Timing 响应头"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        if settings.METRICS_ENABLED:
+            install_serializer_timing()
+            install_query_timing()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        stats = RequestStats()
+        token = _stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    def record(self, request, response, stats, elapsed):
+        labels = (('route', _route(request)), ('method', request.method))
+        registry.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+        registry.observe('http_request_duration_seconds', labels, elapsed)
+        registry.observe('db_queries_per_request', labels, stats.queries)
+        registry.observe('db_time_seconds', labels, stats.sql_time)
+        registry.observe('db_slowest_query_seconds', labels, stats.slowest)
+        registry.observe('serializer_time_seconds', labels, stats.serializer_time)
+        if not response.streaming:
+            registry.observe('http_response_size_bytes', labels, len(response.content))
+        flush()
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={_ms(stats.sql_time)};desc="{stats.queries} queries"',
+                f'db-slowest;dur={_ms(stats.slowest)}',
+                f'serialize;dur={_ms(stats.serializer_time)}',
+                f'total;dur={_ms(elapsed)}',
+            ])
+        return response
@@ -0,0 +1,190 @@
+"""
+分页
+
+默认沿用页码分页；请求携带 cursor 参数（或 pagination=cursor）时切换为键集分页：
+不执行 COUNT(*)，也不使用 OFFSET，无限滚动到任意深度的查询耗时都相同。
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """保留微秒精度：DjangoJSONEncoder 会把时间截断到毫秒，导致翻页时漏行"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    键集（游标）分页
+
+    排序字段取自视图的 OrderingFilter，并在末尾追加主键保证顺序唯一。
+    游标记录最后一行在各排序字段上的取值，下一页用 (字段, 主键) 的字典序比较定位；
+    可空字段按“空值最小”处理（升序排最前，降序排最后）。
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = '无效的游标'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [self.resolve_field(queryset.model, name) for name in self.ordering]
+
+        queryset = queryset.order_by(*[self.order_expression(*field) for field in self.fields])
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """排序字段列表，末尾带主键作为唯一的决胜字段"""
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = getattr(view, 'ordering', None) or queryset.model._meta.ordering
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        pk_name = queryset.model._meta.pk.name
+        ordering = [name for name in ordering if name.lstrip('-') not in ('pk', pk_name)]
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        ordering.append(f"-{pk_name}" if descending else pk_name)
+        return ordering
+
+    @staticmethod
+    def resolve_field(model, name):
+        field_name = name.lstrip('-')
+        try:
+            field = model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            raise NotFound('不支持按该字段进行游标分页')
+        return field, name.startswith('-')
+
+    @staticmethod
+    def order_expression(field, descending):
+        if not field.null:
+            return F(field.attname).desc() if descending else F(field.attname).asc()
+        if descending:
+            return F(field.attname).desc(nulls_last=True)
+        return F(field.attname).asc(nulls_first=True)
+
+    def after(self, position):
+        """严格位于游标之后的行"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(self.fields, position):
+            name = field.attname
+            if descending:
+                beyond = None if value is None else Q(**{f'{name}__lt': value})
+                if beyond is not None and field.null:
+                    beyond |= Q(**{f'{name}__isnull': True})
+            else:
+                beyond = Q(**{f'{name}__isnull': False}) if value is None else Q(**{f'{name}__gt': value})
+            if beyond is not None:
+                condition |= equal & beyond
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, obj):
+        payload = {
+            'o': self.ordering,
+            'p': [getattr(obj, field.attname) for field, _ in self.fields],
+        }
+        data = json.dumps(payload, cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if payload['o'] != self.ordering or len(payload['p']) != len(self.fields):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(self.fields, payload['p'])
+            ]
+        except (TypeError, KeyError, ValueError, ValidationError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+
+class HybridPagination(PageNumberPagination):
+    """页码分页，客户端可通过 ?pagination=cursor 或携带 cursor 参数按请求切换为键集分页"""
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            self.keyset_class.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if self.use_keyset(request) else None
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,88 @@
+"""
+通用序列化器组件
+"""
+from django.db.models import Count
+from rest_framework import serializers
+
+from .canonical import url_hash
+
+
+class AnnotatedCountField(serializers.ReadOnlyField):
+    """
+    关联计数字段
+
+    优先读取查询集上同名的 Count 注解；没有注解时（详情、创建等单对象响应）
+    再退回到预取缓存或 COUNT 查询。
+    """
+
+    def __init__(self, relation, **kwargs):
+        self.relation = relation
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        value = getattr(instance, self.field_name, None)
+        if value is not None:
+            return value
+
+        prefetched = getattr(instance, '_prefetched_objects_cache', {})
+        if self.relation in prefetched:
+            return len(prefetched[self.relation])
+        return getattr(instance, self.relation).count()
+
+
+class CountAnnotationMixin:
+    """为查询集补充序列化器中声明的计数注解，避免逐行 COUNT"""
+
+    @classmethod
+    def annotate_queryset(cls, queryset):
+        annotations = {
+            name: Count(field.relation, distinct=True)
+            for name, field in cls._declared_fields.items()
+            if isinstance(field, AnnotatedCountField)
+        }
+        if not annotations:
+            return queryset
+        return queryset.annotate(**annotations)
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    主键关联字段
+
+    批量写入时上下文的 preloaded[模型] 提供预先一次查询载入的 {主键: 对象}，
+    逐项校验不再各自查询；没有预载时与 PrimaryKeyRelatedField 相同。
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in preloaded:
+            self.fail('does_not_exist', pk_value=data)
+        return preloaded[pk]
+
+
+def url_taken(serializer, model, value):
+    """
+    同一用户下是否已有其他对象使用等价的 URL（按规范化 URL 摘要比较）
+
+    批量写入时上下文的 url_owners 提供 {URL摘要: 对象ID}（包含本批已通过校验的条目），
+    不再逐项查询。
+    """
+    current_id = serializer.instance.id if serializer.instance else None
+    key = url_hash(value)
+    owners = serializer.context.get('url_owners')
+    if owners is not None:
+        owner = owners.get(key)
+        return owner is not None and owner != current_id
+    existing = model.objects.filter(url_hash=key, user=serializer.context['request'].user)
+    if current_id is not None:
+        existing = existing.exclude(id=current_id)
+    return existing.exists()
@@ -7,6 +7,8 @@ import configparser
 from pathlib import Path
 from django.core.exceptions import ImproperlyConfigured
 
+from config.log import parse_sample_rates
+
 # 构建路径
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,21 +54,28 @@ INSTALLED_APPS = [
     'django_filters',
     'drf_spectacular',
     'drf_spectacular_sidecar',
+    'rest_framework_simplejwt.token_blacklist',
     
     # 自定义应用
     'users',
     'websites',
     'bookmarks',
     'dashboard',
+    'analytics',
+    'sync',
+    'resources',
 ]
 
 MIDDLEWARE = [
+    # 放在最前，请求中的全部查询（包括会话、认证）都计入指标
+    'config.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,6 +101,13 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # 数据库配置
+def _conn_max_age(value):
+    value = value.strip().lower()
+    return None if value in ('none', 'unlimited') else int(value)
+
+
+DB_PGBOUNCER = get_env_variable('DB_PGBOUNCER', config.get('database', 'PGBOUNCER', fallback='False')).lower() == 'true'
+
 DATABASES = {
     'default': {
         'ENGINE': get_env_variable('DB_ENGINE', config.get('database', 'ENGINE', fallback='django.db.backends.sqlite3')),
@@ -100,8 +116,80 @@ DATABASES = {
         'PASSWORD': get_env_variable('DB_PASSWORD', config.get('database', 'PASSWORD', fallback='')),
         'HOST': get_env_variable('DB_HOST', config.get('database', 'HOST', fallback='')),
         'PORT': get_env_variable('DB_PORT', config.get('database', 'PORT', fallback='')),
+        # 持久连接：连接在请求结束后保留 CONN_MAX_AGE 秒供后续请求复用，省去每个请求的建连和认证；
+        # 设为 0 恢复每个请求新建连接，设为 none 表示不限时长
+        'CONN_MAX_AGE': _conn_max_age(
+            get_env_variable('DB_CONN_MAX_AGE', config.get('database', 'CONN_MAX_AGE', fallback='60'))
+        ),
+        # 复用连接前先检查是否仍然可用，数据库重启或连接被中间件断开后自动重连
+        'CONN_HEALTH_CHECKS': get_env_variable(
+            'DB_CONN_HEALTH_CHECKS', config.get('database', 'CONN_HEALTH_CHECKS', fallback='True')
+        ).lower() == 'true',
+        # 经 PgBouncer 事务池连接时同一会话的语句可能落到不同的服务端连接，不能使用服务端游标
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'OPTIONS': {},
     }
 }
+DB_CONNECT_TIMEOUT = get_env_variable('DB_CONNECT_TIMEOUT', config.get('database', 'CONNECT_TIMEOUT', fallback=''))
+if DB_CONNECT_TIMEOUT and 'postgresql' in DATABASES['default']['ENGINE']:
+    DATABASES['default']['OPTIONS']['connect_timeout'] = int(DB_CONNECT_TIMEOUT)
+
+# 只读副本：主机列表（host 或 host:port，逗号分隔），其余连接参数与主库相同
+DATABASE_REPLICAS = []
+_replica_hosts = get_env_variable('DB_REPLICAS', config.get('database', 'REPLICAS', fallback=''))
+for _replica in filter(None, (host.strip() for host in _replica_hosts.split(','))):
+    _host, _, _port = _replica.partition(':')
+    _alias = f'replica{len(DATABASE_REPLICAS) + 1}'
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        # 测试时副本指向测试主库
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(_alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+
+# 用户写入后多少秒内读主库，应大于副本的复制延迟
+REPLICA_STICKY_SECONDS = int(get_env_variable(
+    'DB_REPLICA_STICKY_SECONDS', config.get('database', 'REPLICA_STICKY_SECONDS', fallback='5')
+))
+
+# 慢查询日志（见 config/slow_queries.py）：超过 SLOW_QUERY_MS 毫秒的查询，0 表示关闭
+SLOW_QUERY_MS = int(get_env_variable('DB_SLOW_QUERY_MS', config.get('database', 'SLOW_QUERY_MS', fallback='200')))
+# 对慢 SELECT 执行 EXPLAIN 的比例
+SLOW_QUERY_EXPLAIN_RATE = float(get_env_variable(
+    'DB_SLOW_QUERY_EXPLAIN_RATE', config.get('database', 'SLOW_QUERY_EXPLAIN_RATE', fallback='0.1')
+))
+# 是否记录查询参数；参数可能包含密码、令牌等敏感数据，默认只记录带占位符的 SQL
+SLOW_QUERY_LOG_PARAMS = get_env_variable(
+    'DB_SLOW_QUERY_LOG_PARAMS', config.get('database', 'SLOW_QUERY_LOG_PARAMS', fallback='False')
+).lower() == 'true'
+# 环形缓冲区保留的最近记录数
+SLOW_QUERY_BUFFER_SIZE = int(get_env_variable(
+    'DB_SLOW_QUERY_BUFFER_SIZE', config.get('database', 'SLOW_QUERY_BUFFER_SIZE', fallback='200')
+))
+
+# 缓存：配置 REDIS_URL 时使用 Redis，多个进程和节点共享限流计数等状态
+REDIS_URL = get_env_variable('REDIS_URL', config.get('cache', 'REDIS_URL', fallback=''))
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'url_manage',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'url-manage',
+        }
+    }
 
 # 密码验证
 AUTH_PASSWORD_VALIDATORS = [
@@ -141,9 +229,9 @@ AUTH_USER_MODEL = 'users.User'
 
 # REST Framework 设置
 REST_FRAMEWORK = {
+    # 从令牌声明构造用户，普通请求不查询 users 表；管理后台仍使用 Django 会话
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -164,8 +252,47 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'config.throttling.UserTokenBucketThrottle',
+        'config.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        scope: get_env_variable(f'THROTTLE_RATE_{scope.upper()}', config.get('throttle', scope, fallback=rate))
+        for scope, rate in [
+            ('anon', '60/min'),
+            ('user', '600/min'),
+            ('scrape', '10/min'),
+            ('search', '60/min'),
+            ('write', '120/min'),
+            ('bulk', '10/min'),
+        ]
+    },
+    # 匿名请求按 IP 限流：X-Forwarded-For 中只信任可信代理追加的最后 NUM_PROXIES 个地址，
+    # 默认对应一层 nginx 反向代理；不经代理直接对外时设为 0，改用 REMOTE_ADDR
+    'NUM_PROXIES': int(get_env_variable('THROTTLE_NUM_PROXIES', config.get('throttle', 'NUM_PROXIES', fallback='1'))),
 }
 
+# 限流（见 config/throttling.py），测试运行器会关闭，限流用例单独开启
+THROTTLE_ENABLED = get_env_variable('THROTTLE_ENABLED', config.get('throttle', 'ENABLED', fallback='True')).lower() == 'true'
+
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
+# 请求指标（见 config/metrics.py）：Server-Timing 响应头和 /api/metrics/
+METRICS_ENABLED = get_env_variable('METRICS_ENABLED', config.get('metrics', 'ENABLED', fallback='True')).lower() == 'true'
+METRICS_SERVER_TIMING = get_env_variable(
+    'METRICS_SERVER_TIMING', config.get('metrics', 'SERVER_TIMING', fallback='False')
+).lower() == 'true'
+# 抓取 /api/metrics/ 需要携带 Authorization: Bearer <METRICS_TOKEN>；未设置时只在 DEBUG 下开放
+METRICS_TOKEN = get_env_variable('METRICS_TOKEN', config.get('metrics', 'TOKEN', fallback=''))
+
+# 就绪检查（见 config/health.py）：每项依赖的探测超时秒数、探测结果的缓存秒数，
+# 以及导出任务排队超过多少秒视为工作进程异常
+HEALTH_PROBE_TIMEOUT = float(get_env_variable('HEALTH_PROBE_TIMEOUT', config.get('health', 'PROBE_TIMEOUT', fallback='2')))
+HEALTH_CACHE_SECONDS = float(get_env_variable('HEALTH_CACHE_SECONDS', config.get('health', 'CACHE_SECONDS', fallback='2')))
+HEALTH_JOB_BACKLOG_SECONDS = int(get_env_variable(
+    'HEALTH_JOB_BACKLOG_SECONDS', config.get('health', 'JOB_BACKLOG_SECONDS', fallback='600')
+))
+
 # drf-spectacular 设置
 SPECTACULAR_SETTINGS = {
     'TITLE': 'URL管理系统 API',
@@ -257,8 +384,7 @@ SPECTACULAR_SETTINGS = {
         }
     },
     'AUTHENTICATION_WHITELIST': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ],
     'TAGS': [
         {'name': '用户认证', 'description': '用户注册、登录、登出等认证相关接口'},
@@ -288,6 +414,7 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.RefreshSerializer',
 }
 
 # CORS设置
@@ -304,6 +431,16 @@ EMAIL_HOST_PASSWORD = get_env_variable('EMAIL_HOST_PASSWORD', config.get('email'
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 # 日志配置
+LOG_DIR = get_env_variable('LOG_DIR', config.get('logging', 'DIR', fallback=str(BASE_DIR)))
+LOG_LEVEL = get_env_variable('LOG_LEVEL', config.get('logging', 'LEVEL', fallback='INFO')).upper()
+# 控制台输出格式：text 便于开发查看，json 便于容器日志采集
+LOG_CONSOLE_FORMAT = get_env_variable('LOG_CONSOLE_FORMAT', config.get('logging', 'CONSOLE_FORMAT', fallback='text'))
+# 热点路径的 INFO 日志抽样，格式为 logger=比例，逗号分隔
+LOG_SAMPLE_RATES = parse_sample_rates(
+    get_env_variable('LOG_SAMPLE_RATES', config.get('logging', 'SAMPLE_RATES', fallback=''))
+)
+
+# 请求线程只把记录放入队列，格式化和写入在后台线程中进行（见 config/log.py）
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -312,25 +449,45 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'config.log.JsonFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'config.log.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
     },
     'handlers': {
+        # 多个 worker 进程写同一个文件，由各进程自行轮转会互相覆盖；
+        # 轮转交给 logrotate，文件被移走后 WatchedFileHandler 自动重新打开
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'debug.log'),
-            'formatter': 'verbose',
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': os.path.join(LOG_DIR, 'debug.log'),
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
         },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_CONSOLE_FORMAT == 'json' else 'verbose',
+        },
+        'queue': {
+            '()': 'config.log.AsyncQueueHandler',
+            'handlers': ['cfg://handlers.file', 'cfg://handlers.console'],
+            'filters': ['sampling'],
         },
     },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
-            'propagate': True,
+            'level': LOG_LEVEL,
         },
     },
-}
\ No newline at end of file
+}
@@ -0,0 +1,217 @@
+"""
+慢查询日志
+
+所有数据库连接（请求、管理命令、后台任务）执行的 SQL 超过 SLOW_QUERY_MS 毫秒时记录：
+- SQL（参数为占位符）、耗时和数据库别名；开启 SLOW_QUERY_LOG_PARAMS 时同时记录参数
+- 来源：最内层的项目代码位置、所在视图（views.py 中的函数或方法）和序列化器
+- 按 SLOW_QUERY_EXPLAIN_RATE 抽样对 SELECT 执行 EXPLAIN，保存执行计划
+
+参数可能包含密码、令牌等敏感数据，默认不记录，执行计划中的字符串常量也替换为 '?'。
+记录写入环形缓冲区（最近 SLOW_QUERY_BUFFER_SIZE 条）并输出一条 WARNING 日志。
+配置 Redis 时缓冲区保存在 Redis 中，所有进程共享；否则只保存在当前进程。
+通过 /admin/slow-queries/ 或 manage.py slow_queries 查看。
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = 'slow_queries'
+MAX_SQL_LENGTH = 4000
+MAX_PARAMS_LENGTH = 500
+# 执行计划中的字符串常量（PostgreSQL 会把参数值写入过滤条件）
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+_buffer = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+# EXPLAIN 本身也经过执行包装器，避免递归
+_explaining = ContextVar('slow_query_explaining', default=False)
+
+
+def _redis():
+    cache = caches['default']
+    if not isinstance(cache, RedisCache):
+        return None, None
+    key = cache.make_and_validate_key(REDIS_KEY)
+    return cache._cache.get_client(key, write=True), key
+
+
+def _project_path(filename):
+    if not filename.startswith(str(settings.BASE_DIR)) or 'site-packages' in filename:
+        return None
+    if filename == __file__:
+        return None
+    return os.path.relpath(filename, settings.BASE_DIR)
+
+
+def _stack_origin():
+    """(来源, 视图, 序列化器)，都取调用栈中最内层的一个"""
+    origin = view = serializer = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        path = _project_path(code.co_filename)
+        if path is not None:
+            name = getattr(code, 'co_qualname', code.co_name)
+            if origin is None:
+                origin = f'{path}:{frame.f_lineno} in {name}'
+            if view is None and os.path.basename(path) == 'views.py':
+                view = f'{path}:{name}'
+        if serializer is None:
+            # 用 type() 判断：isinstance 会触发惰性对象（如 request.user）求值
+            instance = frame.f_locals.get('self')
+            if issubclass(type(instance), ListSerializer):
+                serializer = f'{type(instance.child).__name__}(many=True)'
+            elif issubclass(type(instance), BaseSerializer):
+                serializer = type(instance).__name__
+        frame = frame.f_back
+    return origin, view, serializer
+
+
+def _explain(connection, sql, params):
+    token = _explaining.set(True)
+    try:
+        # 在保存点中执行，EXPLAIN 出错不会中断外层事务
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                rows = cursor.fetchall()
+        return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+    except DatabaseError as e:
+        return f'EXPLAIN 失败: {str(e)}'
+    finally:
+        _explaining.reset(token)
+
+
+def _should_explain(sql, many, connection):
+    return (
+        not many
+        and sql.lstrip().upper().startswith('SELECT')
+        and not connection.needs_rollback
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE
+    )
+
+
+def record(entry):
+    """写入环形缓冲区"""
+    with _buffer_lock:
+        _buffer.appendleft(entry)
+    client, key = _redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.lpush(key, json.dumps(entry, ensure_ascii=False))
+        pipe.ltrim(key, 0, settings.SLOW_QUERY_BUFFER_SIZE - 1)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"慢查询写入 Redis 失败: {str(e)}")
+
+
+def recent(limit=None):
+    """最近的慢查询，最新的在前"""
+    client, key = _redis()
+    if client is not None:
+        end = -1 if limit is None else limit - 1
+        return [json.loads(item) for item in client.lrange(key, 0, end)]
+    with _buffer_lock:
+        entries = list(_buffer)
+    return entries if limit is None else entries[:limit]
+
+
+def clear():
+    with _buffer_lock:
+        _buffer.clear()
+    client, key = _redis()
+    if client is not None:
+        client.delete(key)
+
+
+def summarize(entries):
+    """按 SQL 语句（参数为占位符）分组，按总耗时降序"""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['sql'], {
+            'sql': entry['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'origin': entry['origin'],
+            'view': entry['view'],
+            'serializer': entry['serializer'],
+            'explain': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        if entry['duration_ms'] > group['max_ms']:
+            group['max_ms'] = entry['duration_ms']
+            group['origin'] = entry['origin']
+            group['view'] = entry['view']
+            group['serializer'] = entry['serializer']
+        group['explain'] = group['explain'] or entry['explain']
+    for group in groups.values():
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 1)
+        group['total_ms'] = round(group['total_ms'], 1)
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if _explaining.get() or not settings.SLOW_QUERY_MS:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < settings.SLOW_QUERY_MS:
+        return result
+
+    connection = context['connection']
+    origin, view, serializer = _stack_origin()
+    entry = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'duration_ms': round(duration_ms, 1),
+        'database': connection.alias,
+        'sql': sql[:MAX_SQL_LENGTH],
+        'params': repr(params)[:MAX_PARAMS_LENGTH] if settings.SLOW_QUERY_LOG_PARAMS else None,
+        'origin': origin,
+        'view': view,
+        'serializer': serializer,
+        'explain': None,
+    }
+    if _should_explain(sql, many, connection):
+        explain = _explain(connection, sql, params)
+        entry['explain'] = explain if settings.SLOW_QUERY_LOG_PARAMS else STRING_LITERAL.sub("'?'", explain)
+    record(entry)
+    logger.warning(
+        '慢查询 %.1f ms: %s', duration_ms, entry['sql'][:200],
+        extra={'duration_ms': entry['duration_ms'], 'origin': origin, 'view': view, 'serializer': serializer},
+    )
+    return result
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    # 持久连接重连时同一个连接对象会再次触发信号。插入到最前：连接可能在
+    # connection.execute_wrapper() 代码块中建立，块结束时弹出的是列表末尾
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+def install():
+    """为之后建立的每个数据库连接安装执行包装器"""
+    connection_created.connect(_install_wrapper, dispatch_uid='slow_query_wrapper')
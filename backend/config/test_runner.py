@@ -0,0 +1,20 @@
+"""
+测试运行器
+
+测试之间共用缓存，限流计数会互相影响，运行测试时关闭限流；
+需要限流的用例用 override_settings(THROTTLE_ENABLED=True) 单独开启。
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(THROTTLE_ENABLED=False)
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
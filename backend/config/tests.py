@@ -0,0 +1,320 @@
+import json
+import logging
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from analytics.models import UserActivity
+from users.authentication import ClaimsRefreshToken
+from websites.models import Website
+
+from . import health
+from .db_router import ReplicaRouter, ReplicaRoutingMiddleware, replica_reads
+from .log import AsyncQueueHandler, JsonFormatter, SamplingFilter
+
+User = get_user_model()
+
+
+THROTTLE_RATES = {'user': '100/min', 'search': '2/min', 'write': '1/min', 'bulk': '1/min'}
+
+
+@override_settings(
+    THROTTLE_ENABLED=True,
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': THROTTLE_RATES},
+)
+class ThrottleTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self):
+        return self.client.get('/api/websites/search/', {'q': 'example'})
+
+    def test_scoped_bucket_returns_retry_after(self):
+        self.assertEqual(self.search().status_code, 200)
+        self.assertEqual(self.search().status_code, 200)
+        response = self.search()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # 其他作用域和列表接口不受影响
+        self.assertEqual(self.client.get('/api/websites/').status_code, 200)
+
+        # 令牌按速率补充
+        with mock.patch('config.throttling.time.time', return_value=time.time() + 31):
+            self.assertEqual(self.search().status_code, 200)
+
+    def test_writes_and_bulk_have_separate_buckets(self):
+        create = {'title': 'a', 'url': 'https://example.com/a'}
+        self.assertEqual(self.client.post('/api/websites/', create, format='json').status_code, 201)
+        create['url'] = 'https://example.com/b'
+        self.assertEqual(self.client.post('/api/websites/', create, format='json').status_code, 429)
+
+        batch = [{'title': 'c', 'url': 'https://example.com/c'}]
+        self.assertEqual(self.client.post('/api/websites/batch/', batch, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/websites/batch/', batch, format='json').status_code, 429)
+
+    def test_anonymous_bucket_ignores_spoofed_forwarded_for(self):
+        self.client.force_authenticate(None)
+        rates = {**THROTTLE_RATES, 'anon': '2/min'}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            # nginx 把真实来源地址追加在客户端填写的值之后
+            statuses = [
+                self.client.get('/api/info/', HTTP_X_FORWARDED_FOR=f'{spoofed}, 198.51.100.7').status_code
+                for spoofed in ['203.0.113.1', '203.0.113.2', '203.0.113.3']
+            ]
+            self.assertEqual(statuses, [200, 200, 429])
+            response = self.client.get('/api/info/', HTTP_X_FORWARDED_FOR='198.51.100.8')
+            self.assertEqual(response.status_code, 200)
+
+    def test_buckets_are_per_user(self):
+        self.search(), self.search()
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.search().status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(APITransactionTestCase):
+    """路由决策测试，不实际连接副本；事务中的读查询走主库，因此不能用 TestCase"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.router = ReplicaRouter()
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        self.factory = RequestFactory(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def route(self, request, write=False):
+        """在中间件中执行一次请求，返回写入前后读查询使用的数据库"""
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(Website))
+            if write:
+                self.router.db_for_write(Website)
+                routed.append(self.router.db_for_read(Website))
+            return None
+
+        ReplicaRoutingMiddleware(view)(request)
+        return routed
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.route(self.factory.get('/api/analytics/dashboard/')), ['replica1'])
+        self.assertEqual(self.route(self.factory.post('/api/websites/')), ['default'])
+        self.assertEqual(self.route(self.factory.get('/admin/')), ['default'])
+        # 请求之外读主库
+        self.assertEqual(self.router.db_for_read(Website), 'default')
+
+    def test_user_reads_own_writes(self):
+        self.assertEqual(self.route(self.factory.get('/api/websites/'), write=True), ['replica1', 'default'])
+        self.assertEqual(self.route(self.factory.get('/api/websites/')), ['default'])
+
+        # 粘滞期只针对发生写入的用户
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        token = ClaimsRefreshToken.for_user(other).access_token
+        request = self.factory.get('/api/websites/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.route(request), ['replica1'])
+
+        cache.clear()
+        self.assertEqual(self.route(self.factory.get('/api/websites/')), ['replica1'])
+
+    def test_async_path_keeps_routing_state(self):
+        routed = []
+
+        async def view(request):
+            routed.append(await sync_to_async(self.router.db_for_read)(Website))
+            await sync_to_async(self.router.db_for_write)(Website)
+            return None
+
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        async_to_sync(middleware)(self.factory.get('/api/websites/'))
+        self.assertEqual(routed, ['replica1'])
+        self.assertEqual(self.router.db_for_read(Website), 'default')
+        # 异步路径中的写入同样触发粘滞
+        self.assertEqual(self.route(self.factory.get('/api/websites/')), ['default'])
+
+    def test_primary_only_reads(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Website), 'replica1')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            # 活动日志的写入不影响后续读副本
+            self.router.db_for_write(UserActivity)
+            self.assertEqual(self.router.db_for_read(Website), 'replica1')
+            with transaction.atomic():
+                self.assertEqual(self.router.db_for_read(Website), 'default')
+        self.assertEqual(self.router.db_for_write(Website), 'default')
+
+
+class MetricsTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+
+    @override_settings(METRICS_SERVER_TIMING=True, METRICS_TOKEN='secret')
+    def test_server_timing_and_prometheus_output(self):
+        Website.objects.create(title='a', url='https://example.com/', user=self.user)
+        response = self.client.get('/api/websites/')
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serialize;dur=', timing)
+
+        body = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertRegex(
+            body, r'url_manage_http_requests_total\{route="api/websites/",method="GET",status="200"\} \d+'
+        )
+        self.assertIn('url_manage_db_queries_per_request_bucket{route="api/websites/",method="GET",le="+Inf"}', body)
+        self.assertRegex(body, r'url_manage_serializer_time_seconds_count\{route="api/websites/",method="GET"\} \d+')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_SERVER_TIMING=True)
+    async def test_async_handler_counts_queries(self):
+        token = await sync_to_async(lambda: str(ClaimsRefreshToken.for_user(self.user).access_token))()
+        response = await self.async_client.get('/api/websites/', AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        queries = int(response['Server-Timing'].split('desc="')[1].split(' ')[0])
+        self.assertGreater(queries, 0)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'], DEBUG=True)
+    def test_asgi_handler_does_not_adapt_middleware(self):
+        # DEBUG 下中间件被适配到另一种调用方式时 django.request 会输出一条 DEBUG 日志
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            handler = ASGIHandler()
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_closed_without_token_unless_debug(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+    def test_server_timing_is_off_by_default(self):
+        self.assertFalse(settings.METRICS_SERVER_TIMING)
+        self.assertNotIn('Server-Timing', self.client.get('/api/websites/'))
+
+
+class LoggingTests(SimpleTestCase):
+
+    def _record(self, name, level=logging.INFO, msg='用户 %s 登录成功', args=('tester',), **extra):
+        record = logging.makeLogRecord({'name': name, 'levelno': level, 'levelname': logging.getLevelName(level),
+                                        'msg': msg, 'args': args})
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter(self):
+        data = json.loads(JsonFormatter().format(self._record('users.views', user_id=3)))
+        self.assertEqual(data['message'], '用户 tester 登录成功')
+        self.assertEqual(data['level'], 'INFO')
+        self.assertEqual(data['logger'], 'users.views')
+        self.assertEqual(data['user_id'], 3)
+
+    def test_sampling_filter(self):
+        sampling = SamplingFilter({'users': 1, 'users.views': 0})
+        self.assertFalse(sampling.filter(self._record('users.views')))
+        self.assertTrue(sampling.filter(self._record('users.views', level=logging.WARNING)))
+        self.assertTrue(sampling.filter(self._record('users.serializers')))
+        self.assertTrue(sampling.filter(self._record('websites.views')))
+
+    def test_queue_handler_drops_when_full(self):
+        target = logging.Handler()
+        target.emit = mock.Mock()
+        handler = AsyncQueueHandler([target], queue_size=1)
+        handler.stop()
+        handler.handle(self._record('users.views'))
+        handler.handle(self._record('users.views'))
+        self.assertEqual(handler.dropped, 1)
+        handler.listener.start()
+        handler.stop()
+        self.assertEqual(target.emit.call_count, 1)
+        self.assertEqual(target.emit.call_args[0][0].getMessage(), '用户 tester 登录成功')
+
+    def test_queue_handler_reports_dropped_records(self):
+        target = logging.Handler()
+        target.emit = mock.Mock()
+        handler = AsyncQueueHandler([target], queue_size=2)
+        handler.stop()
+        for _ in range(4):
+            handler.handle(self._record('users.views'))
+        handler.listener.start()
+        handler.stop()
+
+        handler.handle(self._record('users.views'))
+        handler.handle(self._record('users.views'))
+        handler.listener.start()
+        handler.stop()
+        messages = [call.args[0].getMessage() for call in target.emit.call_args_list]
+        self.assertEqual(messages.count('日志队列已满，丢弃了 2 条记录'), 1)
+        self.assertEqual(target.emit.call_args_list[3].args[0].levelno, logging.WARNING)
+
+
+class HealthCheckTests(APITestCase):
+
+    def setUp(self):
+        health.reset()
+
+    def tearDown(self):
+        health.reset()
+
+    def test_liveness(self):
+        response = self.client.get('/api/health/live/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readiness_reports_each_dependency(self):
+        response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertFalse(data['cached'])
+        self.assertEqual(set(data['checks']), {'database', 'cache', 'storage', 'jobs'})
+        for check in data['checks'].values():
+            self.assertEqual(check['status'], 'ok')
+            self.assertGreaterEqual(check['latency_ms'], 0)
+
+        # 缓存期内不再探测
+        with mock.patch.object(health, 'run_probes') as run_probes:
+            self.assertTrue(self.client.get('/api/health/ready/').json()['cached'])
+        run_probes.assert_not_called()
+
+    def test_critical_failure_returns_503(self):
+        with mock.patch.object(health, '_probe_cache', side_effect=ConnectionError('refused')):
+            response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, 503)
+        data = response.json()
+        self.assertEqual(data['status'], 'unavailable')
+        self.assertEqual(data['checks']['cache'], {
+            'status': 'error', 'latency_ms': data['checks']['cache']['latency_ms'], 'error': 'ConnectionError',
+        })
+
+    @override_settings(HEALTH_PROBE_TIMEOUT=0.05)
+    def test_slow_optional_dependency_degrades(self):
+        with mock.patch.object(health, '_probe_storage', side_effect=lambda: time.sleep(0.3)):
+            response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'degraded')
+        self.assertEqual(data['checks']['storage']['status'], 'timeout')
@@ -0,0 +1,174 @@
+"""
+令牌桶限流
+
+每个 (作用域, 用户) 一个令牌桶：容量为速率中的次数，按速率匀速补充，
+允许短时突发但长期平均不超过配置的速率。
+
+桶状态保存在默认缓存中。配置 REDIS_URL 时用 Lua 脚本在 Redis 内原子地
+补充和扣减令牌，时间取 Redis 服务器时间，多个 gunicorn worker 和节点共享同一限额；
+未配置时退回进程内缓存，仅适合开发环境。
+
+匿名请求的 IP 由 DRF 的 get_ident 按 NUM_PROXIES 从 X-Forwarded-For 中选取，
+客户端自行填写的地址不会被当作来源 IP。
+
+作用域：
+- user / anon：所有请求的总体限额
+- scrape：会发起外部请求的接口
+- search：搜索接口
+- bulk：批量、导入导出等重型接口
+- write：其余修改数据的请求（未指定作用域时的默认值）
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# 返回 {是否允许, 需要等待的毫秒数}
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, wait}
+"""
+
+_local_lock = threading.Lock()
+_script = None
+
+
+def _consume_redis(cache, key, capacity, rate):
+    global _script
+    key = cache.make_and_validate_key(key)
+    client = cache._cache.get_client(key, write=True)
+    if _script is None:
+        # 脚本对象只缓存 SHA，每次用当前连接执行（EVALSHA，未加载时自动 SCRIPT LOAD）
+        _script = client.register_script(TOKEN_BUCKET_SCRIPT)
+    allowed, wait_ms = _script(keys=[key], args=[capacity, rate], client=client)
+    return bool(allowed), wait_ms / 1000
+
+
+def _consume_local(cache, key, capacity, rate):
+    with _local_lock:
+        now = time.time()
+        tokens, ts = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+        wait = 0.0
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        cache.set(key, (tokens, now), timeout=math.ceil(capacity / rate) + 1)
+    return allowed, wait
+
+
+def consume(key, capacity, period):
+    """从桶中取一个令牌，返回 (是否允许, 需要等待的秒数)"""
+    cache = caches['default']
+    rate = capacity / period
+    if isinstance(cache, RedisCache):
+        return _consume_redis(cache, key, capacity, rate)
+    return _consume_local(cache, key, capacity, rate)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    令牌桶限流基类
+
+    沿用 DRF 的速率格式（如 "60/min"）；作用域在请求时确定，
+    未配置速率的作用域不限流。被拒绝时 DRF 根据 wait() 返回 Retry-After。
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        # 作用域和速率在 allow_request 中确定
+        self.retry_after = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        self.scope = self.get_scope(request, view)
+        self.rate = self.get_rate() if self.scope else None
+        if not self.rate:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        allowed, self.retry_after = consume(
+            self.get_cache_key(request, view), self.num_requests, self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """总体限额：登录用户按用户，匿名请求按 IP"""
+
+    def get_scope(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return 'user'
+        return 'anon'
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """按视图的 throttle_scope 限流，未指定时修改请求归入 write"""
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None and request.method not in SAFE_METHODS:
+            scope = 'write'
+        return scope
+
+
+def throttle_scope(scope):
+    """
+    为函数视图指定限流作用域，放在 @api_view 之上：
+
+        @throttle_scope('search')
+        @api_view(['GET'])
+        def search(request): ...
+    """
+    def decorator(view):
+        view.cls.throttle_scope = scope
+        return view
+    return decorator
@@ -3,24 +3,31 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
-from .views import health_check, api_info, index
+from .views import health_check, api_info, index, liveness, metrics, readiness, slow_queries
 from .swagger_views import swagger_ui_fixed
 
 urlpatterns = [
     # 首页
     path('', index, name='index'),
     
+    path('admin/slow-queries/', admin.site.admin_view(slow_queries), name='admin-slow-queries'),
     path('admin/', admin.site.urls),
     
     # 系统接口
     path('api/health/', health_check, name='health-check'),
+    path('api/health/live/', liveness, name='health-live'),
+    path('api/health/ready/', readiness, name='health-ready'),
     path('api/info/', api_info, name='api-info'),
+    path('api/metrics/', metrics, name='metrics'),
     
     # API路由
     path('api/users/', include('users.urls')),
     path('api/websites/', include('websites.urls')),
     path('api/bookmarks/', include('bookmarks.urls')),
     path('api/analytics/', include('dashboard.urls')),
+    path('api/analytics/', include('analytics.urls')),
+    path('api/sync/', include('sync.urls')),
+    path('api/resources/', include('resources.urls')),
     
     # API文档路由
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
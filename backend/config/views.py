@@ -1,17 +1,24 @@
 """
 系统级视图
 """
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
 from django.conf import settings
+from django.contrib import admin
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 import django
 import sys
 from datetime import datetime
 
+from . import health
+from . import metrics as request_metrics
+from . import slow_queries as slow_query_log
+
 
 def index(request):
     """首页视图"""
@@ -45,6 +52,7 @@ def index(request):
 )
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@throttle_classes([])
 def health_check(request):
     """
     健康检查接口
@@ -139,4 +147,46 @@ def api_info(request):
             'redoc': request.build_absolute_uri('/api/redoc/'),
             'openapi_schema': request.build_absolute_uri('/api/schema/')
         }
-    })
\ No newline at end of file
+    })
+
+
+def metrics(request):
+    """Prometheus 指标接口，需要 METRICS_TOKEN（DEBUG 下未设置时不校验）"""
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), expected):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def liveness(request):
+    """存活检查：不访问任何依赖"""
+    return JsonResponse({'status': 'ok'})
+
+
+def readiness(request):
+    """就绪检查：探测各项依赖，关键依赖不可用时返回 503"""
+    result, cached = health.readiness()
+    return JsonResponse(
+        {**result, 'cached': cached, 'timestamp': datetime.now().isoformat()},
+        status=503 if result['status'] == 'unavailable' else 200,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+
+def slow_queries(request):
+    """管理后台：慢查询日志"""
+    if request.method == 'POST':
+        slow_query_log.clear()
+    entries = slow_query_log.recent()
+    return render(request, 'admin/slow_queries.html', {
+        **admin.site.each_context(request),
+        'title': '慢查询',
+        'threshold_ms': settings.SLOW_QUERY_MS,
+        'groups': slow_query_log.summarize(entries),
+        'entries': entries,
+        'log_params': any(entry['params'] is not None for entry in entries),
+    })
@@ -2,7 +2,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q
 from django.utils import timezone
 from datetime import timedelta
 import logging
@@ -44,18 +44,18 @@ def dashboard_stats(request):
         })
         
         # 分类统计
-        category_stats = Category.objects.filter(user=user).annotate(
-            sites_count=Count('websites')
-        ).values('name', 'sites_count', 'color')[:5]
+        category_stats = Category.objects.filter(user=user).values(
+            'name', 'color', sites_count=F('website_count')
+        )[:5]
         
         # 标签统计
-        tag_stats = Tag.objects.filter(user=user).annotate(
-            sites_count=Count('websites')
-        ).values('name', 'sites_count', 'color')[:5]
+        tag_stats = Tag.objects.filter(user=user).values(
+            'name', 'color', sites_count=F('usage_count')
+        )[:5]
         
         # 最近访问的网站
         recent_websites = Website.objects.filter(user=user).order_by('-last_visited')[:5].values(
-            'id', 'title', 'url', 'favicon', 'last_visited', 'visit_count'
+            'id', 'title', 'url', 'last_visited', 'visit_count', favicon=F('resource__favicon')
         )
         
         # 最近添加的书签
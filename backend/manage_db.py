@@ -51,6 +51,41 @@ def setup_database():
     
     print("数据库设置完成！")
 
+def benchmark_connections(requests=200):
+    """对比每个请求新建连接与持久连接的开销"""
+    import time
+    from django.core import signals
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    opened = []
+
+    def on_connection_created(sender, **kwargs):
+        opened.append(sender)
+
+    connection_created.connect(on_connection_created)
+    configured = connection.settings_dict['CONN_MAX_AGE']
+    print(f"数据库: {connection.vendor}，健康检查: {connection.settings_dict['CONN_HEALTH_CHECKS']}")
+    try:
+        for max_age in (0, configured):
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            opened.clear()
+            started = time.perf_counter()
+            for _ in range(requests):
+                # 与处理真实请求相同：请求开始和结束时 Django 按 CONN_MAX_AGE 关闭过期连接
+                signals.request_started.send(sender=None)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                signals.request_finished.send(sender=None)
+            elapsed = time.perf_counter() - started
+            print(f"CONN_MAX_AGE={max_age}: {requests} 个请求，新建连接 {len(opened)} 次，"
+                  f"平均每个请求 {elapsed / requests * 1000:.2f} ms")
+    finally:
+        connection.settings_dict['CONN_MAX_AGE'] = configured
+        connection_created.disconnect(on_connection_created)
+        connection.close()
+
 if __name__ == '__main__':
     if len(sys.argv) > 1:
         if sys.argv[1] == 'setup':
@@ -60,9 +95,12 @@ if __name__ == '__main__':
             if input("确定要重置数据库吗？(y/N): ").lower() == 'y':
                 execute_from_command_line(['manage.py', 'flush', '--noinput'])
                 setup_database()
+        elif sys.argv[1] == 'bench':
+            benchmark_connections(int(sys.argv[2]) if len(sys.argv) > 2 else 200)
         else:
             execute_from_command_line(sys.argv)
     else:
         print("使用方法:")
         print("  python manage_db.py setup    - 初始化数据库")
-        print("  python manage_db.py reset    - 重置数据库")
\ No newline at end of file
+        print("  python manage_db.py reset    - 重置数据库")
+        print("  python manage_db.py bench [N] - 对比 N 个请求下新建连接与持久连接的开销")
\ No newline at end of file
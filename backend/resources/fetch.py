@@ -0,0 +1,440 @@
+"""
+资源元数据抓取与健康检查
+
+结果写回共享的 Resource，同一 URL 无论被多少用户收藏都只抓取一次。
+
+a 开头的函数是供异步视图使用的协程版本：安装 httpx 时在事件循环中发起请求，
+一个 ASGI worker 可以同时等待数百个外部请求；未安装时在线程中执行同步版本。
+
+URL 由用户提交，请求前解析主机名并拒绝非公网地址（内网、回环、链路本地等），
+重定向不交给 HTTP 客户端自动跟随，而是逐跳校验后再请求。建立连接时再解析一次并
+直接连接校验过的地址（Host 头和 TLS SNI 仍使用原主机名），两次解析结果不同
+（DNS rebinding）也无法连到内网；出站请求不经过环境变量中的代理。
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+from urllib.parse import urljoin, urlparse
+
+import requests
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+try:
+    from bs4 import BeautifulSoup
+    HAS_BS4 = True
+except ImportError:
+    HAS_BS4 = False
+try:
+    import httpcore
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+TIMEOUT = 10
+FETCH_TTL = timedelta(days=7)
+CHECK_TTL = timedelta(days=1)
+
+FAVICON_MAX_SIZE = 256 * 1024
+MAX_REDIRECTS = 5
+
+METADATA_FIELDS = ['title', 'description', 'meta_keywords', 'meta_author', 'meta_language', 'favicon']
+HEALTH_FIELDS = ['http_status', 'is_reachable', 'loading_speed', 'checked_at']
+
+
+class UnsafeURL(Exception):
+    """URL 不是可以访问的公网 HTTP(S) 地址"""
+
+
+def _host_port(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise UnsafeURL('仅支持 http/https 地址')
+    try:
+        port = parsed.port
+    except ValueError:
+        raise UnsafeURL('端口无效')
+    return parsed.hostname, port or (443 if parsed.scheme == 'https' else 80)
+
+
+def _check_addresses(addresses):
+    """任一地址不是公网地址时抛出 UnsafeURL，返回去重后的地址"""
+    if not addresses:
+        raise UnsafeURL('无法解析主机名')
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise UnsafeURL('不允许访问内网地址')
+    return list(dict.fromkeys(addresses))
+
+
+def _resolve(host, port):
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+    except (OSError, UnicodeError):
+        addresses = []
+    return _check_addresses(addresses)
+
+
+async def _aresolve(host, port):
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = [info[4][0] for info in infos]
+    except (OSError, UnicodeError):
+        addresses = []
+    return _check_addresses(addresses)
+
+
+def validate_url(url):
+    """解析主机名，任一地址不是公网地址时抛出 UnsafeURL"""
+    _resolve(*_host_port(url))
+
+
+async def avalidate_url(url):
+    """validate_url 的协程版本"""
+    await _aresolve(*_host_port(url))
+
+
+class _PinnedConnectionMixin:
+    """连接前解析并校验主机名，直接连接校验过的地址；主机名仍用于 Host 头和证书校验"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        error = None
+        for address in _resolve(host, self.port):
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except (ConnectTimeoutError, NewConnectionError) as e:
+                error = e
+            finally:
+                self._dns_host = host
+        raise error
+
+
+class _PinnedHTTPConnection(_PinnedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _PinnedHTTPSConnection(_PinnedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _PinnedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PinnedHTTPConnection
+
+
+class _PinnedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PinnedHTTPSConnection
+
+
+class _PinnedAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _PinnedHTTPConnectionPool,
+            'https': _PinnedHTTPSConnectionPool,
+        }
+
+
+def _session():
+    session = requests.Session()
+    # 经代理时由代理解析主机名，地址校验失去意义
+    session.trust_env = False
+    session.mount('http://', _PinnedAdapter())
+    session.mount('https://', _PinnedAdapter())
+    return session
+
+
+@contextmanager
+def _stream(method, url):
+    """逐跳校验地址并跟随重定向，返回最终的流式响应"""
+    with _session() as session:
+        for _ in range(MAX_REDIRECTS + 1):
+            validate_url(url)
+            response = session.request(
+                method, url, headers=HEADERS, timeout=TIMEOUT, stream=True, allow_redirects=False
+            )
+            if not response.is_redirect:
+                break
+            response.close()
+            url = urljoin(url, response.headers['Location'])
+        else:
+            raise requests.TooManyRedirects('重定向次数过多')
+        try:
+            yield response
+        finally:
+            response.close()
+
+
+@asynccontextmanager
+async def _astream(client, method, url):
+    """_stream 的协程版本"""
+    request = client.build_request(method, url)
+    for _ in range(MAX_REDIRECTS + 1):
+        await avalidate_url(str(request.url))
+        response = await client.send(request, stream=True)
+        if response.next_request is None:
+            break
+        await response.aclose()
+        request = response.next_request
+    else:
+        raise httpx.TooManyRedirects('重定向次数过多', request=request)
+    try:
+        yield response
+    finally:
+        await response.aclose()
+
+
+def _meta(soup, name):
+    tag = soup.find('meta', attrs={'name': name})
+    return (tag.get('content') or '').strip() if tag else ''
+
+
+def parse_metadata(url, content):
+    """从页面 HTML 中提取元数据"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    title = ''
+    if soup.title and soup.title.string:
+        title = soup.title.string.strip()
+
+    favicon_link = soup.find('link', rel='icon') or soup.find('link', rel='shortcut icon')
+    if favicon_link and favicon_link.get('href'):
+        favicon = urljoin(url, favicon_link['href'])
+    else:
+        # 尝试默认favicon路径
+        parsed_url = urlparse(url)
+        favicon = f"{parsed_url.scheme}://{parsed_url.netloc}/favicon.ico"
+
+    language = ''
+    if soup.html and soup.html.get('lang'):
+        language = soup.html['lang'].strip()
+
+    return {
+        'title': title[:200],
+        'description': _meta(soup, 'description'),
+        'meta_keywords': _meta(soup, 'keywords'),
+        'meta_author': _meta(soup, 'author')[:100],
+        'meta_language': language[:10],
+        'favicon': favicon[:2048],
+    }
+
+
+def fetch_metadata(resource):
+    """抓取页面并保存元数据，同时记录一次健康状态"""
+    started = time.monotonic()
+    try:
+        with _stream('GET', resource.url) as response:
+            content = response.content
+    except (requests.RequestException, UnsafeURL) as e:
+        logger.error(f"获取网站信息失败: {str(e)}")
+        resource.save(update_fields=_set_fetch_failed(resource))
+        return resource
+
+    metadata = None
+    if response.ok and HAS_BS4:
+        metadata = parse_metadata(response.url, content)
+    fields = _set_fetched(resource, metadata, response.status_code, time.monotonic() - started)
+    resource.save(update_fields=fields)
+    return resource
+
+
+def check_health(resource):
+    """HEAD 请求检查可访问性和响应时间，不支持 HEAD 的站点退回 GET"""
+    started = time.monotonic()
+    try:
+        with _stream('HEAD', resource.url) as response:
+            pass
+        if response.status_code in (405, 501):
+            with _stream('GET', resource.url) as response:
+                pass
+    except (requests.RequestException, UnsafeURL) as e:
+        logger.error(f"网站健康检查失败: {str(e)}")
+        resource.save(update_fields=_set_health(resource, None, None))
+        return resource
+    resource.save(update_fields=_set_health(resource, response.status_code, time.monotonic() - started))
+    return resource
+
+
+def fetch_favicon(url):
+    """下载图标，返回 (内容, Content-Type)；失败、不是图片或超过大小限制时返回 None"""
+    try:
+        with _stream('GET', url) as response:
+            content_type = _favicon_type(response.status_code, response.headers.get('Content-Type'))
+            if content_type is None:
+                return None
+            content = b''
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                content += chunk
+                if len(content) > FAVICON_MAX_SIZE:
+                    return None
+    except (requests.RequestException, UnsafeURL) as e:
+        logger.error(f"获取网站图标失败: {str(e)}")
+        return None
+    return content, content_type
+
+
+async def afetch_metadata(resource):
+    """fetch_metadata 的协程版本"""
+    if not HAS_HTTPX:
+        return await sync_to_async(fetch_metadata)(resource)
+
+    started = time.monotonic()
+    try:
+        async with _async_client() as client:
+            async with _astream(client, 'GET', resource.url) as response:
+                await response.aread()
+    except (httpx.HTTPError, UnsafeURL) as e:
+        logger.error(f"获取网站信息失败: {str(e)}")
+        await resource.asave(update_fields=_set_fetch_failed(resource))
+        return resource
+
+    elapsed = time.monotonic() - started
+    metadata = None
+    if response.status_code < 400 and HAS_BS4:
+        # 解析是纯 CPU 操作，放到线程池中避免阻塞事件循环
+        metadata = await sync_to_async(parse_metadata, thread_sensitive=False)(
+            str(response.url), response.content
+        )
+    fields = _set_fetched(resource, metadata, response.status_code, elapsed)
+    await resource.asave(update_fields=fields)
+    return resource
+
+
+async def acheck_health(resource):
+    """check_health 的协程版本"""
+    if not HAS_HTTPX:
+        return await sync_to_async(check_health)(resource)
+
+    started = time.monotonic()
+    try:
+        async with _async_client() as client:
+            async with _astream(client, 'HEAD', resource.url) as response:
+                pass
+            if response.status_code in (405, 501):
+                async with _astream(client, 'GET', resource.url) as response:
+                    pass
+    except (httpx.HTTPError, UnsafeURL) as e:
+        logger.error(f"网站健康检查失败: {str(e)}")
+        await resource.asave(update_fields=_set_health(resource, None, None))
+        return resource
+    await resource.asave(update_fields=_set_health(resource, response.status_code, time.monotonic() - started))
+    return resource
+
+
+async def afetch_favicon(url):
+    """fetch_favicon 的协程版本"""
+    if not HAS_HTTPX:
+        return await sync_to_async(fetch_favicon, thread_sensitive=False)(url)
+
+    try:
+        async with _async_client() as client:
+            async with _astream(client, 'GET', url) as response:
+                content_type = _favicon_type(response.status_code, response.headers.get('Content-Type'))
+                if content_type is None:
+                    return None
+                content = b''
+                async for chunk in response.aiter_bytes():
+                    content += chunk
+                    if len(content) > FAVICON_MAX_SIZE:
+                        return None
+    except (httpx.HTTPError, UnsafeURL) as e:
+        logger.error(f"获取网站图标失败: {str(e)}")
+        return None
+    return content, content_type
+
+
+if HAS_HTTPX:
+    class _PinnedBackend(httpcore.AsyncNetworkBackend):
+        """_PinnedConnectionMixin 的 httpcore 版本：TLS 握手仍以原主机名进行"""
+
+        def __init__(self):
+            self._backend = httpcore.AnyIOBackend()
+
+        async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+            error = None
+            for address in await _aresolve(host, port):
+                try:
+                    return await self._backend.connect_tcp(
+                        address, port, timeout=timeout,
+                        local_address=local_address, socket_options=socket_options,
+                    )
+                except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                    error = e
+            raise error
+
+        async def sleep(self, seconds):
+            await self._backend.sleep(seconds)
+
+    class _PinnedTransport(httpx.AsyncHTTPTransport):
+
+        def __init__(self):
+            super().__init__()
+            self._pool = httpcore.AsyncConnectionPool(
+                ssl_context=httpx.create_ssl_context(), network_backend=_PinnedBackend()
+            )
+
+
+def _async_client():
+    # 客户端绑定创建它的事件循环，WSGI 下每个请求的事件循环不同，因此按请求创建；
+    # 重定向由 _astream 逐跳校验后跟随；传入 transport 后不再使用环境变量中的代理
+    return httpx.AsyncClient(headers=HEADERS, timeout=TIMEOUT, transport=_PinnedTransport())
+
+
+def _favicon_type(http_status, content_type):
+    """图标以本站域名返回，只接受声明为图片的响应；SVG 可以携带脚本，同样拒绝"""
+    if http_status >= 400:
+        return None
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type.startswith('image/') and content_type != 'image/svg+xml':
+        return content_type
+    return None
+
+
+def _set_fetched(resource, metadata, http_status, elapsed):
+    """写入抓取结果，返回需要保存的字段"""
+    fields = ['fetched_at']
+    if metadata is not None:
+        for field, value in metadata.items():
+            setattr(resource, field, value)
+        fields.extend(METADATA_FIELDS)
+    resource.fetched_at = timezone.now()
+    return fields + _set_health(resource, http_status, elapsed)
+
+
+def _set_fetch_failed(resource):
+    resource.fetched_at = timezone.now()
+    return ['fetched_at'] + _set_health(resource, None, None)
+
+
+def _set_health(resource, http_status, elapsed):
+    resource.http_status = http_status
+    resource.is_reachable = http_status is not None and http_status < 400
+    resource.loading_speed = round(elapsed, 3) if elapsed is not None else None
+    resource.checked_at = timezone.now()
+    return list(HEALTH_FIELDS)
+
+
+def needs_fetch(resource):
+    return resource.fetched_at is None or resource.fetched_at < timezone.now() - FETCH_TTL
+
+
+def needs_check(resource):
+    return resource.checked_at is None or resource.checked_at < timezone.now() - CHECK_TTL
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from bookmarks.models import Bookmark
+from resources.fetch import CHECK_TTL, FETCH_TTL, check_health, fetch_metadata
+from resources.models import Resource
+from resources.registry import attach_resources, orphaned_resources
+from websites.models import Website
+
+
+class Command(BaseCommand):
+    help = '刷新共享URL资源：关联未登记的网站和书签，抓取元数据，检查健康状态，清理无引用的资源'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=200,
+            help='本次最多抓取和检查的资源数 (默认: 200)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='关联资源时每批处理的记录数 (默认: 1000)'
+        )
+        parser.add_argument(
+            '--skip-network',
+            action='store_true',
+            help='只关联和清理，不发起网络请求'
+        )
+
+    def handle(self, *args, **options):
+        linked = sum(self.link(model, options['batch_size']) for model in (Website, Bookmark))
+        self.stdout.write(f'已关联 {linked} 条记录')
+
+        if not options['skip_network']:
+            now = timezone.now()
+            limit = options['limit']
+            stale = Resource.objects.filter(
+                Q(fetched_at__isnull=True) | Q(fetched_at__lt=now - FETCH_TTL)
+            ).order_by('fetched_at', 'id')[:limit]
+            fetched = 0
+            for resource in stale:
+                fetch_metadata(resource)
+                fetched += 1
+
+            unchecked = Resource.objects.filter(
+                Q(checked_at__isnull=True) | Q(checked_at__lt=now - CHECK_TTL)
+            ).order_by('checked_at', 'id')[:limit]
+            checked = 0
+            for resource in unchecked:
+                check_health(resource)
+                checked += 1
+            self.stdout.write(f'已抓取 {fetched} 个资源，已检查 {checked} 个资源')
+
+        deleted, _ = orphaned_resources().delete()
+        self.stdout.write(self.style.SUCCESS(f'资源刷新完成，清理 {deleted} 个无引用的资源'))
+
+    def link(self, model, batch_size):
+        """QuerySet.update 修改 URL 等绕过信号的写入留下的未关联记录"""
+        total = 0
+        while True:
+            batch = list(model.objects.filter(resource__isnull=True).only('id', 'url')[:batch_size])
+            if not batch:
+                return total
+            attach_resources(batch)
+            model.objects.bulk_update(batch, ['resource'])
+            total += len(batch)
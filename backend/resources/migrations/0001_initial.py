@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:02
+
+import config.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2048, verbose_name='规范化链接')),
+                ('url_hash', config.fields.UrlHashField(unique=True, verbose_name='URL摘要')),
+                ('title', models.CharField(blank=True, max_length=200, verbose_name='页面标题')),
+                ('description', models.TextField(blank=True, verbose_name='页面描述')),
+                ('favicon', models.URLField(blank=True, max_length=2048, verbose_name='网站图标')),
+                ('screenshot', models.ImageField(blank=True, null=True, upload_to='screenshots/', verbose_name='网站截图')),
+                ('meta_keywords', models.TextField(blank=True, verbose_name='关键词')),
+                ('meta_author', models.CharField(blank=True, max_length=100, verbose_name='作者')),
+                ('meta_language', models.CharField(blank=True, max_length=10, verbose_name='语言')),
+                ('fetched_at', models.DateTimeField(blank=True, null=True, verbose_name='抓取时间')),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='HTTP状态码')),
+                ('is_reachable', models.BooleanField(null=True, verbose_name='是否可访问')),
+                ('loading_speed', models.FloatField(blank=True, null=True, verbose_name='加载速度')),
+                ('checked_at', models.DateTimeField(blank=True, null=True, verbose_name='检查时间')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': 'URL资源',
+                'verbose_name_plural': 'URL资源',
+                'db_table': 'resources',
+                'indexes': [models.Index(fields=['fetched_at'], name='resources_fetched_idx'), models.Index(fields=['checked_at'], name='resources_checked_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resource',
+            name='url',
+            field=models.URLField(max_length=4096, verbose_name='规范化链接'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import models
+
+from config.fields import UrlHashField
+
+
+class Resource(models.Model):
+    """
+    全局 URL 资源
+
+    按规范化 URL 全局唯一，所有用户共享抓取到的元数据、图标、截图和健康状态；
+    用户的网站和书签通过外键引用，抓取和健康检查的次数只与不同 URL 的数量有关。
+    """
+    # 规范化可能补全协议、转换国际化域名，比原始链接略长
+    url = models.URLField(max_length=4096, verbose_name='规范化链接')
+    url_hash = UrlHashField(unique=True, verbose_name='URL摘要')
+
+    # 抓取的元数据
+    title = models.CharField(max_length=200, blank=True, verbose_name='页面标题')
+    description = models.TextField(blank=True, verbose_name='页面描述')
+    favicon = models.URLField(max_length=2048, blank=True, verbose_name='网站图标')
+    screenshot = models.ImageField(upload_to='screenshots/', blank=True, null=True, verbose_name='网站截图')
+    meta_keywords = models.TextField(blank=True, verbose_name='关键词')
+    meta_author = models.CharField(max_length=100, blank=True, verbose_name='作者')
+    meta_language = models.CharField(max_length=10, blank=True, verbose_name='语言')
+    fetched_at = models.DateTimeField(null=True, blank=True, verbose_name='抓取时间')
+
+    # 健康状态
+    http_status = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='HTTP状态码')
+    is_reachable = models.BooleanField(null=True, verbose_name='是否可访问')
+    loading_speed = models.FloatField(null=True, blank=True, verbose_name='加载速度')
+    checked_at = models.DateTimeField(null=True, blank=True, verbose_name='检查时间')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    class Meta:
+        verbose_name = 'URL资源'
+        verbose_name_plural = 'URL资源'
+        db_table = 'resources'
+        indexes = [
+            models.Index(fields=['fetched_at'], name='resources_fetched_idx'),
+            models.Index(fields=['checked_at'], name='resources_checked_idx'),
+        ]
+
+    def __str__(self):
+        return self.url
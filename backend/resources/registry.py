@@ -0,0 +1,67 @@
+"""
+URL 资源登记
+
+单条保存由 signals 自动关联资源；bulk_create / bulk_update 等绕过信号的批量路径
+需要在写入前调用 attach_resources。
+"""
+from django.db.models import Exists, OuterRef
+
+from config.canonical import canonicalize_url, url_hash
+
+from .models import Resource
+
+
+def resource_for(url):
+    """取得（必要时创建）URL 对应的资源"""
+    resource, _ = Resource.objects.get_or_create(
+        url_hash=url_hash(url),
+        defaults={'url': canonicalize_url(url)},
+    )
+    return resource
+
+
+async def aresource_for(url):
+    """resource_for 的协程版本"""
+    resource, _ = await Resource.objects.aget_or_create(
+        url_hash=url_hash(url),
+        defaults={'url': canonicalize_url(url)},
+    )
+    return resource
+
+
+def resource_ids(urls):
+    """{URL摘要: 资源ID}，缺少的资源一次性批量创建"""
+    canonical = {}
+    for url in urls:
+        canonical.setdefault(url_hash(url), canonicalize_url(url))
+    if not canonical:
+        return {}
+
+    ids = dict(Resource.objects.filter(url_hash__in=canonical).values_list('url_hash', 'id'))
+    missing = [url_hash_ for url_hash_ in canonical if url_hash_ not in ids]
+    if missing:
+        # 并发创建同一资源时以先写入的为准
+        Resource.objects.bulk_create(
+            [Resource(url=canonical[url_hash_]) for url_hash_ in missing],
+            ignore_conflicts=True,
+        )
+        ids.update(Resource.objects.filter(url_hash__in=missing).values_list('url_hash', 'id'))
+    return ids
+
+
+def attach_resources(instances):
+    """为一批网站或书签设置 resource_id（不保存）"""
+    ids = resource_ids(instance.url for instance in instances)
+    for instance in instances:
+        instance.resource_id = ids[url_hash(instance.url)]
+
+
+def orphaned_resources():
+    """没有任何网站或书签引用的资源"""
+    from bookmarks.models import Bookmark
+    from websites.models import Website
+
+    return Resource.objects.filter(
+        ~Exists(Website.objects.filter(resource=OuterRef('pk'))),
+        ~Exists(Bookmark.objects.filter(resource=OuterRef('pk'))),
+    )
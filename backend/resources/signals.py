@@ -0,0 +1,16 @@
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from config.canonical import url_hash
+from websites.models import Website
+from bookmarks.models import Bookmark
+
+from .registry import resource_for
+
+
+@receiver(pre_save, sender=Website)
+@receiver(pre_save, sender=Bookmark)
+def link_resource(sender, instance, **kwargs):
+    """新建或 URL 变化时关联资源；url_hash 此时仍是修改前的值"""
+    if instance.resource_id is None or instance.url_hash != url_hash(instance.url):
+        instance.resource = resource_for(instance.url)
@@ -0,0 +1,295 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from users.authentication import ClaimsRefreshToken
+from users.models import User
+from websites.models import Website
+from bookmarks.models import Bookmark, Collection
+
+from . import fetch
+from .fetch import check_health, fetch_metadata
+from .models import Resource
+
+PAGE = b"""<html lang="en"><head><title> Example </title>
+<meta name="description" content="An example page">
+<meta name="keywords" content="example, test">
+<link rel="icon" href="/static/icon.png"></head></html>"""
+
+# 测试不依赖真实 DNS；IP 字面量解析为自身
+ADDRESSES = {'example.com': '93.184.216.34', 'www.example.com': '93.184.216.34', 'internal.example.com': '10.0.0.5'}
+
+
+def fake_getaddrinfo(host, port, *args, **kwargs):
+    return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (ADDRESSES.get(host, host), port))]
+
+
+def resolve_fake_addresses(test):
+    patcher = mock.patch('socket.getaddrinfo', side_effect=fake_getaddrinfo)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+class ResourceTests(APITestCase):
+
+    def setUp(self):
+        resolve_fake_addresses(self)
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_equivalent_urls_share_one_resource(self):
+        first = Website.objects.create(title='a', url='http://www.example.com/', user=self.user)
+        second = Website.objects.create(title='b', url='https://example.com', user=self.other)
+        collection = Collection.objects.create(name='默认', user=self.user)
+        bookmark = Bookmark.objects.create(
+            title='c', url='https://example.com/?utm_medium=x', collection=collection, user=self.user
+        )
+        self.assertEqual(Resource.objects.count(), 1)
+        self.assertEqual({first.resource_id, second.resource_id, bookmark.resource_id}, {first.resource_id})
+        self.assertEqual(first.resource.url, 'https://example.com/')
+
+        first.url = 'https://other.com/'
+        first.save()
+        self.assertNotEqual(first.resource_id, second.resource_id)
+
+    def test_batch_create_attaches_resources(self):
+        Website.objects.create(title='a', url='https://example.com/0', user=self.other)
+        response = self.client.post('/api/websites/batch/', [
+            {'title': f'site {i}', 'url': f'https://example.com/{i}'} for i in range(3)
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Resource.objects.count(), 3)
+        self.assertFalse(Website.objects.filter(resource__isnull=True).exists())
+
+    def test_fetch_metadata_is_shown_to_every_user(self):
+        website = Website.objects.create(title='a', url='https://example.com/', user=self.user)
+        Website.objects.create(title='b', url='https://www.example.com/', user=self.other)
+        response = mock.Mock(ok=True, status_code=200, url='https://example.com/', content=PAGE, is_redirect=False)
+        with mock.patch('resources.fetch.requests.Session.request', return_value=response) as get:
+            fetch_metadata(website.resource)
+        get.assert_called_once()
+
+        resource = Resource.objects.get()
+        self.assertEqual(resource.title, 'Example')
+        self.assertEqual(resource.favicon, 'https://example.com/static/icon.png')
+        self.assertEqual((resource.http_status, resource.is_reachable), (200, True))
+
+        self.client.force_authenticate(self.other)
+        data = self.client.get('/api/websites/').data['results'][0]
+        self.assertEqual(data['favicon'], 'https://example.com/static/icon.png')
+
+    def test_redirect_to_private_address_is_not_followed(self):
+        website = Website.objects.create(title='a', url='https://example.com/', user=self.user)
+        redirect = mock.Mock(status_code=302, is_redirect=True, headers={'Location': 'http://internal.example.com/admin'})
+        with mock.patch('resources.fetch.requests.Session.request', return_value=redirect) as get:
+            fetch_metadata(website.resource)
+        get.assert_called_once()
+        self.assertEqual(get.call_args.args[1], 'https://example.com/')
+
+        resource = Resource.objects.get()
+        self.assertIsNotNone(resource.fetched_at)
+        self.assertEqual((resource.title, resource.is_reachable), ('', False))
+
+    def test_refresh_links_unattached_rows_and_prunes_orphans(self):
+        website = Website.objects.create(title='a', url='https://example.com/', user=self.user)
+        Website.objects.filter(id=website.id).update(url='https://moved.com/', resource=None)
+        call_command('refresh_resources', '--skip-network', stdout=mock.Mock())
+
+        website.refresh_from_db()
+        self.assertEqual(website.resource.url, 'https://moved.com/')
+        self.assertEqual(list(Resource.objects.values_list('url', flat=True)), ['https://moved.com/'])
+
+
+@mock.patch('resources.fetch.HAS_HTTPX', False)
+class AsyncViewTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        resolve_fake_addresses(self)
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        response = self.client.post('/api/resources/fetch-info/', {'url': 'https://example.com/'}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('detail', response.json())
+        self.assertEqual(self.client.get('/api/resources/fetch-info/').status_code, 401)
+
+    def test_fetch_info_is_cached_on_resource(self):
+        page = mock.Mock(ok=True, status_code=200, url='https://example.com/', content=PAGE, is_redirect=False)
+        with mock.patch('resources.fetch.requests.Session.request', return_value=page) as get:
+            first = self.client.post('/api/resources/fetch-info/', {'url': 'https://example.com/'}, format='json')
+            second = self.client.post('/api/resources/fetch-info/', {'url': 'https://www.example.com'}, format='json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['title'], 'Example')
+        self.assertEqual(second.json(), first.json())
+        get.assert_called_once()
+
+    def test_check_link(self):
+        head = mock.Mock(status_code=404, is_redirect=False)
+        with mock.patch('resources.fetch.requests.Session.request', return_value=head):
+            response = self.client.post('/api/resources/check/', {'url': 'https://example.com/gone'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['http_status'], response.json()['is_reachable']), (404, False))
+
+    def test_favicon_proxies_image(self):
+        Resource.objects.create(
+            url='https://example.com/', favicon='https://example.com/icon.png', fetched_at=timezone.now()
+        )
+        icon = mock.MagicMock(status_code=200, headers={'Content-Type': 'image/png'}, is_redirect=False)
+        icon.iter_content.return_value = [b'\x89PNG']
+        with mock.patch('resources.fetch.requests.Session.request', return_value=icon) as get:
+            response = self.client.get('/api/resources/favicon/', {'url': 'https://example.com/'})
+        get.assert_called_once()
+        self.assertEqual(get.call_args.args[1], 'https://example.com/icon.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, b'\x89PNG')
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+    def test_private_addresses_are_rejected(self):
+        with mock.patch('resources.fetch.requests.Session.request') as head:
+            for url in ['http://127.0.0.1:6379/', 'http://internal.example.com/', 'http://[::ffff:169.254.169.254]/']:
+                response = self.client.post('/api/resources/check/', {'url': url, 'force': True}, format='json')
+                self.assertEqual(response.status_code, 400, url)
+            response = self.client.post('/api/resources/check/', {'url': 'file:///etc/passwd'}, format='json')
+            self.assertEqual(response.status_code, 400)
+        head.assert_not_called()
+        self.assertFalse(Resource.objects.exists())
+
+    def test_favicon_requires_image_content_type(self):
+        Resource.objects.create(
+            url='https://example.com/', favicon='https://example.com/favicon.ico', fetched_at=timezone.now()
+        )
+        for content_type in ['text/html', '', 'image/svg+xml']:
+            page = mock.MagicMock(status_code=200, headers={'Content-Type': content_type}, is_redirect=False)
+            page.iter_content.return_value = [b'<html>']
+            with mock.patch('resources.fetch.requests.Session.request', return_value=page):
+                response = self.client.get('/api/resources/favicon/', {'url': 'https://example.com/'})
+            self.assertEqual(response.status_code, 404, content_type)
+
+
+@skipUnless(fetch.HAS_HTTPX, 'httpx 未安装')
+class HttpxFetchTests(APITestCase):
+    """经 httpx.MockTransport 走异步客户端的真实请求流程"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        resolve_fake_addresses(self)
+        self.requested = []
+
+        import httpx
+
+        def handler(request):
+            self.requested.append(str(request.url))
+            if request.url.path == '/moved':
+                return httpx.Response(301, headers={'Location': '/icon.png'})
+            if request.url.path == '/icon.png':
+                return httpx.Response(200, headers={'Content-Type': 'image/png'}, content=b'\x89PNG')
+            if request.url.path == '/metadata':
+                return httpx.Response(302, headers={'Location': 'http://169.254.169.254/latest/meta-data/'})
+            return httpx.Response(200, headers={'Content-Type': 'text/html'}, content=PAGE)
+
+        transport = httpx.MockTransport(handler)
+        patcher = mock.patch(
+            'resources.fetch._async_client',
+            lambda: httpx.AsyncClient(headers=fetch.HEADERS, transport=transport),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_favicon_follows_public_redirect(self):
+        Resource.objects.create(
+            url='https://example.com/', favicon='https://example.com/moved', fetched_at=timezone.now()
+        )
+        response = self.client.get('/api/resources/favicon/', {'url': 'https://example.com/'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'\x89PNG')
+        self.assertEqual(self.requested, ['https://example.com/moved', 'https://example.com/icon.png'])
+
+    def test_redirect_to_link_local_address_is_not_followed(self):
+        response = self.client.post(
+            '/api/resources/check/', {'url': 'https://example.com/metadata', 'force': True}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['is_reachable'])
+        self.assertEqual(self.requested, ['https://example.com/metadata'])
+
+
+class DNSRebindingTests(APITestCase):
+    """校验时主机名解析为公网地址，连接时解析为本机地址"""
+
+    def setUp(self):
+        requested = self.requested = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                requested.append(self.headers['Host'])
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.host = f'rebind.example.com:{server.server_port}'
+        self.resource = Resource.objects.create(url=f'http://{self.host}/')
+
+        answers = iter(['93.184.216.34'])
+
+        def rebinding_getaddrinfo(host, port, *args, **kwargs):
+            # anyio 以 IDNA 编码后的 bytes 传入主机名
+            if isinstance(host, bytes):
+                host = host.decode()
+            if host == 'rebind.example.com':
+                host = next(answers, '127.0.0.1')
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (host, port))]
+
+        patcher = mock.patch('socket.getaddrinfo', side_effect=rebinding_getaddrinfo)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_connects_to_validated_address(self):
+        check_health(self.resource)
+        self.assertFalse(self.resource.is_reachable)
+        self.assertEqual(self.requested, [])
+
+    def test_requests_keeps_host_header(self):
+        with mock.patch('resources.fetch._check_addresses', side_effect=lambda addresses: addresses):
+            check_health(self.resource)
+        self.assertTrue(self.resource.is_reachable)
+        self.assertEqual(self.requested, [self.host])
+
+    @skipUnless(fetch.HAS_HTTPX, 'httpx 未安装')
+    def test_httpx_connects_to_validated_address(self):
+        async_to_sync(fetch.acheck_health)(self.resource)
+        self.assertFalse(self.resource.is_reachable)
+        self.assertEqual(self.requested, [])
+
+    @skipUnless(fetch.HAS_HTTPX, 'httpx 未安装')
+    def test_httpx_keeps_host_header(self):
+        with mock.patch('resources.fetch._check_addresses', side_effect=lambda addresses: addresses):
+            async_to_sync(fetch.acheck_health)(self.resource)
+        self.assertTrue(self.resource.is_reachable)
+        self.assertEqual(self.requested, [self.host])
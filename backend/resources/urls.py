@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('fetch-info/', views.fetch_info, name='resource-fetch-info'),
+    path('check/', views.check_link, name='resource-check'),
+    path('favicon/', views.favicon, name='resource-favicon'),
+]
@@ -0,0 +1,114 @@
+"""
+外部请求接口（异步）
+
+抓取元数据、检查链接和获取图标都要等待外部站点响应，实现为 async 视图，
+ASGI 部署下等待期间不占用 worker。结果缓存在共享资源上，未过期时不再发起请求。
+"""
+import logging
+
+from django.http import HttpResponse
+
+from config.async_views import async_api_view, json_response
+
+from .fetch import (
+    UnsafeURL, afetch_favicon, afetch_metadata, acheck_health, avalidate_url, needs_check, needs_fetch
+)
+from .registry import aresource_for
+
+logger = logging.getLogger(__name__)
+
+
+def _url_required():
+    return json_response({'error': '请提供网站URL'}, status=400)
+
+
+async def _invalid_url(url):
+    """URL 不可访问时返回 400 响应，否则返回 None；抓取时每次重定向仍会再次校验"""
+    try:
+        await avalidate_url(url)
+    except UnsafeURL as e:
+        return json_response({'error': str(e)}, status=400)
+    return None
+
+
+@async_api_view(['POST'], throttle_scope='scrape')
+async def fetch_info(request):
+    """获取网站元数据"""
+    try:
+        url = request.data.get('url') if isinstance(request.data, dict) else None
+        if not url:
+            return _url_required()
+        invalid = await _invalid_url(url)
+        if invalid:
+            return invalid
+
+        resource = await aresource_for(url)
+        if needs_fetch(resource):
+            await afetch_metadata(resource)
+        return json_response({
+            'title': resource.title,
+            'description': resource.description,
+            'meta_keywords': resource.meta_keywords,
+            'favicon': resource.favicon,
+        })
+
+    except Exception as e:
+        logger.error(f"获取网站信息失败: {str(e)}")
+        return json_response({'error': '获取网站信息失败'}, status=500)
+
+
+@async_api_view(['POST'], throttle_scope='scrape')
+async def check_link(request):
+    """检查链接可访问性，请求体 {"url": ..., "force": false}"""
+    try:
+        url = request.data.get('url') if isinstance(request.data, dict) else None
+        if not url:
+            return _url_required()
+        invalid = await _invalid_url(url)
+        if invalid:
+            return invalid
+
+        resource = await aresource_for(url)
+        if request.data.get('force') or needs_check(resource):
+            await acheck_health(resource)
+        return json_response({
+            'url': resource.url,
+            'http_status': resource.http_status,
+            'is_reachable': resource.is_reachable,
+            'loading_speed': resource.loading_speed,
+            'checked_at': resource.checked_at.isoformat() if resource.checked_at else None,
+        })
+
+    except Exception as e:
+        logger.error(f"检查链接失败: {str(e)}")
+        return json_response({'error': '检查链接失败'}, status=500)
+
+
+@async_api_view(['GET'], throttle_scope='scrape')
+async def favicon(request):
+    """获取网站图标（图片内容），?url=网站地址"""
+    try:
+        url = request.GET.get('url')
+        if not url:
+            return _url_required()
+        invalid = await _invalid_url(url)
+        if invalid:
+            return invalid
+
+        resource = await aresource_for(url)
+        if needs_fetch(resource):
+            await afetch_metadata(resource)
+        icon = await afetch_favicon(resource.favicon) if resource.favicon else None
+        if icon is None:
+            return json_response({'error': '未找到网站图标'}, status=404)
+
+        content, content_type = icon
+        response = HttpResponse(content, content_type=content_type)
+        response['Cache-Control'] = 'private, max-age=86400'
+        response['X-Content-Type-Options'] = 'nosniff'
+        response['Content-Security-Policy'] = "default-src 'none'; sandbox"
+        return response
+
+    except Exception as e:
+        logger.error(f"获取网站图标失败: {str(e)}")
+        return json_response({'error': '获取网站图标失败'}, status=500)
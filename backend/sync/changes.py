@@ -0,0 +1,127 @@
+"""
+同步变更的记录与读取
+
+单个对象的增删改由 signals 自动记录；bulk_create / update / 直接删除等
+绕过信号的批量路径需要显式调用 record_changes。
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Max
+
+from websites.models import Category, Tag, Website, WebsiteNote
+from bookmarks.models import Bookmark, Collection
+
+from .models import ChangeLog
+
+# 数据类型 -> (模型, 同步字段)；计数器等派生字段不参与同步
+SYNC_MODELS = {
+    'websites': (Website, [
+        'id', 'title', 'url', 'description', 'category_id',
+        'is_active', 'is_public', 'created_at', 'updated_at',
+    ]),
+    'bookmarks': (Bookmark, [
+        'id', 'title', 'url', 'description', 'notes', 'thumbnail', 'collection_id',
+        'is_favorite', 'is_archived', 'created_at', 'updated_at',
+    ]),
+    'collections': (Collection, [
+        'id', 'name', 'description', 'color', 'is_default', 'created_at', 'updated_at',
+    ]),
+    'tags': (Tag, ['id', 'name', 'color', 'created_at']),
+    'categories': (Category, [
+        'id', 'name', 'description', 'color', 'icon', 'parent_id', 'sort_order',
+        'created_at', 'updated_at',
+    ]),
+    'notes': (WebsiteNote, [
+        'id', 'website_id', 'title', 'content', 'is_private', 'note_type',
+        'created_at', 'updated_at',
+    ]),
+}
+
+# 来自关联对象的同步字段
+SYNC_EXPRESSIONS = {
+    'websites': {'favicon': F('resource__favicon')},
+}
+
+MODEL_KEYS = {model: key for key, (model, _) in SYNC_MODELS.items()}
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+
+def record_changes(user_id, model, ids, operation='upsert'):
+    """
+    记录一组对象的变更，model 为 SYNC_MODELS 的键或模型类
+
+    锁定用户行后分配序号，锁随外层事务提交才释放：同一用户的另一个事务要等
+    这个事务提交后才能分配到更大的序号，客户端读到某个序号时，更小的序号都已提交。
+    计数器更新同样锁定用户行，两者不会因加锁顺序相反而死锁。
+    """
+    if not isinstance(model, str):
+        model = MODEL_KEYS[model]
+    ids = list(ids)
+    if not ids:
+        return
+    # 只为持有行锁而开启事务，已在外层事务中时不另建保存点
+    with transaction.atomic(savepoint=False):
+        get_user_model().objects.select_for_update().filter(pk=user_id).values_list('pk').first()
+        last = ChangeLog.objects.filter(user_id=user_id).aggregate(last=Max('sequence'))['last'] or 0
+        ChangeLog.objects.bulk_create([
+            ChangeLog(
+                user_id=user_id, model=model, object_id=object_id, operation=operation,
+                sequence=last + offset,
+            )
+            for offset, object_id in enumerate(ids, start=1)
+        ])
+
+
+def _website_tag_ids(website_ids):
+    tag_ids = {website_id: [] for website_id in website_ids}
+    for website_id, tag_id in Website.tags.through.objects.filter(
+        website_id__in=website_ids
+    ).order_by('id').values_list('website_id', 'tag_id'):
+        tag_ids[website_id].append(tag_id)
+    return tag_ids
+
+
+def changes_since(user, cursor, limit=DEFAULT_LIMIT):
+    """
+    读取游标之后的变更
+
+    同一对象的多条变更只保留最后一次；需要返回的对象按类型各一次查询载入，
+    载入时已不存在的对象按删除处理（其删除记录位于更后面的页）。
+    """
+    rows = list(
+        ChangeLog.objects.filter(user=user, sequence__gt=cursor)
+        .order_by('sequence')
+        .values_list('sequence', 'model', 'object_id', 'operation')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for _, model, object_id, operation in rows:
+        latest[(model, object_id)] = operation
+
+    changes = {}
+    for key, (model, fields) in SYNC_MODELS.items():
+        upsert_ids = [pk for (name, pk), op in latest.items() if name == key and op == 'upsert']
+        deletes = [pk for (name, pk), op in latest.items() if name == key and op == 'delete']
+        upserts = []
+        if upsert_ids:
+            upserts = list(model.objects.filter(user=user, id__in=upsert_ids).order_by('id')
+                .values(*fields, **SYNC_EXPRESSIONS.get(key, {}))
+            )
+            found = {item['id'] for item in upserts}
+            deletes.extend(pk for pk in upsert_ids if pk not in found)
+            if model is Website:
+                tag_ids = _website_tag_ids(found)
+                for item in upserts:
+                    item['tag_ids'] = tag_ids[item['id']]
+        if upserts or deletes:
+            changes[key] = {'upserts': upserts, 'deletes': sorted(deletes)}
+
+    return {
+        'cursor': rows[-1][0] if rows else cursor,
+        'has_more': has_more,
+        'changes': changes,
+    }
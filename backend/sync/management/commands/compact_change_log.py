@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from sync.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = '压缩同步变更日志：同一对象只保留最后一条记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='每次删除的记录数 (默认: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        # 被后续记录覆盖的旧记录对任何游标都不再需要，删除后同步结果不变。
+        # 同一用户的记录在用户行锁内插入，id 与序号顺序一致，保留的最后一条也保证序号不会回退
+        latest = (
+            ChangeLog.objects.values('model', 'object_id')
+            .annotate(last_id=Max('id'))
+            .values('last_id')
+        )
+        superseded = ChangeLog.objects.exclude(id__in=latest)
+        batch_size = options['batch_size']
+
+        total = 0
+        while True:
+            ids = list(superseded.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            ChangeLog.objects.filter(id__in=ids).delete()
+            total += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f'已删除 {total} 条过期的变更记录'))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20, verbose_name='数据类型')),
+                ('object_id', models.BigIntegerField(verbose_name='对象ID')),
+                ('operation', models.CharField(choices=[('upsert', '新增或更新'), ('delete', '删除')], max_length=10, verbose_name='操作')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='change_logs', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '变更日志',
+                'verbose_name_plural': '变更日志',
+                'db_table': 'sync_change_log',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='sync_user_cursor_idx'), models.Index(fields=['model', 'object_id'], name='sync_object_idx')],
+            },
+        ),
+    ]
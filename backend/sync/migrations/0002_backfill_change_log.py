@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:56
+
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+# 数据类型 -> (应用, 模型)
+SOURCES = [
+    ('categories', 'websites', 'Category'),
+    ('tags', 'websites', 'Tag'),
+    ('websites', 'websites', 'Website'),
+    ('notes', 'websites', 'WebsiteNote'),
+    ('collections', 'bookmarks', 'Collection'),
+    ('bookmarks', 'bookmarks', 'Bookmark'),
+]
+
+
+def backfill(apps, schema_editor):
+    """为已有数据写入 upsert 记录，让首次同步（cursor=0）拿到完整数据"""
+    ChangeLog = apps.get_model('sync', 'ChangeLog')
+    for key, app_label, model_name in SOURCES:
+        model = apps.get_model(app_label, model_name)
+        batch = []
+        for object_id, user_id in model.objects.order_by('id').values_list('id', 'user_id').iterator():
+            batch.append(ChangeLog(user_id=user_id, model=key, object_id=object_id, operation='upsert'))
+            if len(batch) >= BATCH_SIZE:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        ChangeLog.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('websites', '0002_tag_tags_user_usage_idx_and_more'),
+        ('bookmarks', '0003_bookmark_bookmarks_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
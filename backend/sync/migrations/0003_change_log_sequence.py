@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-20 04:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_ids(apps, schema_editor):
+    """已有记录的序号取主键：客户端保存的游标是旧的主键，继续有效"""
+    ChangeLog = apps.get_model('sync', 'ChangeLog')
+    ChangeLog.objects.update(sequence=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_backfill_change_log'),
+        # 合并重复数据的迁移按旧结构写入变更记录，需在此之前执行
+        ('websites', '0007_website_url_hash_unique'),
+        ('bookmarks', '0007_bookmark_url_hash_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='sequence',
+            field=models.BigIntegerField(null=True, verbose_name='序号'),
+        ),
+        migrations.RunPython(copy_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='changelog',
+            name='sequence',
+            field=models.BigIntegerField(verbose_name='序号'),
+        ),
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='sync_user_cursor_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='changelog',
+            constraint=models.UniqueConstraint(fields=('user', 'sequence'), name='sync_user_sequence_uniq'),
+        ),
+    ]
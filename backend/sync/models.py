@@ -0,0 +1,45 @@
+from django.db import models
+from django.conf import settings
+
+
+class ChangeLog(models.Model):
+    """
+    变更日志
+
+    sequence 为每个用户独立递增的序号，即同步游标：客户端记录最后读到的序号，
+    下次只读取之后的变更。序号在锁定用户行后分配，锁持续到事务提交，同一用户的
+    序号顺序与提交顺序一致；自增主键在插入时分配，长事务会在更大的主键提交后
+    才提交，不能作为游标。
+    """
+    OPERATION_CHOICES = [
+        ('upsert', '新增或更新'),
+        ('delete', '删除'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='change_logs',
+        verbose_name='用户'
+    )
+    model = models.CharField(max_length=20, verbose_name='数据类型')
+    object_id = models.BigIntegerField(verbose_name='对象ID')
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES, verbose_name='操作')
+    sequence = models.BigIntegerField(verbose_name='序号')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    class Meta:
+        verbose_name = '变更日志'
+        verbose_name_plural = '变更日志'
+        db_table = 'sync_change_log'
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'sequence'], name='sync_user_sequence_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['model', 'object_id'], name='sync_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id} {self.operation}"
@@ -0,0 +1,57 @@
+"""
+通过模型信号记录同步变更
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from websites.models import Category, Tag, Website
+
+from .changes import SYNC_MODELS, record_changes
+
+WebsiteTag = Website.tags.through
+
+
+def record_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes(instance.user_id, sender, [instance.pk])
+
+
+def record_delete(sender, instance, **kwargs):
+    record_changes(instance.user_id, sender, [instance.pk], 'delete')
+
+
+for model, _ in SYNC_MODELS.values():
+    post_save.connect(record_save, sender=model, dispatch_uid=f'sync_save_{model._meta.label}')
+    post_delete.connect(record_delete, sender=model, dispatch_uid=f'sync_delete_{model._meta.label}')
+
+
+@receiver(m2m_changed, sender=WebsiteTag)
+def record_website_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    标签属于网站的同步数据，关联变化时记录网站更新
+
+    reverse=True 时 instance 为标签、pk_set 为网站ID；clear 不提供 pk_set，
+    在 pre_clear 时读取当前关联的网站。
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record_changes(instance.user_id, Website, [instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        record_changes(instance.user_id, Website, sorted(pk_set))
+    elif action == 'pre_clear':
+        website_ids = list(WebsiteTag.objects.filter(tag_id=instance.pk).values_list('website_id', flat=True))
+        record_changes(instance.user_id, Website, website_ids)
+
+
+@receiver(pre_delete, sender=Category)
+def record_uncategorized_websites(sender, instance, **kwargs):
+    """分类删除时网站的分类通过 UPDATE 置空，不触发网站的信号"""
+    website_ids = list(Website.objects.filter(category=instance).values_list('id', flat=True))
+    record_changes(instance.user_id, Website, website_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+def record_untagged_websites(sender, instance, **kwargs):
+    """标签删除时关联行被直接删除，不触发 m2m_changed"""
+    website_ids = list(WebsiteTag.objects.filter(tag=instance).values_list('website_id', flat=True))
+    record_changes(instance.user_id, Website, website_ids)
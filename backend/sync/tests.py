@@ -0,0 +1,159 @@
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APITestCase
+
+from users.models import User
+from websites.models import Category, Tag, Website
+from bookmarks.models import Bookmark, Collection
+from sync.changes import changes_since, record_changes
+from sync.models import ChangeLog
+
+
+class SyncTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=0, **params):
+        response = self.client.get('/api/sync/', {'cursor': cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_cursor(self):
+        category = Category.objects.create(name='工具', user=self.user)
+        tag = Tag.objects.create(name='python', user=self.user)
+        website = Website.objects.create(title='site', url='https://example.com/', user=self.user, category=category)
+        website.tags.add(tag)
+
+        first = self.sync()
+        websites = first['changes']['websites']
+        self.assertEqual(len(websites['upserts']), 1)
+        self.assertEqual(websites['upserts'][0]['tag_ids'], [tag.id])
+        self.assertEqual(websites['upserts'][0]['category_id'], category.id)
+        self.assertEqual(self.sync(first['cursor'])['changes'], {})
+
+        website.title = 'renamed'
+        website.save()
+        category_id = category.id
+        category.delete()
+        collection = Collection.objects.create(name='阅读', user=self.user)
+        bookmark = Bookmark.objects.create(title='b', url='https://example.org/', user=self.user, collection=collection)
+        bookmark_id = bookmark.id
+        bookmark.delete()
+
+        second = self.sync(first['cursor'])
+        changes = second['changes']
+        self.assertEqual(changes['categories']['deletes'], [category_id])
+        self.assertEqual(changes['websites']['upserts'][0]['title'], 'renamed')
+        self.assertIsNone(changes['websites']['upserts'][0]['category_id'])
+        self.assertEqual(changes['bookmarks'], {'upserts': [], 'deletes': [bookmark_id]})
+        self.assertEqual(changes['collections']['upserts'][0]['name'], '阅读')
+
+    def test_bulk_paths_are_recorded(self):
+        response = self.client.post('/api/websites/batch/', [
+            {'title': f'site {i}', 'url': f'https://example.com/{i}'} for i in range(3)
+        ], format='json')
+        ids = [item['id'] for item in response.data['results']]
+        cursor = self.sync()['cursor']
+
+        self.client.post('/api/websites/bulk-operations/', {'action': 'delete', 'ids': ids[:2]}, format='json')
+        self.client.post('/api/websites/bulk-operations/', {'action': 'deactivate', 'ids': ids[2:]}, format='json')
+        changes = self.sync(cursor)['changes']['websites']
+        self.assertEqual(changes['deletes'], ids[:2])
+        self.assertFalse(changes['upserts'][0]['is_active'])
+
+    def test_pagination_and_isolation(self):
+        for i in range(5):
+            Tag.objects.create(name=f'tag {i}', user=self.user)
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        Tag.objects.create(name='private', user=other)
+
+        page = self.sync(limit=3)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(len(page['changes']['tags']['upserts']), 3)
+        page = self.sync(page['cursor'], limit=3)
+        self.assertFalse(page['has_more'])
+        self.assertEqual([tag['name'] for tag in page['changes']['tags']['upserts']], ['tag 3', 'tag 4'])
+
+
+class ChangeSequenceTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', email='tester@example.com', password='pass12345')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+
+    def sequences(self, user):
+        return list(ChangeLog.objects.filter(user=user).order_by('sequence').values_list('sequence', flat=True))
+
+    def test_sequence_is_per_user_and_contiguous(self):
+        record_changes(self.user.id, 'tags', [1, 2])
+        record_changes(self.other.id, 'tags', [3])
+        record_changes(self.user.id, 'tags', [4])
+        record_changes(self.user.id, 'tags', [])
+
+        self.assertEqual(self.sequences(self.user), [1, 2, 3])
+        self.assertEqual(self.sequences(self.other), [1])
+        self.assertEqual(changes_since(self.user, 2, 10)['cursor'], 3)
+
+    def test_sequence_continues_after_compaction(self):
+        record_changes(self.user.id, 'tags', [1, 1, 2])
+        call_command('compact_change_log', stdout=StringIO())
+        record_changes(self.user.id, 'tags', [3])
+
+        self.assertEqual(self.sequences(self.user), [2, 3, 4])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ChangeSequenceConcurrencyTests(TransactionTestCase):
+
+    def test_reader_does_not_skip_changes_of_a_slower_transaction(self):
+        # T1 先分配序号但迟迟不提交；T2 必须等 T1 提交后才能分配，
+        # 否则读者会先看到 T2 的序号并把游标推进到 T1 之后
+        user = User.objects.create_user(username='tester', email='tester@example.com', password='pass12345')
+        first_recorded = threading.Event()
+        release_first = threading.Event()
+        second_done = threading.Event()
+
+        def first():
+            try:
+                with transaction.atomic():
+                    record_changes(user.id, 'tags', [1])
+                    first_recorded.set()
+                    release_first.wait(5)
+            finally:
+                connection.close()
+
+        def second():
+            try:
+                first_recorded.wait(5)
+                record_changes(user.id, 'tags', [2])
+                second_done.set()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        first_recorded.wait(5)
+
+        self.assertFalse(second_done.wait(0.5))
+        self.assertEqual(changes_since(user, 0, 10)['cursor'], 0)
+
+        release_first.set()
+        for thread in threads:
+            thread.join(5)
+
+        page = changes_since(user, 0, 10)
+        self.assertEqual(page['cursor'], 2)
+        self.assertEqual(page['changes']['tags']['deletes'], [1, 2])
+        self.assertEqual(
+            list(ChangeLog.objects.order_by('sequence').values_list('object_id', 'sequence')),
+            [(1, 1), (2, 2)],
+        )
@@ -0,0 +1,38 @@
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+import logging
+
+from .changes import DEFAULT_LIMIT, MAX_LIMIT, changes_since
+
+logger = logging.getLogger(__name__)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_changes(request):
+    """
+    增量同步
+    
+    返回游标之后网站、书签、收藏夹、标签、分类和笔记的新增/更新（upserts）与删除（deletes）。
+    首次同步传 cursor=0；has_more 为 true 时用返回的 cursor 继续请求。
+    """
+    try:
+        cursor = int(request.GET.get('cursor', 0))
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        if cursor < 0 or limit <= 0:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {'error': '无效的游标或数量'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        return Response(changes_since(request.user, cursor, min(limit, MAX_LIMIT)))
+    except Exception as e:
+        logger.error(f"获取同步数据失败: {str(e)}")
+        return Response(
+            {'error': '获取同步数据失败'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
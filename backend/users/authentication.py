@@ -0,0 +1,169 @@
+"""
+无状态 JWT 认证
+
+签发令牌时把用户名写入声明，认证时直接用令牌声明构造惰性用户对象：
+- request.user.id / pk / username / is_authenticated 等直接取自声明
+- 按用户过滤查询（filter(user=request.user)）只用到主键，不查询 users 表
+- 访问其他属性（邮箱、统计字段）或把用户赋给外键时才加载完整用户
+
+用户行读取自进程内的短时缓存，用户保存或删除时清除对应条目（见 signals）。
+认证时从缓存读取用户行检查 is_active，缓存命中时不查询数据库。
+缓存最多保留 USER_CACHE_SIZE 个用户，超出时淘汰最久未使用的条目。
+缓存是进程内的，其他进程最多在 USER_CACHE_TTL 秒后看到变更（包括停用）。
+旧令牌没有用户名声明，按原方式查询数据库。
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import revocation
+
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 1000
+
+# 写入令牌的用户属性；权限相关的标志不放入声明，避免降权后在令牌有效期内继续生效
+USER_CLAIMS = ('username',)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_cached_user(user_id):
+    """从进程内缓存或数据库读取用户，返回副本，调用方修改不会影响缓存"""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry and entry[0] > now:
+            _cache.move_to_end(user_id)
+        elif entry:
+            del _cache[user_id]
+            entry = None
+    if entry:
+        user = entry[1]
+    else:
+        User = get_user_model()
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed('用户不存在', code='user_not_found')
+        with _cache_lock:
+            _cache[user_id] = (now + USER_CACHE_TTL, user)
+            _cache.move_to_end(user_id)
+            while len(_cache) > USER_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return copy.copy(user)
+
+
+def invalidate_cached_user(user_id):
+    with _cache_lock:
+        _cache.pop(user_id, None)
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    由令牌声明支撑的惰性用户
+
+    声明中的属性直接返回；isinstance、_meta 和主键相关的访问按用户模型回答，
+    因此可以直接用于 ORM 过滤而不触发加载。
+    """
+
+    def __init__(self, claims):
+        self.__dict__['_claims'] = claims
+        super().__init__(lambda: get_cached_user(claims['id']))
+
+    @property
+    def __class__(self):
+        if self._wrapped is empty:
+            return get_user_model()
+        return type(self._wrapped)
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            claims = self.__dict__['_claims']
+            if name in claims:
+                return claims[name]
+            model = get_user_model()
+            if name == '_meta':
+                return model._meta
+            if name != '_state' and not hasattr(model, name):
+                # ORM 的 hasattr 探测（如 resolve_expression）不需要加载用户
+                raise AttributeError(name)
+        return super().__getattr__(name)
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, get_user_model()) and other.pk == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+    def __repr__(self):
+        return f'<ClaimsUser: {self.pk}>'
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """从令牌声明构造用户，用户行读取自进程内缓存，不在每次请求时查询数据库"""
+
+    def get_user(self, validated_token):
+        claims = {claim: validated_token.get(claim) for claim in USER_CLAIMS}
+        if any(value is None for value in claims.values()):
+            return super().get_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        # 停用状态以用户行为准，不能在令牌有效期内沿用签发时的状态
+        if not get_cached_user(user_id).is_active:
+            raise AuthenticationFailed('用户已停用', code='user_inactive')
+
+        claims.update({
+            'id': user_id,
+            'pk': user_id,
+            'is_active': True,
+            'is_authenticated': True,
+            'is_anonymous': False,
+        })
+        return ClaimsUser(claims)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    带用户声明的刷新令牌，派生的访问令牌（包括刷新得到的）会复制这些声明
+
+    吊销检查先查 Redis 中的吊销集合，见 revocation。
+    """
+
+    def check_blacklist(self):
+        if revocation.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError('令牌已被吊销')
+
+    def blacklist(self):
+        result = super().blacklist()
+        revocation.revoke(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """API 文档中与 JWTAuthentication 相同的 Bearer 认证方式"""
+    target_class = 'users.authentication.ClaimsJWTAuthentication'
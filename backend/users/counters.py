@@ -0,0 +1,31 @@
+"""
+用户统计计数器维护
+
+计数变更统一用 F() 原子增减，并发请求修改同一用户的计数时不会丢失更新。
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .authentication import invalidate_cached_user
+
+
+def shift_counter(field, delta):
+    """返回计数字段增减 delta 的表达式"""
+    if delta < 0:
+        # 计数字段为 PositiveIntegerField，避免漂移后减成负数
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def adjust_user_counts(user_id, bookmarks=0, visits=0):
+    """调整用户的书签总数和访问总数"""
+    changes = {}
+    if bookmarks:
+        changes['total_bookmarks'] = shift_counter('total_bookmarks', bookmarks)
+    if visits:
+        changes['total_visits'] = shift_counter('total_visits', visits)
+    if changes and user_id is not None:
+        get_user_model().objects.filter(pk=user_id).update(**changes)
+        # update() 不发送 post_save，需手动清除认证缓存
+        invalidate_cached_user(user_id)
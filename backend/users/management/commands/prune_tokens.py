@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from users import revocation
+
+
+class Command(BaseCommand):
+    help = '清理已过期的刷新令牌及其黑名单记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='每次删除的记录数 (默认: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        # 过期令牌已无法通过签名校验，黑名单记录随之失去意义；
+        # 按主键顺序分批删除，过期令牌集中在主键较小的一端
+        expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now()).order_by('id')
+        batch_size = options['batch_size']
+
+        total = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            # 黑名单记录通过外键级联删除
+            OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
+
+        pruned = revocation.prune()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已删除 {total} 个过期令牌，从缓存中移除 {pruned} 个吊销记录'
+        ))
@@ -0,0 +1,89 @@
+"""
+刷新令牌吊销检查
+
+数据库中的黑名单（token_blacklist 应用）是唯一的数据源。配置 Redis 缓存时，
+已吊销令牌的 jti 同时写入一个 Redis 有序集合（分值为令牌过期时间），刷新时
+只查询这个集合，不再查询数据库。
+
+集合中有一个分值为 +inf 的哨兵成员：Redis 重启、清空或淘汰该键后哨兵随之消失，
+下一次检查会从数据库重建集合，本次检查回退到数据库，因此不会放过已吊销的令牌。
+未配置 Redis 时直接查询数据库（进程内缓存无法看到其他进程的吊销）。
+"""
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+REVOKED_KEY = 'token_blacklist'
+SENTINEL = '-'
+
+
+def _redis():
+    cache = caches['default']
+    if not isinstance(cache, RedisCache):
+        return None, None
+    key = cache.make_and_validate_key(REVOKED_KEY)
+    return cache._cache.get_client(key, write=True), key
+
+
+def _is_revoked_db(jti):
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def rebuild():
+    """从数据库重建 Redis 中的吊销集合，返回写入的令牌数"""
+    client, key = _redis()
+    if client is None:
+        return 0
+    revoked = BlacklistedToken.objects.filter(
+        token__expires_at__gt=timezone.now()
+    ).values_list('token__jti', 'token__expires_at')
+
+    members = {}
+    count = 0
+    pipe = client.pipeline(transaction=False)
+    for jti, expires_at in revoked.iterator(chunk_size=5000):
+        members[jti] = expires_at.timestamp()
+        count += 1
+        if len(members) >= 5000:
+            pipe.zadd(key, members)
+            members = {}
+    if members:
+        pipe.zadd(key, members)
+    pipe.zadd(key, {SENTINEL: float('inf')})
+    pipe.execute()
+    return count
+
+
+def is_revoked(jti):
+    client, key = _redis()
+    if client is None:
+        return _is_revoked_db(jti)
+
+    pipe = client.pipeline(transaction=False)
+    pipe.zscore(key, jti)
+    pipe.zscore(key, SENTINEL)
+    score, sentinel = pipe.execute()
+    if score is not None:
+        return True
+    if sentinel is None:
+        rebuild()
+        return _is_revoked_db(jti)
+    return False
+
+
+def revoke(jti, exp):
+    """数据库写入黑名单后调用，exp 为令牌过期的时间戳"""
+    client, key = _redis()
+    if client is not None:
+        client.zadd(key, {jti: exp})
+
+
+def prune():
+    """从 Redis 集合中移除已过期的令牌，返回移除数"""
+    client, key = _redis()
+    if client is None:
+        return 0
+    return client.zremrangebyscore(key, '-inf', time.time())
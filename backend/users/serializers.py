@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenObtainSerializer, TokenRefreshSerializer
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from .authentication import ClaimsRefreshToken, invalidate_cached_user
 from .models import User, UserProfile
 
 
@@ -49,6 +52,38 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
+class LoginSerializer(TokenObtainPairSerializer):
+    """
+    登录序列化器
+
+    只校验一次密码（慢哈希），签发令牌后用一条 UPDATE 同时写入
+    last_login 和 last_active，并在结果中附带用户信息。
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        # 跳过父类中基于 save() 的 update_last_login
+        data = TokenObtainSerializer.validate(self, attrs)
+        user = self.user
+
+        refresh = self.get_token(user)
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+
+        now = timezone.now()
+        User.objects.filter(pk=user.pk).update(last_login=now, last_active=now)
+        invalidate_cached_user(user.pk)
+        user.last_login = user.last_active = now
+
+        data['user'] = UserSerializer(user).data
+        return data
+
+
+class RefreshSerializer(TokenRefreshSerializer):
+    """刷新令牌序列化器：轮换时吊销旧令牌，并保留用户声明"""
+    token_class = ClaimsRefreshToken
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """用户注册序列化器"""
     password = serializers.CharField(write_only=True, min_length=8)
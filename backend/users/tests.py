@@ -1,3 +1,176 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import authentication
+from .authentication import ClaimsRefreshToken, get_cached_user, invalidate_cached_user
+from websites.models import Website
+
+from .models import User
+
+
+class LoginTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+
+    def login(self, password='pass12345'):
+        return self.client.post('/api/users/login/', {'username': 'tester', 'password': password}, format='json')
+
+    def test_login_hashes_once_and_updates_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, side_effect=User.check_password) as check, \
+                CaptureQueriesContext(connection) as context:
+            response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(check.call_count, 1)
+        self.assertEqual({'access', 'refresh', 'user'}, set(response.data))
+        self.assertEqual(response.data['user']['username'], 'tester')
+
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "users"')]
+        self.assertEqual(len(updates), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(self.user.last_login, self.user.last_active)
+
+    def test_invalid_credentials(self):
+        response = self.login(password='wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+
+class ClaimsAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        invalidate_cached_user(self.user.pk)
+
+    def authenticate(self, token_class=ClaimsRefreshToken):
+        token = token_class.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def user_selects(self, context):
+        return [q['sql'] for q in context.captured_queries if q['sql'].startswith('SELECT') and 'FROM "users"' in q['sql']]
+
+    def test_list_does_not_query_cached_user(self):
+        self.authenticate()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/websites/')
+            response = self.client.get('/api/websites/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.user_selects(context)), 1)
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+        self.assertEqual(self.client.get('/api/websites/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/websites/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_inactive')
+
+    def test_non_claim_attribute_loads_user_once(self):
+        self.authenticate()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/users/info/')
+            self.client.get('/api/users/info/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'tester@example.com')
+        self.assertEqual(len(self.user_selects(context)), 1)
+
+    def test_cache_invalidated_on_save(self):
+        self.authenticate()
+        self.client.get('/api/users/info/')
+        self.user.email = 'changed@example.com'
+        self.user.save()
+        response = self.client.get('/api/users/info/')
+        self.assertEqual(response.data['email'], 'changed@example.com')
+
+    def test_cache_is_bounded_and_evicts_least_recently_used(self):
+        others = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pass12345')
+            for i in range(2)
+        ]
+        with mock.patch.object(authentication, 'USER_CACHE_SIZE', 2), \
+                mock.patch.dict(authentication._cache, clear=True):
+            get_cached_user(self.user.pk)
+            get_cached_user(others[0].pk)
+            get_cached_user(self.user.pk)
+            get_cached_user(others[1].pk)
+            self.assertEqual(list(authentication._cache), [self.user.pk, others[1].pk])
+
+    def test_expired_entry_is_reloaded(self):
+        get_cached_user(self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(email='changed@example.com')
+        with mock.patch('users.authentication.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(get_cached_user(self.user.pk).email, 'changed@example.com')
+
+    def test_token_without_claims_falls_back_to_database(self):
+        self.authenticate(token_class=RefreshToken)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/websites/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.user_selects(context)), 1)
+
+    def test_create_assigns_loaded_user(self):
+        self.authenticate()
+        response = self.client.post('/api/websites/', {'url': 'https://example.com', 'title': 'Example'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Website.objects.filter(user=self.user).count(), 1)
+
+
+class TokenRevocationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def refresh_token(self, token):
+        return self.client.post('/api/users/token/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_logout_revokes_refresh_token(self):
+        response = self.client.post('/api/users/logout/', {'refresh_token': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=self.refresh['jti']).exists())
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+
+    def test_rotation_revokes_old_token_and_keeps_claims(self):
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        rotated = ClaimsRefreshToken(response.data['refresh'])
+        self.assertEqual(rotated['username'], 'tester')
+
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+        self.assertEqual(self.refresh_token(rotated).status_code, 200)
+
+    def test_prune_tokens_removes_expired(self):
+        self.refresh.blacklist()
+        expired = ClaimsRefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti__in=[self.refresh['jti'], expired['jti']]).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        live = ClaimsRefreshToken.for_user(self.user)
+
+        call_command('prune_tokens', batch_size=1, stdout=mock.Mock())
+
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -1,11 +1,8 @@
-from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
-from django.utils import timezone
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.db import transaction
 from django.core.exceptions import ValidationError
@@ -14,8 +11,10 @@ from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
 from drf_spectacular.openapi import OpenApiTypes
 import logging
 
+from analytics.activity import record_activity
+from .authentication import ClaimsRefreshToken
 from .models import User, UserProfile
-from .serializers import UserSerializer, UserProfileSerializer, UserRegistrationSerializer
+from .serializers import LoginSerializer, UserSerializer, UserProfileSerializer, UserRegistrationSerializer
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +25,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     
     使用用户名和密码获取JWT访问令牌和刷新令牌
     """
+    serializer_class = LoginSerializer
     
     @extend_schema(
         tags=['用户认证'],
@@ -88,19 +88,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         try:
             response = super().post(request, *args, **kwargs)
             if response.status_code == 200:
-                user = authenticate(
-                    username=request.data.get('username'),
-                    password=request.data.get('password')
-                )
-                if user:
-                    # 更新最后活跃时间
-                    user.last_active = timezone.now()
-                    user.save(update_fields=['last_active'])
-                    
-                    # 添加用户信息到响应
-                    user_serializer = UserSerializer(user)
-                    response.data['user'] = user_serializer.data
-                    logger.info(f"用户 {user.username} 登录成功")
+                logger.info("用户 %s 登录成功", response.data['user']['username'])
+                record_activity(response.data['user']['id'], 'login', request, description='登录')
             return response
         except Exception as e:
             logger.error(f"登录失败: {str(e)}")
@@ -202,9 +191,9 @@ class UserRegistrationView(APIView):
                 UserProfile.objects.create(user=user)
                 
                 # 生成JWT令牌
-                refresh = RefreshToken.for_user(user)
+                refresh = ClaimsRefreshToken.for_user(user)
                 
-                logger.info(f"新用户注册成功: {user.username}")
+                logger.info("新用户注册成功: %s", user.username)
                 
                 return Response({
                     'message': '注册成功',
@@ -319,7 +308,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
             
             if serializer.is_valid():
                 self.perform_update(serializer)
-                logger.info(f"用户 {instance.username} 更新资料")
+                logger.info("用户 %s 更新资料", instance.username)
                 return Response(serializer.data)
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -426,7 +415,7 @@ class ChangePasswordView(APIView):
             user.set_password(new_password)
             user.save()
             
-            logger.info(f"用户 {user.username} 修改密码成功")
+            logger.info("用户 %s 修改密码成功", user.username)
             
             return Response({'message': '密码修改成功'})
             
@@ -544,10 +533,10 @@ def logout_view(request):
     try:
         refresh_token = request.data.get('refresh_token')
         if refresh_token:
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
         
-        logger.info(f"用户 {request.user.username} 登出")
+        logger.info("用户 %s 登出", request.user.username)
         return Response({'message': '登出成功'})
         
     except Exception as e:
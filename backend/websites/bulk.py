@@ -0,0 +1,319 @@
+"""
+网站、标签和分类的批量操作
+
+这些路径使用 update / bulk_create / 直接删除，不经过模型信号，
+分类和标签计数器在每批结束时按增量统一调整。
+"""
+from collections import Counter
+
+from django.db.models import Count
+from rest_framework import status
+
+from config.bulk import BulkOperationError, BulkOperations, BulkWriter, apply_changes, fast_delete
+
+from .counters import adjust_category_counts, adjust_tag_counts
+from .models import Category, Tag, Website, WebsiteNote
+from .serializers import WebsiteSerializer
+from .tree import CategoryTree
+from resources.registry import attach_resources
+from sync.changes import record_changes
+
+WebsiteTag = Website.tags.through
+
+
+def _grouped_counts(queryset, field):
+    """{字段值: 行数}"""
+    return {
+        row[field]: row['total']
+        for row in queryset.order_by().values(field).annotate(total=Count('*'))
+    }
+
+
+def _negate(counts):
+    return {key: -value for key, value in counts.items()}
+
+
+def _merge(*deltas):
+    merged = Counter()
+    for delta in deltas:
+        merged.update(delta)
+    return dict(merged)
+
+
+class WebsiteBulkOperations(BulkOperations):
+    model = Website
+    sync_model = 'websites'
+    messages = {
+        'activate': '已激活 {count} 个网站',
+        'deactivate': '已停用 {count} 个网站',
+        'recategorize': '已修改 {count} 个网站的分类',
+        'retag': '已修改 {count} 个网站的标签',
+        'delete': '已删除 {count} 个网站',
+    }
+
+    def action_activate(self, queryset, ids, params):
+        queryset.update(is_active=True)
+
+    def action_deactivate(self, queryset, ids, params):
+        queryset.update(is_active=False)
+
+    def prepare_recategorize(self, params):
+        category_id = params.get('category_id')
+        if category_id in (None, ''):
+            return {'category': None}
+        try:
+            return {'category': Category.objects.get(id=category_id, user=self.user)}
+        except (Category.DoesNotExist, ValueError):
+            raise BulkOperationError('分类不存在', status.HTTP_404_NOT_FOUND)
+
+    def action_recategorize(self, queryset, ids, params):
+        category = params['category']
+        changing = queryset.exclude(category=category) if category else queryset.exclude(category=None)
+        previous = _grouped_counts(changing, 'category_id')
+        moved = changing.update(category=category)
+        adjust_category_counts(_merge(_negate(previous), {category.id if category else None: moved}))
+
+    def prepare_retag(self, params):
+        mode = params.get('mode', 'add')
+        if mode not in ('add', 'remove', 'replace'):
+            raise BulkOperationError('mode 必须为 add、remove 或 replace')
+        tag_ids = params.get('tag_ids') or []
+        if not isinstance(tag_ids, list):
+            raise BulkOperationError('tag_ids 必须为列表')
+        tags = list(Tag.objects.filter(user=self.user, id__in=tag_ids).values_list('id', flat=True))
+        if len(tags) != len(set(tag_ids)):
+            raise BulkOperationError('标签不存在', status.HTTP_404_NOT_FOUND)
+        if not tags and mode != 'replace':
+            raise BulkOperationError('请提供标签ID')
+        return {'mode': mode, 'tag_ids': tags}
+
+    def action_retag(self, queryset, ids, params):
+        mode, tag_ids = params['mode'], params['tag_ids']
+        links = WebsiteTag.objects.filter(website_id__in=ids)
+        deltas = {}
+
+        if mode in ('remove', 'replace'):
+            if mode == 'remove':
+                unlinked = links.filter(tag_id__in=tag_ids)
+            else:
+                unlinked = links.exclude(tag_id__in=tag_ids)
+            deltas = _negate(_grouped_counts(unlinked, 'tag_id'))
+            unlinked.delete()
+
+        if mode in ('add', 'replace'):
+            existing = set(links.filter(tag_id__in=tag_ids).values_list('website_id', 'tag_id'))
+            new_links = [
+                WebsiteTag(website_id=website_id, tag_id=tag_id)
+                for website_id in ids
+                for tag_id in tag_ids
+                if (website_id, tag_id) not in existing
+            ]
+            WebsiteTag.objects.bulk_create(new_links)
+            deltas = _merge(deltas, Counter(link.tag_id for link in new_links))
+
+        adjust_tag_counts(deltas)
+
+    def action_delete(self, queryset, ids, params):
+        category_deltas = _negate(_grouped_counts(queryset, 'category_id'))
+        tag_deltas = _negate(_grouped_counts(WebsiteTag.objects.filter(website_id__in=ids), 'tag_id'))
+        note_ids = list(WebsiteNote.objects.filter(website_id__in=ids).values_list('id', flat=True))
+        record_changes(self.user.id, 'notes', note_ids, 'delete')
+        fast_delete(queryset, handled=(WebsiteNote,))
+        adjust_category_counts(category_deltas)
+        adjust_tag_counts(tag_deltas)
+
+
+class TagBulkOperations(BulkOperations):
+    model = Tag
+    sync_model = 'tags'
+    delete_actions = ('merge', 'delete')
+    messages = {
+        'merge': '已将 {count} 个标签合并到 {target}',
+        'delete': '已删除 {count} 个标签',
+    }
+
+    def prepare_merge(self, params):
+        try:
+            return {'target': Tag.objects.get(id=params.get('target_id'), user=self.user)}
+        except (Tag.DoesNotExist, ValueError, TypeError):
+            raise BulkOperationError('目标标签不存在', status.HTTP_404_NOT_FOUND)
+
+    def action_merge(self, queryset, ids, params):
+        """把来源标签的网站关联转移到目标标签，然后删除来源标签"""
+        target = params['target']
+        sources = [pk for pk in ids if pk != target.id]
+        if not sources:
+            return {}
+
+        linked = set(WebsiteTag.objects.filter(tag_id=target.id).values_list('website_id', flat=True))
+        affected = set(WebsiteTag.objects.filter(tag_id__in=sources).values_list('website_id', flat=True))
+        website_ids = affected - linked
+        record_changes(self.user.id, 'websites', sorted(affected))
+        WebsiteTag.objects.bulk_create(
+            [WebsiteTag(website_id=website_id, tag_id=target.id) for website_id in website_ids]
+        )
+        adjust_tag_counts({target.id: len(website_ids)})
+        fast_delete(queryset.filter(pk__in=sources))
+
+        if target.id in ids:
+            return {target.id: '不能合并到自身'}
+        return {}
+
+    def action_delete(self, queryset, ids, params):
+        website_ids = set(WebsiteTag.objects.filter(tag_id__in=ids).values_list('website_id', flat=True))
+        record_changes(self.user.id, 'websites', sorted(website_ids))
+        fast_delete(queryset)
+
+
+class CategoryBulkOperations(BulkOperations):
+    model = Category
+    sync_model = 'categories'
+    signal_actions = ('delete',)
+    messages = {
+        'move': '已移动 {count} 个分类',
+        'delete': '已删除 {count} 个分类',
+    }
+
+    def prepare_move(self, params):
+        parent_id = params.get('parent_id')
+        if parent_id in (None, ''):
+            return {'parent': None}
+        try:
+            return {'parent': Category.objects.get(id=parent_id, user=self.user)}
+        except (Category.DoesNotExist, ValueError):
+            raise BulkOperationError('目标分类不存在', status.HTTP_404_NOT_FOUND)
+
+    def action_move(self, queryset, ids, params):
+        parent = params['parent']
+        parent_id = parent.id if parent else None
+        tree = CategoryTree.for_user(self.user)
+        errors = {}
+
+        if parent is not None:
+            # 目标分类及其祖先不能移动到目标分类下，否则形成环
+            blocked = {parent_id} | {node.id for node in tree.ancestors_of(parent)}
+            for pk in ids:
+                if pk in blocked:
+                    errors[pk] = '不能移动到自身或子分类下'
+
+        # (name, user, parent) 唯一，目标分类下已有同名分类的跳过
+        taken = {node.name for node in tree.children_of(parent_id) if node.id not in ids}
+        moving = []
+        for pk in ids:
+            if pk in errors:
+                continue
+            name = tree.nodes[pk].name
+            if name in taken:
+                errors[pk] = '目标分类下已存在同名分类'
+            else:
+                taken.add(name)
+                moving.append(pk)
+
+        queryset.filter(pk__in=moving).update(parent=parent)
+        return errors
+
+    def action_delete(self, queryset, ids, params):
+        # 子分类级联删除、网站分类置空，交给 Collector 处理；
+        # 删除信号会为每个分类（含级联删除的子分类）记录变更
+        queryset.delete()
+
+
+def _int_ids(values):
+    return {value for value in values if isinstance(value, int) and not isinstance(value, bool)}
+
+
+class WebsiteBulkWriter(BulkWriter):
+    """
+    网站批量创建 / 更新
+
+    网站用一条 bulk_create 写入，标签关联行也合并为一条插入；
+    不经过信号，分类和标签计数器按增量统一调整。
+    """
+    model = Website
+    serializer_class = WebsiteSerializer
+    payload_key = 'websites'
+    sync_model = 'websites'
+
+    def preload(self, items):
+        category_ids = _int_ids(item.get('category') for item in items)
+        tag_ids = _int_ids(
+            tag_id for item in items
+            if isinstance(item.get('tag_ids'), list)
+            for tag_id in item['tag_ids']
+        )
+        # 未知或他人的标签与单条创建一样直接忽略
+        self.tag_ids = set(
+            Tag.objects.filter(user=self.user, id__in=tag_ids).values_list('id', flat=True)
+        )
+        return {
+            Category: {
+                category.id: category
+                for category in Category.objects.filter(user=self.user, id__in=category_ids)
+            },
+        }
+
+    def owned_tags(self, tag_ids):
+        return [tag_id for tag_id in dict.fromkeys(tag_ids) if tag_id in self.tag_ids]
+
+    def perform_create(self, validated):
+        websites = []
+        tag_lists = []
+        for data in validated:
+            data = dict(data)
+            tag_lists.append(self.owned_tags(data.pop('tag_ids', [])))
+            websites.append(Website(user=self.user, **data))
+        attach_resources(websites)
+        Website.objects.bulk_create(websites)
+
+        links = [
+            WebsiteTag(website_id=website.id, tag_id=tag_id)
+            for website, tag_ids in zip(websites, tag_lists)
+            for tag_id in tag_ids
+        ]
+        WebsiteTag.objects.bulk_create(links)
+
+        adjust_category_counts(Counter(website.category_id for website in websites))
+        adjust_tag_counts(Counter(link.tag_id for link in links))
+        return websites
+
+    def perform_update(self, changes):
+        category_deltas = Counter()
+        new_tags = {}
+        stripped = []
+        for website, data in changes:
+            data = dict(data)
+            if 'tag_ids' in data:
+                new_tags[website.id] = set(self.owned_tags(data.pop('tag_ids')))
+            if 'category' in data:
+                category = data['category']
+                category_id = category.id if category else None
+                if category_id != website.category_id:
+                    category_deltas[website.category_id] -= 1
+                    category_deltas[category_id] += 1
+            stripped.append((website, data))
+        apply_changes(stripped)
+        adjust_category_counts(dict(category_deltas))
+
+        if not new_tags:
+            return
+        current = {}
+        for link_id, website_id, tag_id in WebsiteTag.objects.filter(
+            website_id__in=new_tags
+        ).values_list('id', 'website_id', 'tag_id'):
+            current.setdefault(website_id, {})[tag_id] = link_id
+
+        removed = []
+        added = []
+        for website_id, tag_ids in new_tags.items():
+            linked = current.get(website_id, {})
+            removed.extend((link_id, tag_id) for tag_id, link_id in linked.items() if tag_id not in tag_ids)
+            added.extend(
+                WebsiteTag(website_id=website_id, tag_id=tag_id)
+                for tag_id in tag_ids if tag_id not in linked
+            )
+        WebsiteTag.objects.filter(id__in=[link_id for link_id, _ in removed]).delete()
+        WebsiteTag.objects.bulk_create(added)
+        adjust_tag_counts(_merge(
+            _negate(Counter(tag_id for _, tag_id in removed)),
+            Counter(link.tag_id for link in added),
+        ))
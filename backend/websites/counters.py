@@ -0,0 +1,30 @@
+"""
+分类和标签计数器维护
+
+Category.website_count 与 Tag.usage_count 通过 F() 原子增减维护，
+同一增量的多个对象合并为一条 UPDATE。
+"""
+from collections import defaultdict
+
+from users.counters import shift_counter
+
+from .models import Category, Tag
+
+
+def _apply(model, field, deltas):
+    grouped = defaultdict(list)
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            grouped[delta].append(pk)
+    for delta, pks in grouped.items():
+        model.objects.filter(pk__in=pks).update(**{field: shift_counter(field, delta)})
+
+
+def adjust_category_counts(deltas):
+    """按 {分类ID: 增量} 调整分类的网站数量"""
+    _apply(Category, 'website_count', deltas)
+
+
+def adjust_tag_counts(deltas):
+    """按 {标签ID: 增量} 调整标签的使用次数"""
+    _apply(Tag, 'usage_count', deltas)
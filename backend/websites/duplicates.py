@@ -0,0 +1,42 @@
+"""
+重复链接查找
+
+网站和书签各按 (user, url_hash) 索引顺序读取一遍，归并后相邻的相同摘要即为一组重复，
+内存中只保留当前分组。按摘要顺序输出，after 为上一页最后一组的摘要（键集分页）。
+"""
+import heapq
+from itertools import groupby
+from operator import itemgetter
+
+from config.canonical import canonicalize_url
+from bookmarks.models import Bookmark
+
+from .models import Website
+
+CHUNK_SIZE = 2000
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def _rows(queryset, kind):
+    rows = queryset.order_by('url_hash', 'id').values_list('url_hash', 'id', 'url', 'title')
+    for url_hash, pk, url, title in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield url_hash, {'type': kind, 'id': pk, 'url': url, 'title': title}
+
+
+def find_duplicates(user, include_bookmarks=True, after=None):
+    """生成 (摘要, {canonical_url, items}) 分组，每组至少两个条目"""
+    querysets = [(Website.objects.filter(user=user), 'website')]
+    if include_bookmarks:
+        querysets.append((Bookmark.objects.filter(user=user), 'bookmark'))
+    if after:
+        querysets = [(queryset.filter(url_hash__gt=after), kind) for queryset, kind in querysets]
+    streams = [_rows(queryset, kind) for queryset, kind in querysets]
+
+    for url_hash, group in groupby(heapq.merge(*streams, key=itemgetter(0)), key=itemgetter(0)):
+        items = [item for _, item in group]
+        if len(items) > 1:
+            yield url_hash, {
+                'canonical_url': canonicalize_url(items[0]['url']),
+                'items': items,
+            }
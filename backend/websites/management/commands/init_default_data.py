@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from websites.models import Category, Tag, Website
 from bookmarks.models import Collection, Bookmark
+from config.canonical import url_hash
 
 User = get_user_model()
 
@@ -163,9 +164,10 @@ class Command(BaseCommand):
         
         for site_data in websites_data:
             website, created = Website.objects.get_or_create(
-                url=site_data['url'],
+                url_hash=url_hash(site_data['url']),
                 user=user,
                 defaults={
+                    'url': site_data['url'],
                     'title': site_data['title'],
                     'description': site_data['description'],
                     'category': site_data['category'],
@@ -282,9 +284,10 @@ class Command(BaseCommand):
         
         for bookmark_data in bookmarks_data:
             bookmark, created = Bookmark.objects.get_or_create(
-                url=bookmark_data['url'],
+                url_hash=url_hash(bookmark_data['url']),
                 user=user,
                 defaults={
+                    'url': bookmark_data['url'],
                     'title': bookmark_data['title'],
                     'description': bookmark_data['description'],
                     'collection': bookmark_data['collection'] or default_collection,
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from websites.models import Category, Tag, Website
+from bookmarks.models import Bookmark
+
+User = get_user_model()
+
+
+def _count_subquery(queryset, group_field):
+    """按 group_field 对关联表计数的相关子查询"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{group_field: OuterRef('pk')})
+            .order_by()
+            .values(group_field)
+            .annotate(total=Count('*'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+class Command(BaseCommand):
+    help = '重新计算分类、标签和用户的反规范化计数，修复计数漂移'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            default=None,
+            help='只重算指定用户名的数据'
+        )
+
+    def handle(self, *args, **options):
+        categories = Category.objects.all()
+        tags = Tag.objects.all()
+        users = User.objects.all()
+
+        username = options['user']
+        if username:
+            users = users.filter(username=username)
+            if not users.exists():
+                self.stdout.write(self.style.ERROR(f'用户 "{username}" 不存在'))
+                return
+            categories = categories.filter(user__username=username)
+            tags = tags.filter(user__username=username)
+
+        website_count = _count_subquery(Website.objects.all(), 'category')
+        usage_count = _count_subquery(Website.tags.through.objects.all(), 'tag')
+        total_bookmarks = _count_subquery(Bookmark.objects.all(), 'user')
+        # 用户访问总数是历史累计值，删除网站或书签后不回退，无法由现有数据重算，这里不做修正
+
+        # 只更新存在偏差的行
+        with transaction.atomic():
+            fixed = {
+                '分类网站数': categories.exclude(website_count=website_count).update(
+                    website_count=website_count
+                ),
+                '标签使用次数': tags.exclude(usage_count=usage_count).update(
+                    usage_count=usage_count
+                ),
+                '用户书签数': users.exclude(total_bookmarks=total_bookmarks).update(
+                    total_bookmarks=total_bookmarks
+                ),
+            }
+
+        for label, count in fixed.items():
+            self.stdout.write(f'{label}: 修正 {count} 行')
+        self.stdout.write(self.style.SUCCESS('计数重算完成'))
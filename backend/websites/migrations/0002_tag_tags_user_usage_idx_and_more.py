@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websites', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-usage_count', 'name', 'id'], name='tags_user_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='website',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='websites_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websitenote',
+            index=models.Index(fields=['website', 'user', '-created_at', 'id'], name='notes_website_created_idx'),
+        ),
+    ]
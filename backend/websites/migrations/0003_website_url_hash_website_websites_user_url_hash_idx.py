@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:58
+
+import config.fields
+from config.canonical import url_hash
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def backfill_url_hash(apps, schema_editor):
+    Website = apps.get_model('websites', 'Website')
+    batch = []
+    for obj in Website.objects.only('id', 'url').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        obj.url_hash = url_hash(obj.url)
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            Website.objects.bulk_update(batch, ['url_hash'])
+            batch = []
+    Website.objects.bulk_update(batch, ['url_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websites', '0002_tag_tags_user_usage_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='url_hash',
+            field=config.fields.UrlHashField(default='', verbose_name='URL摘要'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_url_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='website',
+            index=models.Index(fields=['user', 'url_hash'], name='websites_user_url_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:03
+
+from itertools import groupby
+
+from config.canonical import canonicalize_url
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+METADATA_FIELDS = ['favicon', 'screenshot', 'meta_keywords', 'meta_author', 'meta_language', 'loading_speed']
+
+
+def link_resources(Website, Resource, groups):
+    Resource.objects.bulk_create([resource for resource, _ in groups])
+    ids = dict(
+        Resource.objects.filter(url_hash__in=[resource.url_hash for resource, _ in groups])
+        .values_list('url_hash', 'id')
+    )
+    websites = []
+    for resource, members in groups:
+        for website in members:
+            website.resource_id = ids[resource.url_hash]
+            websites.append(website)
+    Website.objects.bulk_update(websites, ['resource'])
+
+
+def move_metadata(apps, schema_editor):
+    """每个不同的 URL 建一个资源，元数据取各用户记录中第一个非空值"""
+    Website = apps.get_model('websites', 'Website')
+    Resource = apps.get_model('resources', 'Resource')
+    websites = (
+        Website.objects.only('id', 'url', 'url_hash', *METADATA_FIELDS)
+        .order_by('url_hash', 'id')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    groups = []
+    for key, members in groupby(websites, key=lambda website: website.url_hash):
+        members = list(members)
+        resource = Resource(url=canonicalize_url(members[0].url), url_hash=key)
+        for field in METADATA_FIELDS:
+            value = next((getattr(w, field) for w in members if getattr(w, field)), None)
+            if value:
+                setattr(resource, field, value)
+        groups.append((resource, members))
+        if len(groups) >= BATCH_SIZE:
+            link_resources(Website, Resource, groups)
+            groups = []
+    if groups:
+        link_resources(Website, Resource, groups)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0001_initial'),
+        ('websites', '0003_website_url_hash_website_websites_user_url_hash_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='resource',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='websites', to='resources.resource', verbose_name='URL资源'),
+        ),
+        migrations.RunPython(move_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websites', '0004_website_resource'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='website',
+            name='favicon',
+        ),
+        migrations.RemoveField(
+            model_name='website',
+            name='loading_speed',
+        ),
+        migrations.RemoveField(
+            model_name='website',
+            name='meta_author',
+        ),
+        migrations.RemoveField(
+            model_name='website',
+            name='meta_keywords',
+        ),
+        migrations.RemoveField(
+            model_name='website',
+            name='meta_language',
+        ),
+        migrations.RemoveField(
+            model_name='website',
+            name='screenshot',
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:20
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, group_field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{group_field: OuterRef('pk')})
+            .order_by()
+            .values(group_field)
+            .annotate(total=Count('*'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    合并规范化 URL 相同的网站，为 (user, url_hash) 唯一约束做准备
+
+    保留最早创建的一条，其余记录的笔记、标签和访问次数并入后删除，
+    并写入同步删除记录；最后重算受影响用户的分类和标签计数。
+    """
+    Website = apps.get_model('websites', 'Website')
+    WebsiteNote = apps.get_model('websites', 'WebsiteNote')
+    Category = apps.get_model('websites', 'Category')
+    Tag = apps.get_model('websites', 'Tag')
+    ChangeLog = apps.get_model('sync', 'ChangeLog')
+    WebsiteTag = Website.tags.through
+
+    duplicates = (
+        Website.objects.values('user_id', 'url_hash')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    users = set()
+    for row in list(duplicates):
+        websites = list(Website.objects.filter(user_id=row['user_id'], url_hash=row['url_hash']).order_by('id'))
+        keeper, extra = websites[0], websites[1:]
+        extra_ids = [website.id for website in extra]
+
+        WebsiteNote.objects.filter(website_id__in=extra_ids).update(website_id=keeper.id)
+        linked = set(WebsiteTag.objects.filter(website_id=keeper.id).values_list('tag_id', flat=True))
+        tag_ids = set(WebsiteTag.objects.filter(website_id__in=extra_ids).values_list('tag_id', flat=True))
+        WebsiteTag.objects.bulk_create([
+            WebsiteTag(website_id=keeper.id, tag_id=tag_id) for tag_id in tag_ids - linked
+        ])
+
+        keeper.visit_count += sum(website.visit_count for website in extra)
+        visited = [website.last_visited for website in websites if website.last_visited]
+        keeper.last_visited = max(visited) if visited else None
+        keeper.save(update_fields=['visit_count', 'last_visited'])
+
+        Website.objects.filter(id__in=extra_ids).delete()
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(user_id=keeper.user_id, model='websites', object_id=keeper.id, operation='upsert')]
+            + [
+                ChangeLog(user_id=keeper.user_id, model='websites', object_id=pk, operation='delete')
+                for pk in extra_ids
+            ]
+        )
+        users.add(keeper.user_id)
+
+    if users:
+        Category.objects.filter(user_id__in=users).update(website_count=_count(Website.objects.all(), 'category'))
+        Tag.objects.filter(user_id__in=users).update(usage_count=_count(WebsiteTag.objects.all(), 'tag'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_backfill_change_log'),
+        ('websites', '0005_remove_website_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('websites', '0006_merge_duplicate_websites'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='website',
+            name='websites_user_url_hash_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='website',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='website',
+            name='url',
+            field=models.URLField(max_length=2048, verbose_name='网站链接'),
+        ),
+        migrations.AddConstraint(
+            model_name='website',
+            constraint=models.UniqueConstraint(fields=('user', 'url_hash'), name='websites_user_url_hash_uniq'),
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 import json
 
+from config.fields import UrlHashField
+from users.counters import adjust_user_counts
+
 User = get_user_model()
 
 class Category(models.Model):
@@ -55,6 +59,9 @@ class Tag(models.Model):
         db_table = 'tags'
         unique_together = ['name', 'user']
         ordering = ['-usage_count', 'name']
+        indexes = [
+            models.Index(fields=['user', '-usage_count', 'name', 'id'], name='tags_user_usage_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -62,21 +69,18 @@ class Tag(models.Model):
 class Website(models.Model):
     """网站模型"""
     title = models.CharField(max_length=200, verbose_name='网站标题')
-    url = models.URLField(verbose_name='网站链接')
+    url = models.URLField(max_length=2048, verbose_name='网站链接')
+    url_hash = UrlHashField(verbose_name='URL摘要')
     description = models.TextField(blank=True, verbose_name='网站描述')
-    favicon = models.URLField(blank=True, verbose_name='网站图标')
-    screenshot = models.ImageField(upload_to='screenshots/', blank=True, null=True, verbose_name='网站截图')
     
     # 关联
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='websites', verbose_name='用户')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True,
                                 related_name='websites', verbose_name='分类')
     tags = models.ManyToManyField(Tag, blank=True, related_name='websites', verbose_name='标签')
-    
-    # 元数据
-    meta_keywords = models.TextField(blank=True, verbose_name='关键词')
-    meta_author = models.CharField(max_length=100, blank=True, verbose_name='作者')
-    meta_language = models.CharField(max_length=10, blank=True, verbose_name='语言')
+    # 图标、截图、页面元数据和健康状态由所有用户共享
+    resource = models.ForeignKey('resources.Resource', on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='websites', verbose_name='URL资源')
     
     # 状态和统计
     is_active = models.BooleanField(default=True, verbose_name='是否激活')
@@ -86,7 +90,6 @@ class Website(models.Model):
     
     # 质量评分
     quality_score = models.FloatField(default=0.0, verbose_name='质量评分')
-    loading_speed = models.FloatField(null=True, blank=True, verbose_name='加载速度')
     
     # 时间戳
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
@@ -96,22 +99,30 @@ class Website(models.Model):
         verbose_name = '网站'
         verbose_name_plural = '网站'
         db_table = 'websites'
-        unique_together = ['url', 'user']
         ordering = ['-created_at']
+        # 长 URL 不直接参与索引，唯一性由定长的规范化摘要保证
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'url_hash'], name='websites_user_url_hash_uniq'),
+        ]
         indexes = [
             models.Index(fields=['user', 'category']),
             models.Index(fields=['user', 'is_active']),
             models.Index(fields=['quality_score']),
+            models.Index(fields=['user', '-created_at', 'id'], name='websites_user_created_idx'),
         ]
     
     def __str__(self):
         return self.title or self.url
     
     def increment_visit_count(self):
-        """增加访问次数"""
-        self.visit_count += 1
+        """增加访问次数（原子递增，并同步用户访问总数）"""
         self.last_visited = timezone.now()
-        self.save(update_fields=['visit_count', 'last_visited'])
+        type(self).objects.filter(pk=self.pk).update(
+            visit_count=F('visit_count') + 1,
+            last_visited=self.last_visited,
+        )
+        self.visit_count += 1
+        adjust_user_counts(self.user_id, visits=1)
 
 class WebsiteNote(models.Model):
     """网站笔记模型"""
@@ -139,6 +150,9 @@ class WebsiteNote(models.Model):
         verbose_name_plural = '网站笔记'
         db_table = 'website_notes'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['website', 'user', '-created_at', 'id'], name='notes_website_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.website.title} - {self.title}"
\ No newline at end of file
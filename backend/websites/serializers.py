@@ -1,11 +1,18 @@
 from rest_framework import serializers
+from config.serializers import (
+    AnnotatedCountField, CountAnnotationMixin, PreloadedPrimaryKeyRelatedField, url_taken
+)
 from .models import Category, Tag, Website, WebsiteNote
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    """分类序列化器"""
+    """
+    分类序列化器
+
+    上下文中提供 category_tree 时，子分类和完整路径都从内存中的分类树读取。
+    """
     children = serializers.SerializerMethodField()
-    full_path = serializers.CharField(source='get_full_path', read_only=True)
+    full_path = serializers.SerializerMethodField()
     
     class Meta:
         model = Category
@@ -18,13 +25,23 @@ class CategorySerializer(serializers.ModelSerializer):
     
     def get_children(self, obj):
         """获取子分类"""
+        tree = self.context.get('category_tree')
+        if tree is not None:
+            return CategorySerializer(tree.children_of(obj.id), many=True, context=self.context).data
         if hasattr(obj, 'children'):
             return CategorySerializer(obj.children.all(), many=True).data
         return []
     
+    def get_full_path(self, obj):
+        """获取完整路径"""
+        tree = self.context.get('category_tree')
+        if tree is not None:
+            return tree.full_path(obj)
+        return obj.get_full_path()
+    
     def validate_parent(self, value):
         """验证父分类"""
-        if value and value.user != self.context['request'].user:
+        if value and value.user_id != self.context['request'].user.id:
             raise serializers.ValidationError("只能选择自己的分类作为父分类")
         return value
 
@@ -60,9 +77,23 @@ class WebsiteSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
+    category = PreloadedPrimaryKeyRelatedField(
+        queryset=Category.objects.all(),
+        required=False,
+        allow_null=True
+    )
     category_name = serializers.CharField(source='category.name', read_only=True)
     notes = WebsiteNoteSerializer(many=True, read_only=True)
     
+    # 以下字段来自共享的 URL 资源，由后台抓取，只读
+    favicon = serializers.CharField(source='resource.favicon', read_only=True)
+    screenshot = serializers.ImageField(source='resource.screenshot', read_only=True)
+    meta_keywords = serializers.CharField(source='resource.meta_keywords', read_only=True)
+    meta_author = serializers.CharField(source='resource.meta_author', read_only=True)
+    meta_language = serializers.CharField(source='resource.meta_language', read_only=True)
+    loading_speed = serializers.FloatField(source='resource.loading_speed', read_only=True)
+    is_reachable = serializers.BooleanField(source='resource.is_reachable', read_only=True)
+    
     class Meta:
         model = Website
         fields = [
@@ -70,32 +101,22 @@ class WebsiteSerializer(serializers.ModelSerializer):
             'category', 'category_name', 'tags', 'tag_ids', 'notes',
             'meta_keywords', 'meta_author', 'meta_language',
             'is_active', 'is_public', 'visit_count', 'last_visited',
-            'quality_score', 'loading_speed', 'created_at', 'updated_at'
+            'quality_score', 'loading_speed', 'is_reachable', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'visit_count', 'last_visited', 'quality_score', 'loading_speed',
+            'visit_count', 'last_visited', 'quality_score',
             'created_at', 'updated_at'
         ]
     
     def validate_category(self, value):
         """验证分类"""
-        if value and value.user != self.context['request'].user:
+        if value and value.user_id != self.context['request'].user.id:
             raise serializers.ValidationError("只能选择自己的分类")
         return value
     
     def validate_url(self, value):
-        """验证URL"""
-        user = self.context['request'].user
-        if self.instance:
-            # 更新时排除自己
-            existing = Website.objects.filter(
-                url=value, user=user
-            ).exclude(id=self.instance.id)
-        else:
-            # 创建时检查重复
-            existing = Website.objects.filter(url=value, user=user)
-        
-        if existing.exists():
+        """验证URL（更新时排除自己）"""
+        if url_taken(self, Website, value):
             raise serializers.ValidationError("该网站已存在")
         return value
     
@@ -136,10 +157,11 @@ class WebsiteSerializer(serializers.ModelSerializer):
         return instance
 
 
-class WebsiteListSerializer(serializers.ModelSerializer):
+class WebsiteListSerializer(CountAnnotationMixin, serializers.ModelSerializer):
     """网站列表序列化器（简化版）"""
     category_name = serializers.CharField(source='category.name', read_only=True)
-    tags_count = serializers.SerializerMethodField()
+    tags_count = AnnotatedCountField('tags')
+    favicon = serializers.CharField(source='resource.favicon', read_only=True)
     
     class Meta:
         model = Website
@@ -148,9 +170,6 @@ class WebsiteListSerializer(serializers.ModelSerializer):
             'category_name', 'tags_count', 'is_active', 'is_public',
             'visit_count', 'last_visited', 'quality_score', 'created_at'
         ]
-    
-    def get_tags_count(self, obj):
-        return obj.tags.count()
 
 
 class WebsiteStatsSerializer(serializers.Serializer):
@@ -0,0 +1,85 @@
+"""
+网站相关计数器的信号处理
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .counters import adjust_category_counts, adjust_tag_counts
+from .models import Website
+
+WebsiteTag = Website.tags.through
+
+
+@receiver(pre_save, sender=Website)
+def remember_previous_category(sender, instance, raw=False, update_fields=None, **kwargs):
+    """记录保存前的分类，供 post_save 计算增量"""
+    instance._previous_category_id = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and 'category' not in update_fields:
+        return
+    instance._previous_category_id = (
+        Website.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Website)
+def update_category_count_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_category_counts({instance.category_id: 1})
+        return
+    if update_fields is not None and 'category' not in update_fields:
+        return
+    previous = getattr(instance, '_previous_category_id', None)
+    if previous != instance.category_id:
+        adjust_category_counts({previous: -1, instance.category_id: 1})
+
+
+@receiver(pre_delete, sender=Website)
+def remember_deleted_tags(sender, instance, **kwargs):
+    """关联行会被级联删除且不触发 m2m_changed，需提前记录标签"""
+    instance._deleted_tag_ids = list(
+        WebsiteTag.objects.filter(website_id=instance.pk).values_list('tag_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Website)
+def update_counts_on_delete(sender, instance, **kwargs):
+    adjust_category_counts({instance.category_id: -1})
+    adjust_tag_counts({tag_id: -1 for tag_id in getattr(instance, '_deleted_tag_ids', [])})
+
+
+@receiver(m2m_changed, sender=WebsiteTag)
+def update_tag_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    维护 Tag.usage_count
+
+    reverse=False 时 instance 为网站、pk_set 为标签ID；
+    reverse=True 时 instance 为标签、pk_set 为网站ID。
+    """
+    owner = 'tag_id' if reverse else 'website_id'
+    other = 'website_id' if reverse else 'tag_id'
+
+    if action in ('pre_remove', 'pre_clear'):
+        # remove/clear 的 pk_set 可能包含未关联的对象，以实际关联为准
+        linked = WebsiteTag.objects.filter(**{owner: instance.pk})
+        if action == 'pre_remove':
+            linked = linked.filter(**{f'{other}__in': pk_set})
+        instance._unlinked_ids = list(linked.values_list(other, flat=True))
+        return
+
+    if action == 'post_add':
+        changed, delta = list(pk_set or []), 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = getattr(instance, '_unlinked_ids', []), -1
+    else:
+        return
+
+    if not changed:
+        return
+    if reverse:
+        adjust_tag_counts({instance.pk: delta * len(changed)})
+    else:
+        adjust_tag_counts({tag_id: delta for tag_id in changed})
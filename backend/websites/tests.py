@@ -1,3 +1,474 @@
-from django.test import TestCase
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, NotSupportedError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from bookmarks.models import Bookmark, Collection
+from config.bulk import fast_delete
+from config.canonical import canonicalize_url, url_hash
+from sync.models import ChangeLog
+
+from .models import Category, Tag, Website
+
+User = get_user_model()
+
+
+class ListQueryCountTestCase(APITestCase):
+    """列表接口查询数基准：查询数不随数据量和页大小变化"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def assertConstantQueries(self, url, populate, expected):
+        """分别在少量和超过一页的数据下请求，断言查询数固定"""
+        populate(3)
+        small, _ = self.count_queries(url)
+        populate(30)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, expected)
+        self.assertEqual(large, expected)
+        return response
+
+
+class WebsiteListQueryCountTests(ListQueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='开发', user=self.user)
+        self.tags = [Tag.objects.create(name=f'tag{i}', user=self.user) for i in range(3)]
+
+    def populate(self, count):
+        start = Website.objects.count()
+        for i in range(start, start + count):
+            website = Website.objects.create(
+                title=f'site {i}', url=f'https://example.com/{i}',
+                user=self.user, category=self.category,
+            )
+            website.tags.set(self.tags)
+
+    def test_website_list(self):
+        # COUNT + 列表查询
+        response = self.assertConstantQueries('/api/websites/', self.populate, 2)
+        self.assertEqual(response.data['results'][0]['tags_count'], 3)
+
+    def populate_categories(self, count):
+        # 每次追加一条 count 层深的分类链
+        parent = None
+        for depth in range(count):
+            parent = Category.objects.create(
+                name=f'level {depth}', user=self.user, parent=parent,
+                sort_order=Category.objects.count(),
+            )
+
+    def test_category_list(self):
+        # COUNT + 列表查询 + 整棵分类树
+        self.assertConstantQueries('/api/websites/categories/', self.populate_categories, 3)
+
+        deepest = Category.objects.order_by('-id').first()
+        queries, response = self.count_queries(f'/api/websites/categories/{deepest.id}/')
+        self.assertEqual(queries, 2)
+        self.assertEqual(response.data['full_path'].count('>'), 29)
+
+    def test_tag_list(self):
+        self.assertConstantQueries(
+            '/api/websites/tags/',
+            lambda count: [
+                Tag.objects.create(name=f'extra{Tag.objects.count()}', user=self.user)
+                for _ in range(count)
+            ],
+            2,
+        )
+
+
+class BulkOperationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='工具', user=self.user)
+        self.python = Tag.objects.create(name='python', user=self.user)
+        self.py = Tag.objects.create(name='py', user=self.user)
+        self.websites = []
+        for i in range(5):
+            website = Website.objects.create(
+                title=f'site {i}', url=f'https://example.com/{i}',
+                user=self.user, category=self.category,
+            )
+            website.tags.add(self.py if i % 2 else self.python)
+            self.websites.append(website)
+        self.ids = [website.id for website in self.websites]
+
+    def post(self, url, data):
+        return self.client.post(url, data, format='json')
+
+    def test_delete_reports_per_item_and_keeps_counters(self):
+        website = self.websites[0]
+        website.notes.create(user=self.user, title='note', content='content')
+        response = self.post('/api/websites/bulk-operations/', {
+            'action': 'delete', 'ids': [self.ids[0], self.ids[1], 999999],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['succeeded'], 2)
+        self.assertEqual(
+            [item['status'] for item in response.data['results']], ['ok', 'ok', 'not_found']
+        )
+        self.assertEqual(Website.objects.count(), 3)
+        self.assertFalse(Website.tags.through.objects.filter(website_id__in=self.ids[:2]).exists())
+
+        self.category.refresh_from_db()
+        self.python.refresh_from_db()
+        self.py.refresh_from_db()
+        self.assertEqual(self.category.website_count, 3)
+        self.assertEqual(self.python.usage_count, 2)
+        self.assertEqual(self.py.usage_count, 1)
+
+    def test_fast_delete_refuses_relations_it_cannot_handle(self):
+        # 分类的子分类是级联删除，退回 queryset.delete() 会触发信号，与调用方的手动增量重复
+        Category.objects.create(name='子分类', user=self.user, parent=self.category)
+        with self.assertRaises(NotSupportedError):
+            fast_delete(Category.objects.filter(pk=self.category.pk))
+        self.assertEqual(Category.objects.filter(user=self.user).count(), 2)
+
+    def test_recategorize_and_retag(self):
+        other = Category.objects.create(name='阅读', user=self.user)
+        self.post('/api/websites/bulk-operations/', {
+            'action': 'recategorize', 'ids': self.ids[:2], 'category_id': other.id,
+        })
+        self.category.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.category.website_count, other.website_count), (3, 2))
+
+        response = self.post('/api/websites/bulk-operations/', {
+            'action': 'retag', 'ids': self.ids, 'tag_ids': [self.python.id], 'mode': 'replace',
+        })
+        self.assertEqual(response.data['succeeded'], 5)
+        self.python.refresh_from_db()
+        self.py.refresh_from_db()
+        self.assertEqual((self.python.usage_count, self.py.usage_count), (5, 0))
+
+    def test_tag_merge(self):
+        response = self.post('/api/websites/tags/bulk-operations/', {
+            'action': 'merge', 'ids': [self.py.id], 'target_id': self.python.id,
+        })
+        self.assertEqual(response.data['succeeded'], 1)
+        self.assertFalse(Tag.objects.filter(id=self.py.id).exists())
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.usage_count, 5)
+        self.assertEqual(self.python.websites.count(), 5)
+
+    def test_category_move_rejects_cycles(self):
+        child = Category.objects.create(name='子分类', user=self.user, parent=self.category)
+        response = self.post('/api/websites/categories/bulk-operations/', {
+            'action': 'move', 'ids': [self.category.id], 'parent_id': child.id,
+        })
+        self.assertEqual(response.data['results'][0]['status'], 'error')
+        self.category.refresh_from_db()
+        self.assertIsNone(self.category.parent_id)
+
+        top = Category.objects.create(name='顶层', user=self.user)
+        response = self.post('/api/websites/categories/bulk-operations/', {
+            'action': 'move', 'ids': [child.id], 'parent_id': top.id,
+        })
+        self.assertEqual(response.data['succeeded'], 1)
+        child.refresh_from_db()
+        self.assertEqual(child.parent_id, top.id)
+
+    def test_category_delete_records_one_tombstone_per_category(self):
+        child = Category.objects.create(name='子分类', user=self.user, parent=self.category)
+        ChangeLog.objects.all().delete()
+        response = self.post('/api/websites/categories/bulk-operations/', {
+            'action': 'delete', 'ids': [self.category.id],
+        })
+        self.assertEqual(response.data['succeeded'], 1)
+        self.assertCountEqual(
+            ChangeLog.objects.filter(model='categories').values_list('object_id', 'operation'),
+            [(self.category.id, 'delete'), (child.id, 'delete')],
+        )
+
+    def test_invalid_requests(self):
+        response = self.post('/api/websites/bulk-operations/', {'action': 'explode', 'ids': self.ids})
+        self.assertEqual(response.status_code, 400)
+        response = self.post('/api/websites/bulk-operations/', {
+            'action': 'recategorize', 'ids': self.ids, 'category_id': 999999,
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class CounterSignalTests(APITestCase):
+    """Category.website_count / Tag.usage_count 由信号维护，recount 修复漂移"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.first = Category.objects.create(name='first', user=self.user)
+        self.second = Category.objects.create(name='second', user=self.user)
+        self.tags = [Tag.objects.create(name=f'tag{i}', user=self.user) for i in range(3)]
+        self.website = Website.objects.create(
+            title='site', url='https://example.com/', user=self.user, category=self.first
+        )
+
+    def assertCounts(self, categories=(), tags=()):
+        for category, expected in categories:
+            category.refresh_from_db()
+            self.assertEqual(category.website_count, expected, category.name)
+        for tag, expected in tags:
+            tag.refresh_from_db()
+            self.assertEqual(tag.usage_count, expected, tag.name)
+
+    def test_create_and_change_category(self):
+        self.assertCounts([(self.first, 1), (self.second, 0)])
+
+        self.website.category = self.second
+        self.website.save()
+        self.assertCounts([(self.first, 0), (self.second, 1)])
+
+        self.website.category = None
+        self.website.save(update_fields=['category'])
+        self.assertCounts([(self.first, 0), (self.second, 0)])
+
+        # 不含 category 的 update_fields 不改变计数
+        self.website.category = self.first
+        self.website.save(update_fields=['title'])
+        self.assertCounts([(self.first, 0), (self.second, 0)])
+
+    def test_tags_from_website_side(self):
+        a, b, c = self.tags
+        self.website.tags.add(a, b)
+        self.website.tags.add(a)
+        self.assertCounts(tags=[(a, 1), (b, 1), (c, 0)])
+
+        # 移除未关联的标签不影响计数
+        self.website.tags.remove(b, c)
+        self.assertCounts(tags=[(a, 1), (b, 0), (c, 0)])
+
+        self.website.tags.add(b, c)
+        self.website.tags.clear()
+        self.assertCounts(tags=[(a, 0), (b, 0), (c, 0)])
+
+    def test_tags_from_tag_side(self):
+        tag = self.tags[0]
+        other = Website.objects.create(title='other', url='https://example.org/', user=self.user)
+        tag.websites.add(self.website, other)
+        self.assertCounts(tags=[(tag, 2)])
+
+        tag.websites.remove(other)
+        self.assertCounts(tags=[(tag, 1)])
+
+        tag.websites.add(other)
+        tag.websites.clear()
+        self.assertCounts(tags=[(tag, 0)])
+
+    def test_delete(self):
+        self.website.tags.add(*self.tags[:2])
+        self.website.delete()
+        self.assertCounts([(self.first, 0)], [(self.tags[0], 0), (self.tags[1], 0), (self.tags[2], 0)])
+
+    def test_recount_keeps_visits_of_deleted_websites(self):
+        self.website.increment_visit_count()
+        self.website.increment_visit_count()
+        self.website.delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_visits, 2)
+
+        call_command('recount', stdout=StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_visits, 2)
+
+    def test_recount_fixes_drift(self):
+        self.website.tags.add(self.tags[0])
+        Category.objects.filter(pk=self.first.pk).update(website_count=7)
+        Tag.objects.filter(pk=self.tags[0].pk).update(usage_count=0)
+
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('分类网站数: 修正 1 行', out.getvalue())
+        self.assertIn('标签使用次数: 修正 1 行', out.getvalue())
+        self.assertCounts([(self.first, 1)], [(self.tags[0], 1)])
+
+        out = StringIO()
+        call_command('recount', '--user', 'tester', stdout=out)
+        self.assertIn('分类网站数: 修正 0 行', out.getvalue())
+
+
+class WebsiteBatchTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='工具', user=self.user)
+        self.tags = [Tag.objects.create(name=f'tag {i}', user=self.user) for i in range(3)]
+
+    def batch(self, method, items):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)('/api/websites/batch/', items, format='json')
+        return response, len(context.captured_queries)
+
+    def items(self, count, start=0):
+        return [
+            {
+                'title': f'site {i}', 'url': f'https://example.com/{i}',
+                'category': self.category.id, 'tag_ids': [tag.id for tag in self.tags[:2]],
+            }
+            for i in range(start, start + count)
+        ]
+
+    def test_create_query_count_is_constant(self):
+        response, small = self.batch('post', self.items(3))
+        self.assertEqual(response.status_code, 201)
+        response, large = self.batch('post', self.items(40, start=3))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(small, large)
+
+        self.category.refresh_from_db()
+        self.tags[0].refresh_from_db()
+        self.assertEqual(self.category.website_count, 43)
+        self.assertEqual(self.tags[0].usage_count, 43)
+        self.assertEqual(Website.objects.get(url='https://example.com/7').tags.count(), 2)
+
+    def test_partial_failure_reports_per_item(self):
+        Website.objects.create(title='existing', url='https://example.com/0', user=self.user)
+        items = self.items(2) + [{'title': 'dup', 'url': 'https://example.com/1'}, {'title': 'bad', 'url': 'nope'}]
+        response, _ = self.batch('post', items)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [item['status'] for item in response.data['results']],
+            ['error', 'created', 'error', 'error'],
+        )
+        self.assertIn('url', response.data['results'][2]['errors'])
+
+    def test_update(self):
+        self.batch('post', self.items(3))
+        websites = list(Website.objects.order_by('id'))
+        other = Category.objects.create(name='阅读', user=self.user)
+        response, _ = self.batch('patch', [
+            {'id': websites[0].id, 'title': 'renamed', 'category': other.id},
+            {'id': websites[1].id, 'tag_ids': [self.tags[2].id]},
+            {'id': 999999, 'title': 'missing'},
+        ])
+        self.assertEqual(response.status_code, 207)
+        websites[0].refresh_from_db()
+        self.assertEqual((websites[0].title, websites[0].category_id), ('renamed', other.id))
+        self.assertEqual(list(websites[1].tags.values_list('id', flat=True)), [self.tags[2].id])
+
+        other.refresh_from_db()
+        self.tags[0].refresh_from_db()
+        self.tags[2].refresh_from_db()
+        self.assertEqual(other.website_count, 1)
+        self.assertEqual((self.tags[0].usage_count, self.tags[2].usage_count), (2, 1))
+
+
+class UrlCanonicalizationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tester', email='tester@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_canonicalize_url(self):
+        cases = [
+            ('http://www.Example.com/', 'https://example.com/'),
+            ('https://example.com:443/docs/', 'https://example.com/docs'),
+            ('example.com/a?b=2&a=1&utm_source=x&fbclid=y', 'https://example.com/a?a=1&b=2'),
+            ('https://example.com/page#section', 'https://example.com/page'),
+            ('https://example.com/#/route', 'https://example.com/#/route'),
+            ('https://example.com:8080/', 'https://example.com:8080/'),
+        ]
+        for url, expected in cases:
+            self.assertEqual(canonicalize_url(url), expected, url)
+        self.assertEqual(url_hash('http://www.example.com/'), url_hash('https://example.com'))
+
+    def test_hash_maintained_on_save_and_bulk_create(self):
+        website = Website.objects.create(title='a', url='http://www.example.com/', user=self.user)
+        self.assertEqual(website.url_hash, url_hash('https://example.com'))
+        [bulk] = Website.objects.bulk_create([Website(title='b', url='https://b.com/x/', user=self.user)])
+        self.assertEqual(Website.objects.get(id=bulk.id).url_hash, url_hash('https://b.com/x'))
+
+    def test_equivalent_url_is_rejected(self):
+        Website.objects.create(title='a', url='http://www.example.com/', user=self.user)
+        response = self.client.post(
+            '/api/websites/', {'title': 'b', 'url': 'https://example.com'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('url', response.data)
+
+    def test_duplicates(self):
+        Website.objects.create(title='a', url='http://www.example.com/', user=self.user)
+        Website.objects.create(title='b', url='https://other.com/', user=self.user)
+        collection = Collection.objects.create(name='默认', user=self.user)
+        Bookmark.objects.create(
+            title='c', url='https://example.com/?utm_source=feed', collection=collection, user=self.user
+        )
+
+        response = self.client.get('/api/websites/duplicates/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        group = response.data['groups'][0]
+        self.assertEqual(group['canonical_url'], 'https://example.com/')
+        self.assertEqual(sorted(item['type'] for item in group['items']), ['bookmark', 'website'])
+
+        response = self.client.get('/api/websites/duplicates/', {'scope': 'websites'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_duplicates_are_paginated(self):
+        collection = Collection.objects.create(name='默认', user=self.user)
+        for i in range(5):
+            Website.objects.create(title=f'site {i}', url=f'https://example.com/{i}', user=self.user)
+            Bookmark.objects.create(
+                title=f'bookmark {i}', url=f'http://www.example.com/{i}/', collection=collection, user=self.user
+            )
+
+        urls = []
+        params = {'limit': 2}
+        while True:
+            response = self.client.get('/api/websites/duplicates/', params)
+            self.assertLessEqual(response.data['count'], 2)
+            urls.extend(group['canonical_url'] for group in response.data['groups'])
+            if response.data['next'] is None:
+                break
+            params['after'] = response.data['next']
+        self.assertEqual(sorted(urls), [f'https://example.com/{i}' for i in range(5)])
+
+        response = self.client.get('/api/websites/duplicates/', {'limit': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_long_urls_and_hash_uniqueness(self):
+        long_url = 'https://example.com/' + 'a' * 1500
+        response = self.client.post('/api/websites/', {'title': 'long', 'url': long_url}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Website.objects.create(title='dup', url=long_url.replace('https://', 'http://www.'), user=self.user)
+
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        Website.objects.create(title='mine', url=long_url, user=other)
+
+    def test_lookup_by_url_uses_hash(self):
+        website = Website.objects.create(title='a', url='https://example.com/docs', user=self.user)
+        Website.objects.create(title='b', url='https://example.com/docs/more', user=self.user)
+
+        response = self.client.get('/api/websites/', {'url': 'http://www.example.com/docs/'})
+        self.assertEqual([item['id'] for item in response.data['results']], [website.id])
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/websites/search/', {'q': 'https://EXAMPLE.com/docs?utm_source=x'})
+        self.assertEqual([item['id'] for item in response.data['results']], [website.id])
+        self.assertTrue(any('"url_hash" =' in query['sql'] for query in context.captured_queries))
@@ -0,0 +1,73 @@
+"""
+分类树
+
+一次查询加载用户的全部分类，在内存中组装父子层级，
+序列化子分类和完整路径时不再逐层查询数据库。
+"""
+from collections import defaultdict
+
+from .models import Category
+
+PATH_SEPARATOR = ' > '
+
+
+class CategoryTree:
+    """用户分类树"""
+
+    def __init__(self, categories):
+        self.nodes = {}
+        self.children = defaultdict(list)
+        for category in categories:
+            self.nodes[category.id] = category
+            self.children[category.parent_id].append(category)
+        self._paths = {}
+
+    @classmethod
+    def for_user(cls, user):
+        """加载用户的全部分类（单次查询）"""
+        return cls(Category.objects.filter(user=user).order_by('sort_order', 'name'))
+
+    def roots(self):
+        return self.children.get(None, [])
+
+    def children_of(self, category_id):
+        return self.children.get(category_id, [])
+
+    def ancestors_of(self, category):
+        """从根到父分类的祖先列表"""
+        ancestors = []
+        seen = {category.id}
+        parent = self.nodes.get(category.parent_id)
+        while parent is not None and parent.id not in seen:
+            ancestors.append(parent)
+            seen.add(parent.id)
+            parent = self.nodes.get(parent.parent_id)
+        ancestors.reverse()
+        return ancestors
+
+    def full_path(self, category):
+        """完整路径，格式与 Category.get_full_path 一致"""
+        if category.parent_id is None:
+            return category.name
+        if category.parent_id not in self._paths:
+            parent = self.nodes.get(category.parent_id)
+            if parent is None:
+                # 父分类不在树中（不应出现），退回到逐级查询
+                return category.get_full_path()
+            self._paths[category.parent_id] = PATH_SEPARATOR.join(
+                node.name for node in self.ancestors_of(category)
+            )
+        return f"{self._paths[category.parent_id]}{PATH_SEPARATOR}{category.name}"
+
+    def descendant_ids(self, category_id):
+        """子孙分类ID（不含自身）"""
+        result = []
+        seen = {category_id}
+        stack = [category_id]
+        while stack:
+            for child in self.children_of(stack.pop()):
+                if child.id not in seen:
+                    seen.add(child.id)
+                    result.append(child.id)
+                    stack.append(child.id)
+        return result
@@ -5,12 +5,19 @@ urlpatterns = [
     # 网站管理
     path('', views.WebsiteListCreateView.as_view(), name='website-list'),
     path('<int:pk>/', views.WebsiteDetailView.as_view(), name='website-detail'),
+    path('search/', views.search_websites, name='website-search'),
+    path('fetch-info/', views.fetch_website_info, name='website-fetch-info'),
+    path('batch/', views.batch_websites, name='website-batch'),
+    path('duplicates/', views.find_duplicate_websites, name='website-duplicates'),
+    path('bulk-operations/', views.bulk_operations, name='website-bulk-operations'),
     
     # 分类管理
     path('categories/', views.CategoryListCreateView.as_view(), name='category-list'),
     path('categories/<int:pk>/', views.CategoryDetailView.as_view(), name='category-detail'),
+    path('categories/bulk-operations/', views.category_bulk_operations, name='category-bulk-operations'),
     
     # 标签管理
     path('tags/', views.TagListCreateView.as_view(), name='tag-list'),
     path('tags/<int:pk>/', views.TagDetailView.as_view(), name='tag-detail'),
+    path('tags/bulk-operations/', views.tag_bulk_operations, name='tag-bulk-operations'),
 ]
\ No newline at end of file
@@ -1,36 +1,53 @@
 from django.db.models import Q, Count, Avg, Sum
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from rest_framework import generics, permissions, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 import logging
-import requests
-from urllib.parse import urljoin, urlparse
-try:
-    from bs4 import BeautifulSoup
-    HAS_BS4 = True
-except ImportError:
-    HAS_BS4 = False
+from itertools import islice
 
+from .bulk import (
+    CategoryBulkOperations, TagBulkOperations, WebsiteBulkOperations, WebsiteBulkWriter
+)
+from . import duplicates
 from .models import Category, Tag, Website, WebsiteNote
 from .serializers import (
     CategorySerializer, TagSerializer, WebsiteSerializer,
     WebsiteListSerializer, WebsiteNoteSerializer, WebsiteStatsSerializer
 )
+from .tree import CategoryTree
+from analytics.activity import record_activity
+from config.bulk import bulk_operation_response, bulk_write_response
+from config.canonical import is_url, url_hash
+from config.pagination import HybridPagination
+from config.throttling import throttle_scope
+from resources.fetch import UnsafeURL, fetch_metadata, needs_fetch, validate_url
+from resources.registry import resource_for
 
 logger = logging.getLogger(__name__)
 
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryTreeContextMixin:
+    """在序列化上下文中提供按需加载的分类树"""
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        user = self.request.user
+        context['category_tree'] = SimpleLazyObject(lambda: CategoryTree.for_user(user))
+        return context
+
+
+class CategoryListCreateView(CategoryTreeContextMixin, generics.ListCreateAPIView):
     """分类列表和创建视图"""
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['parent']
     search_fields = ['name', 'description']
-    ordering_fields = ['sort_order', 'name', 'created_at']
+    ordering_fields = ['sort_order', 'name', 'website_count', 'created_at']
     ordering = ['sort_order', 'name']
     
     def get_queryset(self):
@@ -40,7 +57,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(CategoryTreeContextMixin, generics.RetrieveUpdateDestroyAPIView):
     """分类详情视图"""
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -51,6 +68,7 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class TagListCreateView(generics.ListCreateAPIView):
     """标签列表和创建视图"""
+    pagination_class = HybridPagination
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -76,15 +94,24 @@ class TagDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class WebsiteListCreateView(generics.ListCreateAPIView):
     """网站列表和创建视图"""
+    pagination_class = HybridPagination
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'is_active', 'is_public']
-    search_fields = ['title', 'description', 'url', 'meta_keywords']
+    search_fields = ['title', 'description', 'url', 'resource__meta_keywords']
     ordering_fields = ['created_at', 'visit_count', 'quality_score', 'last_visited']
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return Website.objects.filter(user=self.request.user).select_related('category').prefetch_related('tags')
+        queryset = Website.objects.filter(user=self.request.user).select_related('category', 'resource')
+        url = self.request.query_params.get('url')
+        if url:
+            # 按规范化 URL 查找，等价写法都能命中
+            queryset = queryset.filter(url_hash=url_hash(url))
+        if self.request.method == 'GET':
+            # 列表只需要标签数量，由注解一次性计算
+            return WebsiteListSerializer.annotate_queryset(queryset)
+        return queryset.prefetch_related('tags')
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -92,9 +119,8 @@ class WebsiteListCreateView(generics.ListCreateAPIView):
         return WebsiteSerializer
     
     def perform_create(self, serializer):
-        website = serializer.save(user=self.request.user)
-        # 异步获取网站元数据
-        self.fetch_website_metadata.delay(website.id)
+        # 元数据由 refresh_resources 命令按 URL 资源统一抓取
+        serializer.save(user=self.request.user)
 
 
 class WebsiteDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -103,18 +129,27 @@ class WebsiteDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Website.objects.filter(user=self.request.user).select_related('category').prefetch_related('tags', 'notes')
+        return Website.objects.filter(user=self.request.user).select_related('category', 'resource').prefetch_related('tags', 'notes')
     
     def retrieve(self, request, *args, **kwargs):
         """获取网站详情时增加访问次数"""
         instance = self.get_object()
         instance.increment_visit_count()
+        record_activity(
+            request.user.pk, 'bookmark_visit', request,
+            description=f'访问网站 {instance.title}',
+            kind='website',
+            object_id=instance.pk,
+            category=instance.category.name if instance.category_id else None,
+            tags=[tag.name for tag in instance.tags.all()],
+        )
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
 
 class WebsiteNoteListCreateView(generics.ListCreateAPIView):
     """网站笔记列表和创建视图"""
+    pagination_class = HybridPagination
     serializer_class = WebsiteNoteSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -174,10 +209,15 @@ class WebsiteStatsView(APIView):
             )
 
 
+@throttle_scope('scrape')
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def fetch_website_info(request):
-    """获取网站信息"""
+    """
+    获取网站信息
+    
+    结果缓存在共享的 URL 资源上，其他用户已抓取过且未过期时直接返回。
+    """
     try:
         url = request.data.get('url')
         if not url:
@@ -185,10 +225,20 @@ def fetch_website_info(request):
                 {'error': '请提供网站URL'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            validate_url(url)
+        except UnsafeURL as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # 获取网站信息
-        info = get_website_info(url)
-        return Response(info)
+        resource = resource_for(url)
+        if needs_fetch(resource):
+            fetch_metadata(resource)
+        return Response({
+            'title': resource.title,
+            'description': resource.description,
+            'meta_keywords': resource.meta_keywords,
+            'favicon': resource.favicon,
+        })
         
     except Exception as e:
         logger.error(f"获取网站信息失败: {str(e)}")
@@ -198,61 +248,7 @@ def fetch_website_info(request):
         )
 
 
-def get_website_info(url):
-    """获取网站基本信息"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # 获取标题
-        title = ''
-        if soup.title:
-            title = soup.title.string.strip()
-        
-        # 获取描述
-        description = ''
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc:
-            description = meta_desc.get('content', '').strip()
-        
-        # 获取关键词
-        keywords = ''
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        if meta_keywords:
-            keywords = meta_keywords.get('content', '').strip()
-        
-        # 获取favicon
-        favicon = ''
-        favicon_link = soup.find('link', rel='icon') or soup.find('link', rel='shortcut icon')
-        if favicon_link:
-            favicon = urljoin(url, favicon_link.get('href', ''))
-        else:
-            # 尝试默认favicon路径
-            parsed_url = urlparse(url)
-            favicon = f"{parsed_url.scheme}://{parsed_url.netloc}/favicon.ico"
-        
-        return {
-            'title': title,
-            'description': description,
-            'meta_keywords': keywords,
-            'favicon': favicon,
-        }
-        
-    except Exception as e:
-        logger.error(f"获取网站信息失败: {str(e)}")
-        return {
-            'title': '',
-            'description': '',
-            'meta_keywords': '',
-            'favicon': '',
-        }
-
-
+@throttle_scope('search')
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def search_websites(request):
@@ -265,12 +261,19 @@ def search_websites(request):
         websites = Website.objects.filter(
             user=request.user,
             is_active=True
-        ).filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(url__icontains=query) |
-            Q(meta_keywords__icontains=query)
-        ).select_related('category').prefetch_related('tags')[:20]
+        )
+        if is_url(query):
+            # 完整链接走 (user, url_hash) 唯一索引
+            websites = websites.filter(url_hash=url_hash(query))
+        else:
+            websites = websites.filter(
+                Q(title__icontains=query) |
+                Q(description__icontains=query) |
+                Q(url__icontains=query) |
+                Q(resource__meta_keywords__icontains=query)
+            )
+        websites = websites.select_related('category', 'resource')
+        websites = WebsiteListSerializer.annotate_queryset(websites)[:20]
         
         serializer = WebsiteListSerializer(websites, many=True)
         return Response({'results': serializer.data})
@@ -280,4 +283,89 @@ def search_websites(request):
         return Response(
             {'error': '搜索失败'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+@throttle_scope('bulk')
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_operations(request):
+    """
+    批量操作网站
+    
+    action: activate / deactivate / recategorize（category_id，为空表示取消分类）/
+    retag（tag_ids，mode 为 add / remove / replace）/ delete
+    """
+    return bulk_operation_response(WebsiteBulkOperations(request.user), request)
+
+
+@throttle_scope('bulk')
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def tag_bulk_operations(request):
+    """批量操作标签：merge（合并到 target_id）/ delete"""
+    return bulk_operation_response(TagBulkOperations(request.user), request)
+
+
+@throttle_scope('bulk')
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def category_bulk_operations(request):
+    """批量操作分类：move（移动到 parent_id 下，为空表示移到顶层）/ delete"""
+    return bulk_operation_response(CategoryBulkOperations(request.user), request)
+
+
+@throttle_scope('bulk')
+@api_view(['POST', 'PATCH'])
+@permission_classes([permissions.IsAuthenticated])
+def batch_websites(request):
+    """
+    批量创建（POST）或更新（PATCH）网站
+    
+    请求体为对象列表（更新时每项需带 id），整批一次校验和写入，逐项返回结果：
+    全部成功 201 / 200，部分成功 207，全部失败 400。
+    """
+    return bulk_write_response(WebsiteBulkWriter(request), request)
+
+
+@throttle_scope('bulk')
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def find_duplicate_websites(request):
+    """
+    查找重复链接
+    
+    按规范化 URL 对网站和书签分组（http/https、www、末尾斜杠、跟踪参数等差异视为相同），
+    scope=websites 时只检查网站。每页最多 limit 组，next 不为空时作为 after 参数请求下一页。
+    """
+    try:
+        limit = min(int(request.GET.get('limit', duplicates.DEFAULT_LIMIT)), duplicates.MAX_LIMIT)
+        if limit <= 0:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {'error': '无效的数量'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        include_bookmarks = request.GET.get('scope', 'all') != 'websites'
+        # 生成器逐组读取，取到下一页的第一组即停止
+        groups = duplicates.find_duplicates(
+            request.user, include_bookmarks=include_bookmarks, after=request.GET.get('after')
+        )
+        page = list(islice(groups, limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        return Response({
+            'count': len(page),
+            'groups': [group for _, group in page],
+            'next': page[-1][0] if has_more else None,
+        })
+        
+    except Exception as e:
+        logger.error(f"查找重复链接失败: {str(e)}")
+        return Response(
+            {'error': '查找重复链接失败'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )